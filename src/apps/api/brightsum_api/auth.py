@@ -42,6 +42,13 @@ def create_token(sub: str, minutes: int = ACCESS_MIN) -> str:
     payload = {"sub": sub, "exp": datetime.utcnow() + timedelta(minutes=minutes)}
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGO)
 
+def token_subject(token: str) -> str | None:
+    """Return the email a valid token was issued for, or None (no DB lookup)."""
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGO])["sub"]
+    except (JWTError, KeyError):
+        return None
+
 def current_user(token: str = Depends(oauth2), session: Session = Depends(get_session)) -> User:
     try:
         email = jwt.decode(token, SECRET_KEY, algorithms=[ALGO])["sub"]
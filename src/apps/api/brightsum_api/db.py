@@ -1,5 +1,5 @@
 import os
-from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel import SQLModel, create_engine, Session, select
 
 DB_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
@@ -27,18 +27,69 @@ def init_db():
         try:
             conn = engine.raw_connection()
             cur = conn.cursor()
-            cur.execute("PRAGMA table_info('quizattemptquestion')")
-            existing = [r[1] for r in cur.fetchall()]
-            # columns we expect to exist on QuizAttemptQuestion
-            expected = [
-                ("is_correct", "BOOLEAN"),
-                ("given_answer", "TEXT"),
-                ("time_seconds", "REAL"),
-                ("hints_requested", "INTEGER"),
-            ]
-            for cname, ctype in expected:
-                if cname not in existing:
-                    cur.execute(f"ALTER TABLE quizattemptquestion ADD COLUMN {cname} {ctype}")
+            # columns we expect to exist on tables created by older versions
+            expected = {
+                "question": [
+                    ("content_hash", "VARCHAR"),
+                ],
+                "quizattempt": [
+                    ("mode", "VARCHAR DEFAULT 'fixed'"),
+                    ("ability", "REAL"),
+                    ("ability_se", "REAL"),
+                    ("max_questions", "INTEGER"),
+                    ("target_se", "REAL"),
+                ],
+                "quizattemptquestion": [
+                    ("is_correct", "BOOLEAN"),
+                    ("given_answer", "TEXT"),
+                    ("time_seconds", "REAL"),
+                    ("hints_requested", "INTEGER"),
+                    ("user_id", "INTEGER"),
+                    ("answered_at", "DATETIME"),
+                ],
+                "importjob": [
+                    ("claimed_by", "VARCHAR"),
+                    ("heartbeat_at", "DATETIME"),
+                ],
+                "importjobrow": [
+                    ("near_duplicates", "TEXT"),
+                ],
+                "practiceinteraction": [
+                    ("user_id", "INTEGER"),
+                    ("answered_at", "DATETIME"),
+                ],
+            }
+            for table, columns in expected.items():
+                cur.execute(f"PRAGMA table_info('{table}')")
+                existing = [r[1] for r in cur.fetchall()]
+                for cname, ctype in columns:
+                    if cname not in existing:
+                        cur.execute(f"ALTER TABLE {table} ADD COLUMN {cname} {ctype}")
+            # indexes for columns added above (create_all skips existing tables)
+            cur.execute("CREATE INDEX IF NOT EXISTS ix_practiceinteraction_user_answered ON practiceinteraction (user_id, answered_at)")
+            cur.execute("CREATE INDEX IF NOT EXISTS ix_quizattemptquestion_user_answered ON quizattemptquestion (user_id, answered_at)")
+            # fill user_id / answered_at for rows written before these columns existed;
+            # old answers get their attempt's start (practice) or finish (quiz) time
+            cur.execute(
+                "UPDATE practiceinteraction SET "
+                "user_id = (SELECT user_id FROM practiceattempt WHERE practiceattempt.id = practiceinteraction.attempt_id) "
+                "WHERE user_id IS NULL"
+            )
+            cur.execute(
+                "UPDATE practiceinteraction SET "
+                "answered_at = (SELECT started_at FROM practiceattempt WHERE practiceattempt.id = practiceinteraction.attempt_id) "
+                "WHERE answered_at IS NULL AND is_correct IS NOT NULL"
+            )
+            cur.execute(
+                "UPDATE quizattemptquestion SET "
+                "user_id = (SELECT user_id FROM quizattempt WHERE quizattempt.id = quizattemptquestion.attempt_id) "
+                "WHERE user_id IS NULL"
+            )
+            cur.execute(
+                "UPDATE quizattemptquestion SET "
+                "answered_at = (SELECT finished_at FROM quizattempt WHERE quizattempt.id = quizattemptquestion.attempt_id) "
+                "WHERE answered_at IS NULL AND is_correct IS NOT NULL"
+            )
             conn.commit()
         except Exception:
             # Non-fatal in dev: ignore migration errors here and let user run manual migration
@@ -52,3 +103,67 @@ def init_db():
                 conn.close()
             except Exception:
                 pass
+    _backfill_content_hashes()
+    _backfill_rollups()
+    if DB_URL.startswith("sqlite"):
+        _ensure_search_index()
+
+
+def _ensure_search_index():
+    # FTS5 table + triggers for teacher search; a SQLite build without FTS5
+    # leaves search on its LIKE fallback instead of failing startup
+    from .services import search
+    conn = engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        search.ensure_search_index(cur)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"[init_db] full-text search index unavailable: {e}")
+    finally:
+        conn.close()
+
+
+def _backfill_content_hashes():
+    # Hash questions written before Question.content_hash existed, then make sure
+    # the unique (topic_id, content_hash) index exists. Of questions that already
+    # collide after normalization only the oldest gets the hash; the others keep
+    # NULL (the index ignores NULLs) so the index can still be created.
+    from sqlalchemy import bindparam, update
+    from .models import Question
+    from .services.question_hash import content_hash
+    with Session(engine) as s:
+        rows = s.exec(
+            select(Question.id, Question.topic_id, Question.stem, Question.answer)
+            .where(Question.content_hash.is_(None))
+            .order_by(Question.id)
+        ).all()
+        if rows:
+            taken = set(s.exec(
+                select(Question.topic_id, Question.content_hash).where(Question.content_hash.isnot(None))
+            ).all())
+            params = []
+            for qid, topic_id, stem, answer in rows:
+                h = content_hash(stem, answer)
+                if (topic_id, h) not in taken:
+                    taken.add((topic_id, h))
+                    params.append({"qid": qid, "h": h})
+            if params:
+                table = Question.__table__
+                s.connection().execute(
+                    update(table).where(table.c.id == bindparam("qid")).values(content_hash=bindparam("h")),
+                    params,
+                )
+            s.commit()
+    for index in Question.__table__.indexes:
+        if index.name == "ux_question_topic_content_hash":
+            index.create(engine, checkfirst=True)
+
+
+def _backfill_rollups():
+    # Populate pre-aggregated tables from existing history the first time they exist
+    from .services import question_stats, review_rollup
+    with Session(engine) as s:
+        review_rollup.backfill(s)
+        question_stats.backfill(s)
@@ -1,11 +1,13 @@
 import os
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .db import init_db   # DB init (creates tables if missing)
 from .ml import adapt # Import ML routes
 from .routers import ml_debug, practice, quiz, practice_v2
-from .routers import teacher, review
+from .routers import teacher, review, classes
+from .routers.teacher import require_teacher
+from .services import http_cache, import_jobs
 
 # Load environment from .env in the API folder when running via start-dev
 load_dotenv()
@@ -26,12 +28,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # paging cursor of /api/teacher/questions
+    expose_headers=["X-Next-After-Id"],
 )
 
+# Conditional GETs: a matching If-None-Match short-circuits to an empty 304
+@app.exception_handler(http_cache.NotModified)
+def _not_modified(request, exc: http_cache.NotModified):
+    return http_cache.not_modified_response(exc.etag)
+
 # Initialize DB on startup (creates tables if missing, keeps data)
 @app.on_event("startup")
 def _startup():
     init_db()
+    # pick up background imports interrupted by a restart
+    import_jobs.resume_pending()
 
 @app.get("/")
 def read_root():
@@ -57,6 +68,11 @@ def health_check():
         "message": "Backend API is operational"
     }
 
+@app.get("/api/metrics/http-cache", dependencies=[Depends(require_teacher)])
+def http_cache_metrics():
+    """ETag hit/miss counts for conditional GETs since startup"""
+    return http_cache.metrics()
+
 # ML routes
 app.include_router(adapt.router, prefix="/api/ml", tags=["ml"])
 app.include_router(ml_debug.router, prefix="/api/ml", tags=["ml"])
@@ -73,4 +89,5 @@ app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 
 # Teacher route
 app.include_router(teacher.router, prefix="/api/teacher", tags=["teacher"])
+app.include_router(classes.router, prefix="/api/teacher/classes", tags=["teacher"])
 app.include_router(review.router, prefix="/api/review", tags=["review"]) 
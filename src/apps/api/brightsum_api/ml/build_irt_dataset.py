@@ -33,6 +33,7 @@ if candidate_db.exists():
 from brightsum_api.db import get_session, engine, init_db
 from brightsum_api.models import PracticeInteraction, PracticeAttempt, MasteryState, Question
 from brightsum_api.models import Topic, User
+from brightsum_api.services.question_hash import content_hash
 
 OUT_DIR = Path(__file__).resolve().parents[0] / "datasets"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -151,7 +152,7 @@ def main():
             # Create some demo questions
             demo_questions = []
             for i in range(1, 13):
-                q = Question(topic_id=demo_topic.id, stem=f"Demo question {i}", answer="42", base_difficulty=('easy' if i%3==0 else 'medium' if i%3==1 else 'hard'), is_quiz_only=(i%4==0))
+                q = Question(topic_id=demo_topic.id, stem=f"Demo question {i}", answer="42", base_difficulty=('easy' if i%3==0 else 'medium' if i%3==1 else 'hard'), is_quiz_only=(i%4==0), content_hash=content_hash(f"Demo question {i}", "42"))
                 session.add(q)
                 demo_questions.append(q)
             session.commit()
@@ -0,0 +1,118 @@
+"""Computerized adaptive testing (CAT) on the topic mastery scale.
+
+Ability is the mastery in [0, 1] the IRT params are fitted against
+(p(correct) = sigmoid(w0 + w1 * mastery), see irt_selection.py), evaluated on a
+fixed quadrature grid of GRID_POINTS masteries:
+
+- an `ItemBank` precomputes log p, log(1 - p) and the Fisher information of
+  every item of a topic at every grid point, once per topic;
+- the log posterior after any number of responses is the normal prior plus
+  the sum of the answered items' precomputed rows, and the EAP estimate and
+  its standard error are its mean and standard deviation over the grid;
+- the prior is centred on the student's current mastery but only weakly
+  informative (PRIOR_SD): the fitted slopes are small (a median of about 1 per
+  unit of mastery), so each answer carries little evidence and a tighter prior
+  would outweigh a whole quiz of correct answers;
+- the next item is an unused one with the most information at the current
+  estimate, drawn among the RANDOMESQUE best so that the same few items are
+  not given to every student of similar ability.
+
+Questions without fitted params get a logistic curve located by their
+base_difficulty band with slope DEFAULT_SLOPE, so a topic that was never
+calibrated can still be tested adaptively. Questions whose fitted slope is not
+positive (a correct answer would count as evidence of lower mastery) are left
+out of the item bank.
+"""
+from __future__ import annotations
+
+import random
+from typing import Iterable, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from brightsum_api.ml.irt_selection import question_params
+
+GRID_POINTS = 41
+GRID = np.linspace(0.0, 1.0, GRID_POINTS)
+PRIOR_SD = 0.5
+DEFAULT_SLOPE = 4.0
+BAND_LOCATION = {"easy": 0.3, "medium": 0.5, "hard": 0.7}
+RANDOMESQUE = 3
+
+
+def item_params(qid: int, base_difficulty: str) -> Optional[Tuple[float, float]]:
+    """(w0, w1) of a question, falling back to a curve centred on its difficulty band.
+
+    None when the fitted slope is not positive; such a question can't be used.
+    """
+    params = question_params(qid)
+    if params is None:
+        return -DEFAULT_SLOPE * BAND_LOCATION.get(base_difficulty, 0.5), DEFAULT_SLOPE
+    return params if params[1] > 0 else None
+
+
+class ItemBank:
+    """Per-grid-point log likelihoods and information of a topic's items."""
+
+    def __init__(self, question_ids: Sequence[int], w0: Sequence[float], w1: Sequence[float]):
+        self.question_ids = list(question_ids)
+        self.index = {qid: i for i, qid in enumerate(self.question_ids)}
+        w0 = np.asarray(w0, dtype=float)[:, None]
+        w1 = np.asarray(w1, dtype=float)[:, None]
+        p = 1.0 / (1.0 + np.exp(-(w0 + w1 * GRID[None, :])))
+        p = np.clip(p, 1e-9, 1.0 - 1e-9)
+        self.log_p = np.log(p)
+        self.log_q = np.log1p(-p)
+        self.info = w1 ** 2 * p * (1.0 - p)
+
+    def __len__(self) -> int:
+        return len(self.question_ids)
+
+    def log_likelihood(self, responses: Iterable[Tuple[int, bool]]) -> np.ndarray:
+        """Summed log likelihood over the grid; questions no longer in the bank are skipped."""
+        total = np.zeros(GRID_POINTS)
+        for qid, is_correct in responses:
+            i = self.index.get(qid)
+            if i is not None:
+                total += self.log_p[i] if is_correct else self.log_q[i]
+        return total
+
+    def information(self, qid: int, ability: float) -> Optional[float]:
+        i = self.index.get(qid)
+        return float(self.info[i, grid_index(ability)]) if i is not None else None
+
+    def next_item(self, exclude: Set[int], ability: float) -> Optional[Tuple[int, float]]:
+        """(question_id, information at the estimate) of the next item, or None when all were used."""
+        info = self.info[:, grid_index(ability)].copy()
+        used = [self.index[qid] for qid in exclude if qid in self.index]
+        info[used] = -np.inf
+        available = len(self) - len(used)
+        if available <= 0:
+            return None
+        top = min(RANDOMESQUE, available)
+        best = np.argpartition(-info, top - 1)[:top]
+        i = int(random.choice(best))
+        return self.question_ids[i], float(info[i])
+
+
+def grid_index(ability: float) -> int:
+    return int(round(min(1.0, max(0.0, ability)) * (GRID_POINTS - 1)))
+
+
+def _posterior(log_likelihood: np.ndarray, prior_mean: float) -> np.ndarray:
+    log_post = log_likelihood - 0.5 * ((GRID - prior_mean) / PRIOR_SD) ** 2
+    weights = np.exp(log_post - log_post.max())
+    return weights / weights.sum()
+
+
+def pass_probability(log_likelihood: np.ndarray, prior_mean: float, threshold: float) -> float:
+    """Posterior probability that the ability is at least `threshold`."""
+    return float(_posterior(log_likelihood, prior_mean)[GRID >= threshold - 1e-9].sum())
+
+
+def estimate(log_likelihood: np.ndarray, prior_mean: float) -> Tuple[float, float]:
+    """EAP ability and its standard error (posterior mean and sd over the grid)."""
+    weights = _posterior(log_likelihood, prior_mean)
+    ability = float(weights @ GRID)
+    se = float(np.sqrt(weights @ (GRID - ability) ** 2))
+    return ability, se
@@ -1,7 +1,10 @@
 """Difficulty helper logic.
 
-This module exposes two helpers:
+This module exposes these helpers, all driven by the DIFFICULTY_BANDS table:
 - `map_prob_to_difficulty(prob_correct)` — map a probability to a difficulty band.
+- `difficulty_band(difficulty)` — the band of a numeric question difficulty.
+- `choose_target_difficulty(features)` — numeric target difficulty in [0,1]
+  for the next question (used with the per-topic difficulty index).
 - `choose_difficulty(features)` — try to call the correctness model to get
   probability of a correct answer and map that to a difficulty. Falls back to
   rule-based mapping when the model is unavailable or an error occurs.
@@ -11,19 +14,85 @@ from __future__ import annotations
 
 from typing import Any
 
+# The one band table shared by every difficulty helper: (band, lowest predicted
+# P(correct) of the student it is chosen for, lowest numeric question
+# difficulty it covers). Numeric difficulty is 1 - the question's accuracy,
+# as in ml/difficulty_index.py.
+DIFFICULTY_BANDS = (
+    ("easy", 0.0, 0.0),
+    ("medium", 0.5, 0.375),
+    ("hard", 0.8, 0.625),
+)
+
 
 def map_prob_to_difficulty(prob_correct: float) -> str:
     """Map predicted probability of a correct answer to an appropriate difficulty.
 
     `prob_correct` is expected in [0,1]. Returns one of "easy", "medium", "hard".
     """
-    if prob_correct >= 0.8:
+    band = DIFFICULTY_BANDS[0][0]
+    for name, min_prob, _min_difficulty in DIFFICULTY_BANDS:
+        if prob_correct >= min_prob:
+            band = name
+    return band
+
+
+def difficulty_band(difficulty: float) -> str:
+    """Map a numeric question difficulty in [0,1] back to an easy/medium/hard label."""
+    band = DIFFICULTY_BANDS[0][0]
+    for name, _min_prob, min_difficulty in DIFFICULTY_BANDS:
+        if difficulty >= min_difficulty:
+            band = name
+    return band
+
+
+def prob_to_target_difficulty(prob_correct: float) -> float:
+    """Numeric target difficulty for a student's P(correct), through the band table.
+
+    Piecewise linear: each band's P(correct) range maps onto the same band's
+    difficulty range, so `difficulty_band(prob_to_target_difficulty(p))` equals
+    `map_prob_to_difficulty(p)` for every p.
+    """
+    p = min(1.0, max(0.0, prob_correct))
+    edges = [(min_prob, min_difficulty) for _name, min_prob, min_difficulty in DIFFICULTY_BANDS] + [(1.0, 1.0)]
+    for (p0, d0), (p1, d1) in zip(edges, edges[1:]):
+        if p < p1 or p1 == 1.0:
+            return d0 + (p - p0) / (p1 - p0) * (d1 - d0)
+    return 1.0
+
+
+def _fallback_band(features: dict[str, Any]) -> str:
+    """Rule-based band when the correctness model is unavailable."""
+    mastery = float(features.get("mastery", 0.3))
+    correct_rate = float(features.get("correct_rate_topic", 0.3))
+    if mastery >= 0.8 or correct_rate >= 0.85:
         return "hard"
-    if prob_correct >= 0.5:
+    if mastery >= 0.4 or correct_rate >= 0.5:
         return "medium"
     return "easy"
 
 
+def choose_target_difficulty(features: dict[str, Any]) -> float:
+    """Return a numeric target difficulty in [0,1] for the next question.
+
+    The predicted probability of a correct answer is mapped through
+    DIFFICULTY_BANDS: the more likely the student is to succeed, the harder the
+    question we aim for, and `difficulty_band(choose_target_difficulty(f))`
+    gives the same band as `choose_difficulty(f)`. Falls back to the middle of
+    the rule-based band when the model is unavailable.
+    """
+    try:
+        from brightsum_api.ml.correctness_inference import predict_correctness_proba
+
+        prob = float(predict_correctness_proba(features))
+        return min(0.95, max(0.05, prob_to_target_difficulty(prob)))
+    except Exception:
+        band = _fallback_band(features)
+        edges = [d for _n, _p, d in DIFFICULTY_BANDS] + [1.0]
+        i = [n for n, _p, _d in DIFFICULTY_BANDS].index(band)
+        return (edges[i] + edges[i + 1]) / 2
+
+
 def choose_difficulty(features: dict[str, Any]) -> str:
     """Choose difficulty for a next question given `features`.
 
@@ -40,10 +109,4 @@ def choose_difficulty(features: dict[str, Any]) -> str:
         return map_prob_to_difficulty(prob)
     except Exception:
         # Fallback rule-based choice
-        mastery = float(features.get("mastery", 0.3))
-        correct_rate = float(features.get("correct_rate_topic", 0.3))
-        if mastery >= 0.8 or correct_rate >= 0.85:
-            return "hard"
-        if mastery >= 0.4 or correct_rate >= 0.5:
-            return "medium"
-        return "easy"
+        return _fallback_band(features)
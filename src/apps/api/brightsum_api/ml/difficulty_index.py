@@ -0,0 +1,240 @@
+"""Per-topic numeric difficulty index used by practice question selection.
+
+Every question gets a calibrated difficulty in [0, 1] (0 = everybody answers it
+correctly, 1 = nobody does). The value is the complement of a smoothed
+accuracy estimate:
+
+- the prior comes from the IRT params in ml/models/irt_question_params.json
+  (probability of a correct answer at mastery 0.5), or from the question's
+  `base_difficulty` band when the question has no params
+- observed practice answers are blended in as they arrive, so frequently
+  answered questions drift towards their real accuracy
+
+Questions are kept in per-topic arrays sorted by difficulty, so "the unseen
+question closest to target difficulty d" is a bisect plus a short outward scan
+instead of a pass over every question in the topic. Indexes are built lazily
+(one question query plus one grouped aggregate per topic) and kept current with
+`record_response(...)`. Teacher edits call `invalidate_topic(...)` so the next
+lookup rebuilds from the DB.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlmodel import Session, select
+
+from brightsum_api.ml.difficulty import difficulty_band  # noqa: F401 (re-exported)
+from brightsum_api.ml.irt_selection import question_info_at_mastery
+from brightsum_api.models import PracticeInteraction, Question
+
+# Prior probability of a correct answer for each base difficulty band
+BAND_PRIOR_P = {"easy": 0.75, "medium": 0.5, "hard": 0.25}
+# How many observed answers the prior is worth
+PRIOR_WEIGHT = 5.0
+# Mastery at which IRT params are evaluated to get a student-independent prior
+IRT_REFERENCE_MASTERY = 0.5
+# Neighbours `nearest` walks before switching to a pass over the available questions only
+NEAREST_SCAN_LIMIT = 256
+
+
+def _prior_p_correct(qid: int, base_difficulty: str) -> float:
+    meta = question_info_at_mastery(qid, IRT_REFERENCE_MASTERY)
+    if meta is not None:
+        return meta[0]
+    return BAND_PRIOR_P.get(base_difficulty, 0.5)
+
+
+class TopicDifficultyIndex:
+    """Sorted difficulty arrays for the questions of one topic."""
+
+    def __init__(
+        self,
+        topic_id: int,
+        questions: List[Tuple[int, str, bool]],
+        observed: Dict[int, Tuple[int, int]],
+    ):
+        self.topic_id = topic_id
+        # Dense, stable ordering of the topic's questions (ascending id). Bit i of
+        # a question mask refers to question_ids[i].
+        self.question_ids: List[int] = sorted(qid for qid, _b, _q in questions)
+        self.position: Dict[int, int] = {qid: i for i, qid in enumerate(self.question_ids)}
+        # Identifies this exact question set so persisted masks can be validated
+        self.signature = "%d:%08x" % (
+            len(self.question_ids),
+            zlib.crc32(",".join(map(str, self.question_ids)).encode()),
+        )
+        self.base_difficulty: Dict[int, str] = {qid: b for qid, b, _q in questions}
+        self.full_mask = (1 << len(self.question_ids)) - 1
+        self.quiz_only_mask = self.mask_of(qid for qid, _b, q in questions if q)
+        self._prior: Dict[int, float] = {qid: _prior_p_correct(qid, b) for qid, b, _q in questions}
+        self._counts: Dict[int, List[int]] = {
+            qid: list(observed.get(qid, (0, 0))) for qid in self.question_ids
+        }
+        self._difficulty: Dict[int, float] = {qid: self._calibrate(qid) for qid in self.question_ids}
+        pairs = sorted((d, qid) for qid, d in self._difficulty.items())
+        self._keys: List[float] = [d for d, _qid in pairs]
+        self._ids: List[int] = [qid for _d, qid in pairs]
+        self._lock = threading.Lock()
+
+    def _calibrate(self, qid: int) -> float:
+        correct, total = self._counts[qid]
+        p = (correct + PRIOR_WEIGHT * self._prior[qid]) / (total + PRIOR_WEIGHT)
+        return 1.0 - p
+
+    def __len__(self) -> int:
+        return len(self.question_ids)
+
+    def difficulty(self, qid: int) -> Optional[float]:
+        return self._difficulty.get(qid)
+
+    def mask_of(self, question_ids: Iterable[int]) -> int:
+        """Bitmask (over the dense index) of the given question ids; unknown ids are ignored."""
+        mask = 0
+        for qid in question_ids:
+            pos = self.position.get(qid)
+            if pos is not None:
+                mask |= 1 << pos
+        return mask
+
+    def ids_of(self, mask: int) -> List[int]:
+        return [qid for i, qid in enumerate(self.question_ids) if (mask >> i) & 1]
+
+    def has_available(self, exclude_mask: int = 0, practice_only: bool = True) -> bool:
+        """True if at least one question is outside `exclude_mask` (and not quiz-only if requested)."""
+        if practice_only:
+            exclude_mask |= self.quiz_only_mask
+        return (self.full_mask & ~exclude_mask) != 0
+
+    def nearest(
+        self,
+        target: float,
+        k: int = 1,
+        exclude_mask: int = 0,
+        practice_only: bool = True,
+    ) -> List[int]:
+        """Return up to k question ids whose difficulty is closest to `target`.
+
+        Questions whose bit is set in `exclude_mask` (and quiz-only questions when
+        `practice_only`) are skipped. Results are ordered by distance from the
+        target. The outward walk stops after NEAREST_SCAN_LIMIT neighbours; when
+        that many were excluded (a student who has seen most of the topic), the
+        few questions still available are read from the mask and ranked directly.
+        """
+        if practice_only:
+            exclude_mask |= self.quiz_only_mask
+        position = self.position
+        with self._lock:
+            keys, ids = self._keys, self._ids
+            hi = bisect.bisect_left(keys, target)
+            lo = hi - 1
+            out: List[int] = []
+            scanned = 0
+            while len(out) < k and (lo >= 0 or hi < len(ids)):
+                if scanned >= NEAREST_SCAN_LIMIT:
+                    return self._nearest_available(target, k, exclude_mask)
+                scanned += 1
+                # step towards whichever neighbour is closer to the target
+                if hi >= len(ids) or (lo >= 0 and target - keys[lo] <= keys[hi] - target):
+                    qid = ids[lo]
+                    lo -= 1
+                else:
+                    qid = ids[hi]
+                    hi += 1
+                if (exclude_mask >> position[qid]) & 1:
+                    continue
+                out.append(qid)
+            return out
+
+    def _nearest_available(self, target: float, k: int, exclude_mask: int) -> List[int]:
+        """Rank only the questions left outside `exclude_mask` (caller holds the lock)."""
+        available = self.full_mask & ~exclude_mask
+        candidates = []
+        while available:
+            low = available & -available
+            candidates.append(self.question_ids[low.bit_length() - 1])
+            available ^= low
+        candidates.sort(key=lambda qid: (abs(self._difficulty[qid] - target), self._difficulty[qid]))
+        return candidates[:k]
+
+    def record_response(self, qid: int, is_correct: bool) -> None:
+        """Fold one new answer into the question's difficulty and re-sort it."""
+        with self._lock:
+            if qid not in self._counts:
+                return
+            old = self._difficulty[qid]
+            counts = self._counts[qid]
+            counts[1] += 1
+            if is_correct:
+                counts[0] += 1
+            new = self._calibrate(qid)
+            self._difficulty[qid] = new
+            # locate and move the single entry; equal keys are ordered by id
+            pos = bisect.bisect_left(self._keys, old)
+            while self._ids[pos] != qid:
+                pos += 1
+            del self._keys[pos]
+            del self._ids[pos]
+            pos = bisect.bisect_left(self._keys, new)
+            self._keys.insert(pos, new)
+            self._ids.insert(pos, qid)
+
+
+_INDEXES: Dict[int, TopicDifficultyIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def _build_index(session: Session, topic_id: int) -> TopicDifficultyIndex:
+    questions = session.exec(
+        select(Question.id, Question.base_difficulty, Question.is_quiz_only).where(
+            Question.topic_id == topic_id
+        )
+    ).all()
+
+    observed_rows = session.exec(
+        select(
+            PracticeInteraction.question_id,
+            func.sum(case((PracticeInteraction.is_correct == True, 1), else_=0)),
+            func.count(PracticeInteraction.id),
+        )
+        .join(Question, Question.id == PracticeInteraction.question_id)
+        .where(Question.topic_id == topic_id, PracticeInteraction.is_correct.isnot(None))
+        .group_by(PracticeInteraction.question_id)
+    ).all()
+    observed = {qid: (int(correct or 0), int(total)) for qid, correct, total in observed_rows}
+
+    return TopicDifficultyIndex(
+        topic_id,
+        [(qid, base, bool(quiz_only)) for qid, base, quiz_only in questions],
+        observed,
+    )
+
+
+def get_topic_index(session: Session, topic_id: int) -> TopicDifficultyIndex:
+    """Return the (cached) difficulty index for a topic, building it if needed."""
+    index = _INDEXES.get(topic_id)
+    if index is not None:
+        return index
+    index = _build_index(session, topic_id)
+    with _INDEXES_LOCK:
+        # another request may have built it concurrently; keep the first one
+        return _INDEXES.setdefault(topic_id, index)
+
+
+def record_response(topic_id: int, question_id: int, is_correct: bool) -> None:
+    """Update a loaded index after a graded practice answer (no-op if not loaded)."""
+    index = _INDEXES.get(topic_id)
+    if index is not None:
+        index.record_response(question_id, is_correct)
+
+
+def invalidate_topic(topic_id: Optional[int] = None) -> None:
+    """Drop the cached index for a topic (or all topics) after content changes."""
+    with _INDEXES_LOCK:
+        if topic_id is None:
+            _INDEXES.clear()
+        else:
+            _INDEXES.pop(topic_id, None)
@@ -24,12 +24,22 @@ ML_DIR = Path(__file__).resolve().parents[0]
 PARAMS_FILE = ML_DIR / "models" / "irt_question_params.json"
 
 _PARAMS: Optional[Dict[int, Dict[str, float]]] = None
+_PARAMS_VERSION: Optional[float] = None
+
+
+def params_version() -> float:
+    """Modification time of the params file (0.0 when missing); changes when it is retrained."""
+    try:
+        return PARAMS_FILE.stat().st_mtime
+    except OSError:
+        return 0.0
 
 
 def _load_params() -> Dict[int, Dict[str, float]]:
-    global _PARAMS
+    global _PARAMS, _PARAMS_VERSION
     if _PARAMS is not None:
         return _PARAMS
+    _PARAMS_VERSION = params_version()
     if not PARAMS_FILE.exists():
         _PARAMS = {}
         return _PARAMS
@@ -42,6 +52,16 @@ def _load_params() -> Dict[int, Dict[str, float]]:
     return _PARAMS
 
 
+def refresh_params() -> float:
+    """Reload the params if the file changed since they were loaded; returns its version."""
+    global _PARAMS
+    version = params_version()
+    if _PARAMS is not None and version != _PARAMS_VERSION:
+        _PARAMS = None
+    _load_params()
+    return _PARAMS_VERSION
+
+
 def sigmoid(x: float) -> float:
     try:
         return 1.0 / (1.0 + math.exp(-x))
@@ -49,6 +69,12 @@ def sigmoid(x: float) -> float:
         return 0.0 if x < 0 else 1.0
 
 
+def question_params(qid: int) -> Optional[Tuple[float, float]]:
+    """(w0, w1) of a question, or None when it has no fitted params."""
+    params = _load_params().get(qid)
+    return (params["w0"], params["w1"]) if params is not None else None
+
+
 def question_info_at_mastery(qid: int, mastery: float) -> Optional[Tuple[float, float]]:
     params = _load_params()
     p = None
@@ -64,6 +90,20 @@ def question_info_at_mastery(qid: int, mastery: float) -> Optional[Tuple[float,
     return None
 
 
+def fallback_info(base_difficulty: str) -> Tuple[float, float]:
+    """(p, info) for a question without params: crude p=0.5, info scaled by difficulty band."""
+    # easy -> lower info; medium/hard -> slightly higher
+    diff = {"easy": 0.2, "medium": 0.5, "hard": 0.7}.get(base_difficulty, 0.5)
+    p = 0.5
+    return p, diff * p * (1 - p)
+
+
+def item_info(qid: int, base_difficulty: str, mastery: float) -> Tuple[float, float]:
+    """(p, info) at the given mastery, falling back to the difficulty band without params."""
+    meta = question_info_at_mastery(qid, mastery)
+    return meta if meta is not None else fallback_info(base_difficulty)
+
+
 def select_quiz_questions_irt(session: Session, user_id: int, topic_id: int, k: int = 10) -> List[Tuple[Question, float]]:
     """Select top-k questions by Fisher-style information at student's mastery.
 
@@ -82,24 +122,8 @@ def select_quiz_questions_irt(session: Session, user_id: int, topic_id: int, k:
 
     scored: List[Tuple[float, Question, float]] = []  # (score, question, p_correct)
     for q in candidates:
-        meta = question_info_at_mastery(q.id, mastery)
-        if meta is None:
-            # fallback heuristic: assign small info based on base_difficulty
-            # easy -> lower info; medium/hard -> slightly higher
-            diff = 0.5
-            if q.base_difficulty == 'easy':
-                diff = 0.2
-            elif q.base_difficulty == 'medium':
-                diff = 0.5
-            elif q.base_difficulty == 'hard':
-                diff = 0.7
-            # crude p around 0.5 to let these be selectable
-            p = 0.5
-            info = diff * p * (1 - p)
-            scored.append((info, q, p))
-        else:
-            p, info = meta
-            scored.append((info, q, p))
+        p, info = item_info(q.id, q.base_difficulty, mastery)
+        scored.append((info, q, p))
 
     # sort by info desc
     scored.sort(key=lambda t: t[0], reverse=True)
@@ -0,0 +1,332 @@
+"""MinHash / LSH index for near-duplicate question stems.
+
+Exact duplicates are caught by Question.content_hash; this index finds stems
+that were reworded slightly ("Solve for x: 2x + 3 = 11" vs "Solve for x:
+2x+3=11."). Each stem is normalized (services/question_hash.py), split into
+word / symbol tokens, and shingled into unigrams plus bigrams. A MinHash
+signature of NUM_PERM 32-bit values approximates the Jaccard similarity of two
+shingle sets by the fraction of equal signature slots.
+
+Signatures are split into BANDS bands of ROWS_PER_BAND values and every band is
+hashed into a bucket, so a lookup only compares the stem with questions sharing
+at least one bucket instead of scanning the bank. A pair with Jaccard
+similarity s shares a bucket with probability 1 - (1 - s**4)**16: 0.9998 at
+0.8, 0.988 at 0.7 and 0.64 at 0.5 (candidates below the threshold are dropped
+when their signatures are compared).
+
+The index covers the whole question bank, is built lazily in process memory
+with one query on first use and is then kept current with `add_question`,
+`remove_question` and `remove_topic` by the teacher endpoints and the importer.
+Lookups for a created, updated or imported question pass its topic_id, so only
+questions of the same topic are compared.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlmodel import Session, select
+
+from brightsum_api.models import Question
+from brightsum_api.services.question_hash import normalize_text
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+# Default estimated Jaccard similarity for reporting a pair as near-duplicate
+DEFAULT_THRESHOLD = 0.8
+
+_rng = np.random.RandomState(20240607)
+# multiply-shift hash family: h_i(x) = high 32 bits of (a_i * x + b_i) mod 2**64, a_i odd
+_PERM_A = _rng.randint(0, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.randint(0, 1 << 63, size=NUM_PERM, dtype=np.uint64)
+_SHIFT = np.uint64(32)
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+# per-row multipliers folding a band's ROWS_PER_BAND values into one bucket key
+_BAND_MULT = _rng.randint(1, 1 << 32, size=ROWS_PER_BAND, dtype=np.uint64)
+
+
+def shingles(stem: str) -> Set[str]:
+    tokens = _TOKEN_RE.findall(normalize_text(stem))
+    out = set(tokens)
+    out.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return out
+
+
+def signatures(stems: Sequence[str]) -> List[Optional[np.ndarray]]:
+    """MinHash signatures for many stems at once (None for stems without tokens).
+
+    All shingles are hashed and permuted in one vectorized pass and reduced per
+    stem, which is much cheaper than one small numpy computation per stem.
+    """
+    hashes: List[int] = []
+    counts: List[int] = []
+    for stem in stems:
+        sh = shingles(stem)
+        counts.append(len(sh))
+        hashes.extend(zlib.crc32(x.encode("utf-8")) for x in sh)
+    out: List[Optional[np.ndarray]] = [None] * len(counts)
+    if not hashes:
+        return out
+    # shingles repeat a lot across stems: permute each distinct hash once
+    unique, inverse = np.unique(np.asarray(hashes, dtype=np.uint64), return_inverse=True)
+    perm = ((unique[:, None] * _PERM_A + _PERM_B) >> _SHIFT).astype(np.uint32)[inverse]
+    nonempty = [i for i, n in enumerate(counts) if n]
+    starts = np.cumsum([0] + [counts[i] for i in nonempty[:-1]])
+    reduced = np.minimum.reduceat(perm, starts, axis=0)
+    for row, i in enumerate(nonempty):
+        out[i] = reduced[row]
+    return out
+
+
+def signature(stem: str) -> Optional[np.ndarray]:
+    """MinHash signature of a stem, or None when it has no tokens."""
+    return signatures([stem])[0]
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.count_nonzero(sig_a == sig_b)) / NUM_PERM
+
+
+def band_keys(sigs: np.ndarray) -> List[List[int]]:
+    """LSH bucket keys, one per band, for each row of a signature matrix."""
+    folded = sigs.reshape(len(sigs), BANDS, ROWS_PER_BAND).astype(np.uint64) * _BAND_MULT
+    return folded.sum(axis=2).tolist()
+
+
+def _band_keys(sig: np.ndarray) -> List[int]:
+    return band_keys(sig[None, :])[0]
+
+
+class NearDuplicateIndex:
+    """Signatures and LSH buckets for a set of questions.
+
+    Signatures live in rows of one uint32 matrix so the candidates of a lookup
+    are compared with a single vectorized comparison.
+    """
+
+    def __init__(self):
+        self.topic_of: Dict[int, int] = {}
+        self._slot_of: Dict[int, int] = {}
+        self._free_slots: List[int] = []
+        self._matrix = np.zeros((1024, NUM_PERM), dtype=np.uint32)
+        self._used = 0
+        self._band_keys: Dict[int, List[int]] = {}
+        self._buckets: List[Dict[int, Set[int]]] = [defaultdict(set) for _ in range(BANDS)]
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def signature_of(self, question_id: int) -> Optional[np.ndarray]:
+        slot = self._slot_of.get(question_id)
+        return None if slot is None else self._matrix[slot]
+
+    def _take_slot(self) -> int:
+        if self._free_slots:
+            return self._free_slots.pop()
+        if self._used == len(self._matrix):
+            grown = np.zeros((len(self._matrix) * 2, NUM_PERM), dtype=np.uint32)
+            grown[:self._used] = self._matrix
+            self._matrix = grown
+        self._used += 1
+        return self._used - 1
+
+    def add(self, question_id: int, topic_id: int, stem: str) -> None:
+        self.add_signature(question_id, topic_id, signature(stem))
+
+    def add_signature(
+        self, question_id: int, topic_id: int, sig: Optional[np.ndarray], keys: Optional[List[int]] = None
+    ) -> None:
+        self.remove(question_id)
+        if sig is None:
+            return
+        slot = self._take_slot()
+        self._matrix[slot] = sig
+        self._slot_of[question_id] = slot
+        self.topic_of[question_id] = topic_id
+        keys = keys if keys is not None else _band_keys(sig)
+        self._band_keys[question_id] = keys
+        for band, key in enumerate(keys):
+            self._buckets[band][key].add(question_id)
+
+    def remove(self, question_id: int) -> None:
+        keys = self._band_keys.pop(question_id, None)
+        if keys is None:
+            return
+        self._free_slots.append(self._slot_of.pop(question_id))
+        self.topic_of.pop(question_id, None)
+        for band, key in enumerate(keys):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(question_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def _score(self, sig: np.ndarray, ids: List[int]) -> np.ndarray:
+        rows = self._matrix[[self._slot_of[q] for q in ids]]
+        return np.count_nonzero(rows == sig, axis=1) / NUM_PERM
+
+    def query(
+        self,
+        stem: str,
+        threshold: float = DEFAULT_THRESHOLD,
+        exclude_id: Optional[int] = None,
+        topic_id: Optional[int] = None,
+        limit: int = 5,
+    ) -> List[Tuple[int, float]]:
+        """Return (question_id, estimated similarity) of the closest indexed stems."""
+        return self.query_signature(signature(stem), threshold, exclude_id, topic_id, limit)
+
+    def query_signature(
+        self,
+        sig: Optional[np.ndarray],
+        threshold: float = DEFAULT_THRESHOLD,
+        exclude_id: Optional[int] = None,
+        topic_id: Optional[int] = None,
+        limit: int = 5,
+        keys: Optional[List[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        if sig is None or not self._slot_of:
+            return []
+        candidates: Set[int] = set()
+        for band, key in enumerate(keys if keys is not None else _band_keys(sig)):
+            bucket = self._buckets[band].get(key)
+            if bucket:
+                candidates.update(bucket)
+        candidates.discard(exclude_id)
+        if topic_id is not None:
+            candidates = {q for q in candidates if self.topic_of.get(q) == topic_id}
+        if not candidates:
+            return []
+        ids = list(candidates)
+        sims = self._score(sig, ids)
+        scored = [(qid, float(sim)) for qid, sim in zip(ids, sims) if sim >= threshold]
+        scored.sort(key=lambda t: (-t[1], t[0]))
+        return scored[:limit]
+
+    def pairs(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        topic_id: Optional[int] = None,
+        max_pairs: int = 500,
+    ) -> List[Tuple[int, int, float]]:
+        """All indexed (id_a, id_b, similarity) pairs at or above threshold, most similar first."""
+        neighbours: Dict[int, Set[int]] = defaultdict(set)
+        for buckets in self._buckets:
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                ids = [m for m in members if topic_id is None or self.topic_of.get(m) == topic_id]
+                for m in ids:
+                    neighbours[m].update(ids)
+        found: List[Tuple[int, int, float]] = []
+        for a, others in neighbours.items():
+            later = [b for b in others if b > a]
+            if not later:
+                continue
+            sims = self._score(self._matrix[self._slot_of[a]], later)
+            found.extend((a, b, float(sim)) for b, sim in zip(later, sims) if sim >= threshold)
+        found.sort(key=lambda t: (-t[2], t[0], t[1]))
+        return found[:max_pairs]
+
+
+_INDEX: Optional[NearDuplicateIndex] = None
+_LOCK = threading.RLock()
+
+
+def get_index(session: Session) -> NearDuplicateIndex:
+    """Return the process-wide index, building it from the question bank on first use."""
+    global _INDEX
+    with _LOCK:
+        if _INDEX is None:
+            index = NearDuplicateIndex()
+            rows = session.exec(select(Question.id, Question.topic_id, Question.stem)).all()
+            for start in range(0, len(rows), 5000):
+                batch = rows[start:start + 5000]
+                sigs = signatures([r[2] for r in batch])
+                present = [i for i, sig in enumerate(sigs) if sig is not None]
+                if not present:
+                    continue
+                keys = band_keys(np.stack([sigs[i] for i in present]))
+                for i, k in zip(present, keys):
+                    qid, topic_id, _stem = batch[i]
+                    index.add_signature(qid, topic_id, sigs[i], k)
+            _INDEX = index
+        return _INDEX
+
+
+def find_similar(
+    session: Session,
+    stem,
+    threshold: float = DEFAULT_THRESHOLD,
+    exclude_id: Optional[int] = None,
+    topic_id: Optional[int] = None,
+    limit: int = 5,
+    keys: Optional[List[int]] = None,
+) -> List[Tuple[int, float]]:
+    """Near-duplicates of a stem (or of a precomputed signature and its band keys) in the question bank."""
+    sig = stem if isinstance(stem, np.ndarray) or stem is None else signature(stem)
+    with _LOCK:
+        return get_index(session).query_signature(sig, threshold, exclude_id, topic_id, limit, keys)
+
+
+def report(
+    session: Session, threshold: float = DEFAULT_THRESHOLD, topic_id: Optional[int] = None, max_pairs: int = 500
+) -> List[Tuple[int, int, float]]:
+    with _LOCK:
+        return get_index(session).pairs(threshold, topic_id, max_pairs)
+
+
+# Incremental maintenance: no-ops until the index has been built
+
+def add_question(question_id: int, topic_id: int, stem: str) -> None:
+    with _LOCK:
+        if _INDEX is not None:
+            _INDEX.add(question_id, topic_id, stem)
+
+
+def add_questions(rows: Sequence[Tuple[int, int, str]]) -> None:
+    """Index (question_id, topic_id, stem) rows, computing signatures in one batch."""
+    with _LOCK:
+        if _INDEX is None or not rows:
+            return
+        sigs = signatures([stem for _qid, _tid, stem in rows])
+        present = [i for i, sig in enumerate(sigs) if sig is not None]
+        keys = dict(zip(present, band_keys(np.stack([sigs[i] for i in present])))) if present else {}
+        for i, (qid, topic_id, _stem) in enumerate(rows):
+            _INDEX.add_signature(qid, topic_id, sigs[i], keys.get(i))
+
+
+def add_signatures(rows: Iterable[Tuple[int, int, Optional[np.ndarray], Optional[List[int]]]]) -> None:
+    """Index (question_id, topic_id, signature, band keys) rows computed by the caller."""
+    with _LOCK:
+        if _INDEX is not None:
+            for qid, topic_id, sig, keys in rows:
+                _INDEX.add_signature(qid, topic_id, sig, keys)
+
+
+def remove_question(question_id: int) -> None:
+    with _LOCK:
+        if _INDEX is not None:
+            _INDEX.remove(question_id)
+
+
+def remove_topic(topic_id: int) -> None:
+    with _LOCK:
+        if _INDEX is not None:
+            for qid in [q for q, t in _INDEX.topic_of.items() if t == topic_id]:
+                _INDEX.remove(qid)
+
+
+def reset() -> None:
+    """Forget the index; the next lookup rebuilds it from the DB."""
+    global _INDEX
+    with _LOCK:
+        _INDEX = None
@@ -1,9 +1,9 @@
 # SQLModel tables
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 from sqlmodel import SQLModel, Field
-from sqlalchemy import UniqueConstraint  # sqlmodel 0.0.22
+from sqlalchemy import Index, UniqueConstraint  # sqlmodel 0.0.22
 
 # Creates the User table
 class User(SQLModel, table=True):
@@ -54,12 +54,15 @@ class LessonSlide(SQLModel, table=True):
 
 # Reusable problem relating to a topic, FK on topic_id
 class Question(SQLModel, table=True):
+    __table_args__ = (Index("ux_question_topic_content_hash", "topic_id", "content_hash", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     topic_id: int = Field(foreign_key="topic.id", index=True)
     stem: str               # question text
     answer: str             # correct answer (string for now)
     base_difficulty: str = Field(index=True)  # "easy" | "medium" | "hard"
     is_quiz_only: bool = Field(default=False) # False => can be used in practice too
+    content_hash: Optional[str] = None        # services.question_hash.content_hash(stem, answer)
 
 
 # Hints associated with a question. Each hint has an optional level (1..3), an order,
@@ -83,6 +86,8 @@ class PracticeAttempt(SQLModel, table=True):
 
 # Essentially a log of a single question during a practice session, FK's on practiceattempt_id and question_id
 class PracticeInteraction(SQLModel, table=True):
+    __table_args__ = (Index("ix_practiceinteraction_user_answered", "user_id", "answered_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     attempt_id: int = Field(foreign_key="practiceattempt.id", index=True)
     question_id: int = Field(foreign_key="question.id", index=True)
@@ -91,6 +96,8 @@ class PracticeInteraction(SQLModel, table=True):
     is_correct: Optional[bool] = None
     hints_requested: int = 0
     time_seconds: Optional[float] = None     # time taken on this question
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id")  # copy of the attempt's user for time-window queries
+    answered_at: Optional[datetime] = None   # when the answer was graded (None while unanswered)
 
 # A single quiz run for one user on one topic
 class QuizAttempt(SQLModel, table=True):
@@ -101,10 +108,20 @@ class QuizAttempt(SQLModel, table=True):
     finished_at: Optional[datetime] = None
     score_percent: Optional[float] = None
     passed: Optional[bool] = None
+    # "fixed" (all questions chosen at start) or "cat" (adaptive, one question at a time)
+    mode: str = "fixed"
+    # CAT only: current ability estimate on the mastery scale, its standard error
+    # and the stopping rule the attempt was started with
+    ability: Optional[float] = None
+    ability_se: Optional[float] = None
+    max_questions: Optional[int] = None
+    target_se: Optional[float] = None
 
 
 # Mapping table to record which questions were selected for a QuizAttempt
 class QuizAttemptQuestion(SQLModel, table=True):
+    __table_args__ = (Index("ix_quizattemptquestion_user_answered", "user_id", "answered_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     attempt_id: int = Field(foreign_key="quizattempt.id", index=True)
     question_id: int = Field(foreign_key="question.id", index=True)
@@ -115,6 +132,8 @@ class QuizAttemptQuestion(SQLModel, table=True):
     given_answer: Optional[str] = None
     time_seconds: Optional[float] = None
     hints_requested: Optional[int] = None
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id")  # copy of the attempt's user
+    answered_at: Optional[datetime] = None
 
 # How well a user knows a given topic - FK's on user_id and topic_id
 class MasteryState(SQLModel, table=True):
@@ -122,4 +141,144 @@ class MasteryState(SQLModel, table=True):
     user_id: int = Field(foreign_key="user.id", index=True)
     topic_id: int = Field(foreign_key="topic.id", index=True)
     mastery: float  # 0.0–1.0
-    last_updated: datetime
\ No newline at end of file
+    last_updated: datetime
+
+
+# Compact record of which questions of a topic a user has been shown in practice.
+# Bit i is set when the i-th question of the topic's dense index (ascending id)
+# has been served; catalog_signature identifies the question set the bits refer
+# to so the row can be rebuilt when questions are added or removed.
+class SeenQuestionBitmap(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("user_id", "topic_id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    topic_id: int = Field(foreign_key="topic.id", index=True)
+    bits: bytes = b""
+    catalog_signature: str = ""
+    updated_at: Optional[datetime] = None
+
+
+# Pre-aggregated practice results per user, topic, shown difficulty and day.
+# Maintained on every graded practice answer so the review dashboard can be
+# served from a handful of grouped queries instead of the full history.
+class ReviewRollup(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("user_id", "topic_id", "difficulty", "day"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    topic_id: int = Field(foreign_key="topic.id", index=True)
+    difficulty: str                      # shown_difficulty of the interactions
+    day: date = Field(index=True)        # UTC day the answers were given
+    answered: int = 0
+    correct: int = 0
+    incorrect: int = 0
+    hints: int = 0
+    time_seconds: float = 0.0
+
+
+# A teacher's class (roster) of students
+class ClassGroup(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    teacher_id: int = Field(foreign_key="user.id", index=True)
+    name: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ClassMember(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("class_id", "user_id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    class_id: int = Field(foreign_key="classgroup.id", index=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    joined_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# Pre-aggregated activity of a class's current members, one row per
+# (class, topic, day), maintained by services/class_rollup.py on every practice
+# answer and quiz submit and when students join or leave the class.
+class ClassTopicRollup(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("class_id", "topic_id", "day"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    class_id: int = Field(foreign_key="classgroup.id", index=True)
+    topic_id: int = Field(foreign_key="topic.id", index=True)
+    day: date = Field(index=True)        # UTC day of the activity
+    answered: int = 0                    # graded practice answers
+    correct: int = 0
+    hints: int = 0
+    time_seconds: float = 0.0
+    quizzes: int = 0                     # submitted quiz attempts
+    quizzes_passed: int = 0
+    quiz_score_sum: float = 0.0          # sum of score_percent
+
+# Running item-analysis statistics of one question over all graded practice and
+# quiz answers (services/question_stats.py). The sums are updated in O(1) per
+# answer and the derived columns recomputed from them, so the teacher view can
+# sort and filter a whole bank without reading the answer history. The
+# mastery_* sums only cover answers whose student had a mastery estimate.
+class QuestionStats(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    question_id: int = Field(foreign_key="question.id", unique=True)
+    attempts: int = 0
+    correct: int = 0
+    time_n: int = 0                      # answers with a recorded time
+    time_sum: float = 0.0
+    hints_n: int = 0                     # answers with a recorded hint count
+    hints_sum: int = 0
+    mastery_n: int = 0
+    mastery_correct: int = 0
+    mastery_sum: float = 0.0
+    mastery_sq_sum: float = 0.0
+    mastery_correct_sum: float = 0.0     # sum of mastery over correct answers
+    # derived from the sums above
+    p_value: Optional[float] = Field(default=None, index=True)         # proportion correct
+    mean_time_seconds: Optional[float] = None
+    mean_hints: Optional[float] = None
+    discrimination: Optional[float] = Field(default=None, index=True)  # point-biserial r(correct, mastery)
+    updated_at: Optional[datetime] = None
+
+
+# A teacher CSV import processed in the background. The upload is kept on disk
+# at upload_path until the job ends; processed_rows is committed together with
+# each chunk of imported questions, so a job interrupted by a restart resumes
+# after the last committed row.
+class ImportJob(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    created_by: int = Field(foreign_key="user.id", index=True)
+    filename: Optional[str] = None
+    upload_path: str
+    status: str = Field(default="queued", index=True)  # queued | running | completed | failed | cancelled
+    cancel_requested: bool = False
+    # worker process running the job and the last time it reported progress,
+    # see services/import_jobs.py
+    claimed_by: Optional[str] = None
+    heartbeat_at: Optional[datetime] = None
+    total_rows: Optional[int] = None
+    processed_rows: int = 0
+    created: int = 0
+    duplicate: int = 0
+    failed: int = 0
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+# Row-level outcome of an ImportJob, same shape as the synchronous import's "rows"
+class ImportJobRow(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    job_id: int = Field(foreign_key="importjob.id", index=True)
+    row: int
+    status: str                           # created | duplicate | failed
+    question_id: Optional[int] = None
+    error: Optional[str] = None
+    near_duplicates: Optional[str] = None  # JSON list of near-duplicate candidates of a created row
+
+
+# Version counters behind the ETags of services/http_cache.py: "content" for
+# topic/question data and "user:<email>" per student. Kept in the DB so every
+# worker process validates ETags against the same versions.
+class CacheVersion(SQLModel, table=True):
+    key: str = Field(primary_key=True)
+    version: int = 0
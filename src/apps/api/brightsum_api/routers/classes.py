@@ -0,0 +1,223 @@
+"""Teacher class rosters and class-level analytics.
+
+Endpoints (all under /api/teacher/classes, teacher or admin only):
+- GET    /                       - the teacher's classes with member counts
+- POST   /                       - create a class
+- DELETE /{class_id}             - delete a class, its roster and rollup
+- GET    /{class_id}/members     - list members
+- POST   /{class_id}/members     - add students by email
+- DELETE /{class_id}/members/{user_id} - remove a student
+- GET    /{class_id}/analytics   - per-topic and per-day activity of the class
+- GET    /{class_id}/live        - Server-Sent Events with the class's live activity
+
+Analytics read the ClassTopicRollup rows (services/class_rollup.py), so their
+cost depends on the number of topics and days shown, not on the class size.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import delete, func
+from sqlmodel import Session, select
+
+from brightsum_api import auth
+from brightsum_api.db import get_session
+from brightsum_api.models import ClassGroup, ClassMember, ClassTopicRollup, Topic, User
+from brightsum_api.routers.teacher import require_teacher
+from brightsum_api.services import class_rollup, event_bus
+
+router = APIRouter()
+
+
+class ClassIn(BaseModel):
+    name: str
+
+
+class MembersIn(BaseModel):
+    emails: List[str]
+
+
+def _owned_class(session: Session, class_id: int, user: User) -> ClassGroup:
+    group = session.get(ClassGroup, class_id)
+    if group is None or (group.teacher_id != user.id and user.role != "admin"):
+        raise HTTPException(status_code=404, detail="Class not found")
+    return group
+
+
+def _class_out(group: ClassGroup, members: int) -> dict:
+    return {"id": group.id, "name": group.name, "teacher_id": group.teacher_id, "created_at": group.created_at, "members": members}
+
+
+@router.get("")
+def list_classes(session: Session = Depends(get_session), user=Depends(require_teacher)):
+    rows = session.exec(
+        select(ClassGroup, func.count(ClassMember.id))
+        .outerjoin(ClassMember, ClassMember.class_id == ClassGroup.id)
+        .where(ClassGroup.teacher_id == user.id)
+        .group_by(ClassGroup.id)
+        .order_by(ClassGroup.name)
+    ).all()
+    return [_class_out(group, members) for group, members in rows]
+
+
+@router.post("", status_code=201)
+def create_class(body: ClassIn, session: Session = Depends(get_session), user=Depends(require_teacher)):
+    if not body.name.strip():
+        raise HTTPException(status_code=400, detail="Class name is required")
+    group = ClassGroup(teacher_id=user.id, name=body.name.strip())
+    session.add(group)
+    session.commit()
+    session.refresh(group)
+    return _class_out(group, 0)
+
+
+@router.delete("/{class_id}")
+def delete_class(class_id: int, session: Session = Depends(get_session), user=Depends(require_teacher)):
+    _owned_class(session, class_id, user)
+    conn = session.connection()
+    conn.execute(delete(ClassTopicRollup).where(ClassTopicRollup.class_id == class_id))
+    conn.execute(delete(ClassMember).where(ClassMember.class_id == class_id))
+    conn.execute(delete(ClassGroup).where(ClassGroup.id == class_id))
+    session.commit()
+    return {"message": "deleted"}
+
+
+@router.get("/{class_id}/members")
+def list_members(class_id: int, session: Session = Depends(get_session), user=Depends(require_teacher)):
+    _owned_class(session, class_id, user)
+    rows = session.exec(
+        select(User.id, User.email, ClassMember.joined_at)
+        .join(ClassMember, ClassMember.user_id == User.id)
+        .where(ClassMember.class_id == class_id)
+        .order_by(User.email)
+    ).all()
+    return [{"user_id": uid, "email": email, "joined_at": joined_at} for uid, email, joined_at in rows]
+
+
+@router.post("/{class_id}/members")
+def add_members(class_id: int, body: MembersIn, session: Session = Depends(get_session), user=Depends(require_teacher)):
+    """Add students by email; their existing history is added to the class rollup."""
+    _owned_class(session, class_id, user)
+    emails = {e.strip().lower() for e in body.emails if e.strip()}
+    users = session.exec(select(User.id, User.email).where(func.lower(User.email).in_(emails))).all() if emails else []
+    already = set(session.exec(select(ClassMember.user_id).where(ClassMember.class_id == class_id)).all())
+    added = []
+    for uid, email in users:
+        if uid in already:
+            continue
+        session.add(ClassMember(class_id=class_id, user_id=uid))
+        class_rollup.add_member_history(session, class_id, uid)
+        added.append(email)
+    session.commit()
+    found = {email.lower() for _uid, email in users}
+    return {"added": sorted(added), "already_members": sorted(e for uid, e in users if uid in already), "not_found": sorted(emails - found)}
+
+
+@router.delete("/{class_id}/members/{user_id}")
+def remove_member(class_id: int, user_id: int, session: Session = Depends(get_session), user=Depends(require_teacher)):
+    _owned_class(session, class_id, user)
+    member = session.exec(
+        select(ClassMember).where(ClassMember.class_id == class_id, ClassMember.user_id == user_id)
+    ).first()
+    if member is None:
+        raise HTTPException(status_code=404, detail="Student is not in this class")
+    class_rollup.add_member_history(session, class_id, user_id, sign=-1)
+    session.delete(member)
+    session.commit()
+    return {"message": "removed"}
+
+
+def _ratio(num: float, den: float, digits: int = 3) -> Optional[float]:
+    return round(num / den, digits) if den else None
+
+
+@router.get("/{class_id}/analytics")
+def class_analytics(
+    class_id: int,
+    days: int = 30,
+    topic: Optional[str] = None,
+    session: Session = Depends(get_session),
+    user=Depends(require_teacher),
+):
+    """Accuracy, hints, time and quiz results by topic and by day over the last `days` days."""
+    group = _owned_class(session, class_id, user)
+    days = max(1, min(days, 366))
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    where = [ClassTopicRollup.class_id == class_id, ClassTopicRollup.day >= since]
+    if topic:
+        topic_id = session.exec(select(Topic.id).where(Topic.slug == topic)).first()
+        if topic_id is None:
+            raise HTTPException(status_code=404, detail="Topic not found")
+        where.append(ClassTopicRollup.topic_id == topic_id)
+    sums = [func.sum(getattr(ClassTopicRollup, name)) for name in class_rollup.COUNTERS]
+
+    by_topic = session.exec(
+        select(ClassTopicRollup.topic_id, Topic.slug, Topic.name, *sums)
+        .join(Topic, Topic.id == ClassTopicRollup.topic_id)
+        .where(*where)
+        .group_by(ClassTopicRollup.topic_id, Topic.slug, Topic.name)
+        .order_by(Topic.name)
+    ).all()
+    by_day = session.exec(
+        select(ClassTopicRollup.day, *sums).where(*where).group_by(ClassTopicRollup.day).order_by(ClassTopicRollup.day)
+    ).all()
+    members = session.exec(select(func.count(ClassMember.id)).where(ClassMember.class_id == class_id)).one()
+
+    def summary(answered, correct, hints, seconds, quizzes, passed, score_sum) -> dict:
+        return {
+            "answered": answered,
+            "correct": correct,
+            "accuracy": _ratio(correct, answered),
+            "hints_per_answer": _ratio(hints, answered, 2),
+            "avg_time_seconds": _ratio(seconds, answered, 1),
+            "quizzes": quizzes,
+            "quiz_pass_rate": _ratio(passed, quizzes),
+            "avg_quiz_score": _ratio(score_sum, quizzes, 1),
+        }
+
+    return {
+        "class": _class_out(group, members),
+        "since": since,
+        "topics": [
+            {"topic_id": tid, "slug": slug, "name": name, **summary(*values)}
+            for tid, slug, name, *values in by_topic
+        ],
+        "daily": [{"day": day, **summary(*values)} for day, *values in by_day],
+    }
+
+
+def _live_class(
+    class_id: int,
+    request: Request,
+    token: Optional[str] = None,
+    session: Session = Depends(get_session),
+) -> int:
+    """Authorize a live stream; EventSource can't send headers, so ?token= works too."""
+    header = request.headers.get("authorization", "")
+    raw = header[7:] if header.lower().startswith("bearer ") else token
+    email = auth.token_subject(raw) if raw else None
+    user = session.exec(select(User).where(User.email == email)).first() if email else None
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    _owned_class(session, class_id, require_teacher(user))
+    return class_id
+
+
+@router.get("/{class_id}/live")
+async def class_live(request: Request, class_id: int = Depends(_live_class)):
+    """Stream the class's answers, mastery changes, hint requests and quizzes as they happen.
+
+    Each event is a delta (see services/event_bus.py), coalesced per student
+    over a short window; "resync" means events were dropped and the client
+    should reload the analytics.
+    """
+    sub = event_bus.subscribe(class_id)
+    return StreamingResponse(
+        event_bus.stream(sub, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
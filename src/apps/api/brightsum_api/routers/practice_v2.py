@@ -12,12 +12,13 @@ from __future__ import annotations
 from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Path
 from pydantic import BaseModel, Field
+from sqlalchemy import Float, case, cast, func, update
 from sqlmodel import Session, select
 
 from brightsum_api.auth import current_user
-from brightsum_api.db import get_session
+from brightsum_api.db import engine, get_session
 from brightsum_api.models import (
     User,
     Topic,
@@ -27,9 +28,14 @@ from brightsum_api.models import (
     PracticeInteraction,
     MasteryState,
 )
-from brightsum_api.ml.difficulty import choose_difficulty
+from brightsum_api.ml.difficulty import choose_target_difficulty
+from brightsum_api.ml.difficulty_index import difficulty_band, get_topic_index, record_response
 from brightsum_api.ml.hint_inference import predict_hint_level
 from brightsum_api.ml.mastery import update_mastery
+from brightsum_api.services import class_rollup, event_bus, http_cache, practice_prefetch, practice_session, question_stats, review_rollup
+from brightsum_api.services.practice_prefetch import AttemptPrefetch, PrefetchedQuestion
+from brightsum_api.services.practice_session import PracticeSessionState
+from brightsum_api.services.seen_questions import get_seen_mask, mark_seen
 import random
 
 router = APIRouter()
@@ -80,6 +86,8 @@ class PracticeSubmitRequest(BaseModel):
     """Submit an answer for the current question."""
     answer_submitted: str
     time_seconds: Optional[float] = None
+    # the question being answered; when sent, a submit for any other question is rejected
+    question_id: Optional[int] = None
 
 
 class PracticeSubmitResponse(BaseModel):
@@ -112,9 +120,17 @@ class PracticeHintResponse(BaseModel):
 
 # Helpers
 def get_student_features(
-    session: Session, user_id: int, topic_id: int, question: Question
+    session: Session,
+    user_id: int,
+    topic_id: int,
+    question: Question,
+    assume_correct: Optional[bool] = None,
 ) -> dict:
-    """Calculate ML features for a student on a given topic/question."""
+    """Calculate ML features for a student on a given topic/question.
+
+    `assume_correct` projects the features as if the student's pending answer
+    had already been graded that way (used for speculative prefetch).
+    """
 
     # Get mastery state
     mastery_state = session.exec(
@@ -124,35 +140,32 @@ def get_student_features(
     ).first()
 
     mastery = mastery_state.mastery if mastery_state else 0.3
-
-    # Get past interactions for this topic
-    past_attempts = session.exec(
-        select(PracticeAttempt).where(
+    if assume_correct is not None:
+        # mirror the mastery update submit_practice_answer will make
+        if mastery_state:
+            mastery = update_mastery(mastery, assume_correct)
+        else:
+            mastery = 0.5 if assume_correct else 0.2
+
+    # Topic-level statistics over all of the student's past interactions,
+    # aggregated in the DB
+    total_interactions, correct_count, total_time, total_hints_used = session.exec(
+        select(
+            func.count(PracticeInteraction.id),
+            func.coalesce(func.sum(case((PracticeInteraction.is_correct == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(PracticeInteraction.time_seconds), 0.0),
+            func.coalesce(func.sum(PracticeInteraction.hints_requested), 0),
+        )
+        .join(PracticeAttempt, PracticeAttempt.id == PracticeInteraction.attempt_id)
+        .where(
             PracticeAttempt.user_id == user_id,
             PracticeAttempt.topic_id == topic_id,
         )
-    ).all()
+    ).one()
 
-    # Calculate topic-level statistics
-    total_interactions = 0
-    correct_count = 0
-    total_time = 0.0
-    total_hints_used = 0
-
-    for attempt in past_attempts:
-        interactions = session.exec(
-            select(PracticeInteraction).where(
-                PracticeInteraction.attempt_id == attempt.id
-            )
-        ).all()
-
-        for interaction in interactions:
-            total_interactions += 1
-            if interaction.is_correct:
-                correct_count += 1
-            if interaction.time_seconds:
-                total_time += interaction.time_seconds
-            total_hints_used += interaction.hints_requested
+    # The pending interaction is already counted in total_interactions
+    if assume_correct:
+        correct_count += 1
 
     # Calculate averages
     correct_rate_topic = (
@@ -172,114 +185,134 @@ def get_student_features(
     }
 
 
+# How many of the questions nearest to the target difficulty are considered
+# for the weighted pick.
+CANDIDATE_WINDOW = 8
+
+
 def select_next_question(
-    session: Session, user_id: int, topic_id: int, completed_question_ids: List[int]
+    session: Session,
+    user_id: int,
+    topic_id: int,
+    completed_question_ids: List[int],
+    assume_correct: Optional[bool] = None,
 ) -> tuple[Question, str]:
     """Select the next question using ML-based difficulty adaptation.
 
+    The correctness model gives a numeric target difficulty; the topic's
+    difficulty index then supplies the few questions closest to that target
+    (preferring ones the student has never seen) and one is sampled with a
+    bias towards questions the student often gets wrong. `assume_correct` is
+    passed through to `get_student_features` for speculative selection.
+
     Returns: (question, shown_difficulty)
     """
 
-    # Get all available questions for this topic
-    available_questions = session.exec(
-        select(Question)
-        .where(Question.topic_id == topic_id)
-        .where(Question.is_quiz_only == False)
-        .where(Question.id.notin_(completed_question_ids) if completed_question_ids else True)
-    ).all()
+    index = get_topic_index(session, topic_id)
+    completed_mask = index.mask_of(completed_question_ids)
 
-    if not available_questions:
-        # If all non-quiz questions completed, try quiz questions
-        available_questions = session.exec(
-            select(Question)
-            .where(Question.topic_id == topic_id)
-            .where(Question.id.notin_(completed_question_ids) if completed_question_ids else True)
-        ).all()
-
-    if not available_questions:
+    # Practice questions first; once those are exhausted fall back to quiz-only ones
+    practice_only = index.has_available(completed_mask, practice_only=True)
+    if not practice_only and not index.has_available(completed_mask, practice_only=False):
         raise HTTPException(status_code=404, detail="No more questions available")
 
-    # Use ML to determine target difficulty
-    # Pick a representative question to get features
     # Prefer questions the student has not seen before across past attempts.
-    # Query past attempts for this user/topic and collect seen question ids.
-    attempt_ids = [a.id for a in session.exec(
-        select(PracticeAttempt).where(
-            PracticeAttempt.user_id == user_id,
-            PracticeAttempt.topic_id == topic_id,
-        )
-    ).all()]
-
-    seen_question_ids: set[int] = set()
-    if attempt_ids:
-        interactions = session.exec(
-            select(PracticeInteraction).where(PracticeInteraction.attempt_id.in_(attempt_ids))
-        ).all()
-        seen_question_ids = {i.question_id for i in interactions}
-
-    unseen_questions = [q for q in available_questions if q.id not in seen_question_ids]
+    seen_mask = get_seen_mask(session, user_id, topic_id, index)
 
     # Choose a sample question for feature extraction; prefer an unseen question
-    sample_question = unseen_questions[0] if unseen_questions else available_questions[0]
-    features = get_student_features(session, user_id, topic_id, sample_question)
+    sample_ids = index.nearest(0.5, 1, completed_mask | seen_mask, practice_only) or index.nearest(
+        0.5, 1, completed_mask, practice_only
+    )
+    sample_question = session.get(Question, sample_ids[0])
+    features = get_student_features(session, user_id, topic_id, sample_question, assume_correct)
 
     try:
-        target_difficulty = choose_difficulty(features)
+        target = choose_target_difficulty(features)
     except Exception:
         # Fallback to medium if ML fails
-        target_difficulty = "medium"
-
-    # Find a question matching the target difficulty. Prefer unseen questions
-    matching_questions = [q for q in available_questions if q.base_difficulty == target_difficulty]
-    unseen_matching = [q for q in matching_questions if q.id not in seen_question_ids]
-
-    if unseen_matching:
-        matching_questions = unseen_matching
-
-    if matching_questions:
-        # Weight selection so unseen or often-wrong questions are more likely.
-        # Build stats for candidate questions from past interactions.
-        candidate_ids = [q.id for q in matching_questions]
-        past_interactions_for_candidates = []
-        if attempt_ids:
-            past_interactions_for_candidates = session.exec(
-                select(PracticeInteraction).where(
-                    PracticeInteraction.attempt_id.in_(attempt_ids),
-                    PracticeInteraction.question_id.in_(candidate_ids),
-                )
-            ).all()
-
-        # Map question_id -> [correct_count, total_count]
-        stats: dict[int, list[int]] = {qid: [0, 0] for qid in candidate_ids}
-        for it in past_interactions_for_candidates:
-            stats[it.question_id][1] += 1
-            if it.is_correct:
-                stats[it.question_id][0] += 1
-
-        weights: list[float] = []
-        for q in matching_questions:
-            correct, total = stats.get(q.id, [0, 0])
-            if total == 0:
-                # Unseen questions get a boost
-                w = 3.0
-            else:
-                correctness_rate = correct / total
-                # The more often the user got it wrong, the higher the weight.
-                # weight ranges from 0.1 (always correct) to 1.0 (always wrong)
-                w = 0.1 + 0.9 * (1.0 - correctness_rate)
-            weights.append(w)
-
-        # If all weights are zero for some reason, fallback to first
-        if sum(weights) == 0:
-            selected_question = matching_questions[0]
-        else:
-            selected_question = random.choices(matching_questions, weights=weights, k=1)[0]
+        target = 0.5
+
+    # Questions closest to the target difficulty. Prefer unseen questions
+    candidate_ids = index.nearest(target, CANDIDATE_WINDOW, completed_mask | seen_mask, practice_only)
+    if not candidate_ids:
+        candidate_ids = index.nearest(target, CANDIDATE_WINDOW, completed_mask, practice_only)
+
+    # Weight selection so unseen or often-wrong questions are more likely.
+    # Unseen questions get a boost (3.0). For questions the student has seen,
+    # the more often they got it wrong the higher the weight: from 0.1 (always
+    # correct) to 1.0 (always wrong). Computed per candidate in the DB.
+    weight_by_id: dict[int, float] = {}
+    if candidate_ids and index.mask_of(candidate_ids) & seen_mask:
+        correct_rate = cast(
+            func.sum(case((PracticeInteraction.is_correct == True, 1), else_=0)), Float
+        ) / func.count(PracticeInteraction.id)
+        weight_by_id = dict(session.exec(
+            select(PracticeInteraction.question_id, 0.1 + 0.9 * (1.0 - correct_rate))
+            .join(PracticeAttempt, PracticeAttempt.id == PracticeInteraction.attempt_id)
+            .where(
+                PracticeAttempt.user_id == user_id,
+                PracticeAttempt.topic_id == topic_id,
+                PracticeInteraction.question_id.in_(candidate_ids),
+            )
+            .group_by(PracticeInteraction.question_id)
+        ).all())
+    weights = [weight_by_id.get(qid, 3.0) for qid in candidate_ids]
+
+    # If all weights are zero for some reason, fallback to the closest question
+    if sum(weights) == 0:
+        selected_id = candidate_ids[0]
     else:
-        # Fallback to any available question
-        selected_question = available_questions[0]
-        target_difficulty = selected_question.base_difficulty
+        selected_id = random.choices(candidate_ids, weights=weights, k=1)[0]
+
+    selected_question = session.get(Question, selected_id)
+    return selected_question, difficulty_band(index.difficulty(selected_id))
+
+
+def prefetch_next_question(
+    attempt_id: int,
+    user_id: int,
+    topic_id: int,
+    interaction_id: int,
+    question_id: int,
+    completed_question_ids: List[int],
+):
+    """Background task: select the question after `question_id` for both outcomes.
 
-    return selected_question, target_difficulty
+    Runs after the current question has been served, in its own DB session, and
+    stores the result in the prefetch store for submit_practice_answer to use.
+    """
+    try:
+        with Session(engine) as session:
+            index = get_topic_index(session, topic_id)
+            # the feature inputs this selection sees for the pending interaction,
+            # so submit can tell whether hints or answer time changed them
+            pending = session.get(PracticeInteraction, interaction_id)
+            interactions, time_total = session.exec(
+                select(func.count(PracticeInteraction.id), func.coalesce(func.sum(PracticeInteraction.time_seconds), 0.0))
+                .join(PracticeAttempt, PracticeAttempt.id == PracticeInteraction.attempt_id)
+                .where(PracticeAttempt.user_id == user_id, PracticeAttempt.topic_id == topic_id)
+            ).one()
+            prefetch = AttemptPrefetch(
+                interaction_id=interaction_id,
+                catalog_signature=index.signature,
+                hints_requested=(pending.hints_requested or 0) if pending else 0,
+                interactions=interactions,
+                time_total=time_total,
+            )
+            completed = list(completed_question_ids) + [question_id]
+            for outcome in (True, False):
+                try:
+                    q, shown = select_next_question(session, user_id, topic_id, completed, assume_correct=outcome)
+                except HTTPException:
+                    # nothing left on this branch; submit will find that out itself
+                    continue
+                prefetch.branches[outcome] = PrefetchedQuestion(
+                    question_id=q.id, stem=q.stem, base_difficulty=q.base_difficulty, shown_difficulty=shown
+                )
+            practice_prefetch.store(attempt_id, prefetch)
+    except Exception as e:
+        # prefetch is best-effort; submit falls back to synchronous selection
+        print(f"[practice.prefetch] attempt={attempt_id} failed: {e}")
 
 
 @router.get("/topics", response_model=List[PracticeTopicSummary])
@@ -287,43 +320,39 @@ def list_practice_topics(
     session: Session = Depends(get_session),
     user: User = Depends(current_user),
 ):
-    """Return a list of topics plus per-user mastery and progress counts."""
-    topics = session.exec(select(Topic)).all()
-    out: List[PracticeTopicSummary] = []
+    """Return a list of topics plus per-user mastery and progress counts.
 
-    for t in topics:
-        # total non-quiz questions
-        total_q = session.exec(
-            select(Question).where(Question.topic_id == t.id, Question.is_quiz_only == False)
-        ).all()
-        total_questions = len(total_q)
-
-        # completed questions by this user (distinct question ids answered)
-        # find attempts for user/topic
-        attempts = session.exec(
-            select(PracticeAttempt).where(
-                PracticeAttempt.user_id == user.id, PracticeAttempt.topic_id == t.id
-            )
-        ).all()
-        completed_qids = set()
-        if attempts:
-            attempt_ids = [a.id for a in attempts]
-            interactions = session.exec(
-                select(PracticeInteraction).where(
-                    PracticeInteraction.attempt_id.in_(attempt_ids),
-                    PracticeInteraction.answer_submitted.isnot(None),
-                )
-            ).all()
-            completed_qids = {i.question_id for i in interactions}
+    Counts come from grouped queries over all topics at once, so the number of
+    queries does not depend on how many topics exist.
+    """
+    topics = session.exec(select(Topic)).all()
 
-        completed_questions = len(completed_qids)
+    # total non-quiz questions per topic
+    question_counts = dict(session.exec(
+        select(Question.topic_id, func.count(Question.id))
+        .where(Question.is_quiz_only == False)
+        .group_by(Question.topic_id)
+    ).all())
+
+    # completed questions by this user (distinct question ids answered) per topic
+    completed_counts = dict(session.exec(
+        select(PracticeAttempt.topic_id, func.count(func.distinct(PracticeInteraction.question_id)))
+        .join(PracticeInteraction, PracticeInteraction.attempt_id == PracticeAttempt.id)
+        .where(
+            PracticeAttempt.user_id == user.id,
+            PracticeInteraction.answer_submitted.isnot(None),
+        )
+        .group_by(PracticeAttempt.topic_id)
+    ).all())
 
-        # mastery state if present
-        ms = session.exec(
-            select(MasteryState).where(MasteryState.user_id == user.id, MasteryState.topic_id == t.id)
-        ).first()
-        mastery = round(ms.mastery, 3) if ms else None
+    # mastery state per topic if present
+    mastery_by_topic = dict(session.exec(
+        select(MasteryState.topic_id, MasteryState.mastery).where(MasteryState.user_id == user.id)
+    ).all())
 
+    out: List[PracticeTopicSummary] = []
+    for t in topics:
+        mastery = mastery_by_topic.get(t.id)
         out.append(
             PracticeTopicSummary(
                 id=t.id,
@@ -331,16 +360,20 @@ def list_practice_topics(
                 name=t.name,
                 description=t.description,
                 estimated_time_min=t.estimated_time_min,
-                total_questions=total_questions,
-                completed_questions=completed_questions,
-                mastery=mastery,
+                total_questions=question_counts.get(t.id, 0),
+                completed_questions=completed_counts.get(t.id, 0),
+                mastery=round(mastery, 3) if mastery is not None else None,
             )
         )
 
     return out
 
 
-@router.get("/{topic_slug}", response_model=PracticeInfoResponse)
+@router.get(
+    "/{topic_slug}",
+    response_model=PracticeInfoResponse,
+    dependencies=[Depends(http_cache.etag_guard("content"))],
+)
 def get_practice_info(
     topic_slug: str = Path(..., description="Topic slug (e.g., 'expressions')"),
     session: Session = Depends(get_session),
@@ -372,6 +405,7 @@ def get_practice_info(
 
 @router.post("/{topic_slug}/attempt", response_model=PracticeAttemptResponse)
 def start_practice_attempt(
+    background_tasks: BackgroundTasks,
     topic_slug: str = Path(..., description="Topic slug (e.g., 'expressions')"),
     session: Session = Depends(get_session),
     user: User = Depends(current_user),
@@ -392,6 +426,7 @@ def start_practice_attempt(
     )
 
     session.add(attempt)
+    http_cache.bump_user(user.email, session)
     session.commit()
     session.refresh(attempt)
 
@@ -404,15 +439,26 @@ def start_practice_attempt(
     # subsequent submit calls can find the current unanswered interaction.
     initial_interaction = PracticeInteraction(
         attempt_id=attempt.id,
+        user_id=user.id,
         question_id=first_question.id,
         shown_difficulty=shown_difficulty,
         hints_requested=0,
         time_seconds=None,
     )
     session.add(initial_interaction)
+    mark_seen(session, user.id, topic.id, get_topic_index(session, topic.id), first_question.id)
     session.commit()
     session.refresh(initial_interaction)
 
+    state = PracticeSessionState(attempt_id=attempt.id, user_id=user.id, topic_id=topic.id)
+    state.serve(initial_interaction.id, first_question.id)
+    practice_session.put(state)
+
+    # Select the following question while the student works on this one
+    background_tasks.add_task(
+        prefetch_next_question, attempt.id, user.id, topic.id, initial_interaction.id, first_question.id, []
+    )
+
     return PracticeAttemptResponse(
         attempt_id=attempt.id,
         topic_id=topic.id,
@@ -430,6 +476,7 @@ def start_practice_attempt(
 
 @router.post("/{attempt_id}/submit", response_model=PracticeSubmitResponse)
 def submit_practice_answer(
+    background_tasks: BackgroundTasks,
     attempt_id: int = Path(..., description="Practice attempt ID"),
     body: PracticeSubmitRequest = ...,
     session: Session = Depends(get_session),
@@ -437,75 +484,97 @@ def submit_practice_answer(
 ):
     """Submit an answer for the current practice question."""
 
-    # Find the practice attempt
-    attempt = session.exec(
-        select(PracticeAttempt).where(PracticeAttempt.id == attempt_id)
-    ).first()
+    # Cached session state for the attempt (loaded from the DB on a miss, and
+    # reloaded when another worker has moved the attempt on)
+    state = practice_session.get_current_state(session, attempt_id)
 
-    if not attempt:
+    if not state:
         raise HTTPException(status_code=404, detail="Practice attempt not found")
 
     # Verify ownership
-    if attempt.user_id != user.id:
+    if state.user_id != user.id:
         raise HTTPException(
             status_code=403, detail="You can only submit to your own practice session"
         )
 
-    # Get current question (last interaction for this attempt)
-    interactions = session.exec(
-        select(PracticeInteraction)
-        .where(PracticeInteraction.attempt_id == attempt_id)
-        .order_by(PracticeInteraction.id.desc())
-    ).all()
+    # One submit per attempt at a time; a concurrent one (double click) is refused
+    if not state.lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="An answer for this question is already being submitted")
+    try:
+        return _submit_answer(background_tasks, attempt_id, body, session, user, state)
+    finally:
+        state.lock.release()
+
 
-    # Get all completed question IDs
-    completed_question_ids = [i.question_id for i in interactions if i.answer_submitted]
+def _submit_answer(
+    background_tasks: BackgroundTasks,
+    attempt_id: int,
+    body: PracticeSubmitRequest,
+    session: Session,
+    user: User,
+    state: practice_session.PracticeSessionState,
+) -> PracticeSubmitResponse:
+    if body.question_id is not None and body.question_id != state.current_question_id:
+        raise HTTPException(status_code=409, detail="This question was already answered")
 
-    current_question = None
-    current_interaction = None
-    shown_difficulty = "medium"
+    index = get_topic_index(session, state.topic_id)
 
-    if interactions and not interactions[0].answer_submitted:
+    if state.current_interaction_id is not None:
         # There's an unanswered interaction
-        current_interaction = interactions[0]
-        current_question = session.exec(
-            select(Question).where(Question.id == current_interaction.question_id)
-        ).first()
-        shown_difficulty = current_interaction.shown_difficulty
+        current_interaction = session.get(PracticeInteraction, state.current_interaction_id)
+        current_question = session.get(Question, state.current_question_id)
     else:
         # Need to select a new question
         current_question, shown_difficulty = select_next_question(
-            session, user.id, attempt.topic_id, completed_question_ids
+            session, user.id, state.topic_id, state.completed_ids
         )
 
         # Create interaction record
         current_interaction = PracticeInteraction(
             attempt_id=attempt_id,
+            user_id=user.id,
             question_id=current_question.id,
             shown_difficulty=shown_difficulty,
             hints_requested=0,
             time_seconds=None,
         )
         session.add(current_interaction)
+        mark_seen(session, user.id, state.topic_id, index, current_question.id)
         session.commit()
         session.refresh(current_interaction)
+        state.serve(current_interaction.id, current_question.id)
 
     # Check answer
     user_answer = body.answer_submitted.strip().lower()
     correct_answer = current_question.answer.strip().lower()
     is_correct = user_answer == correct_answer
 
-    # Update interaction
-    current_interaction.answer_submitted = body.answer_submitted
-    current_interaction.is_correct = is_correct
     # store time taken if provided by frontend (seconds)
+    time_seconds = current_interaction.time_seconds
     if getattr(body, "time_seconds", None) is not None:
         try:
-            current_interaction.time_seconds = float(body.time_seconds)
+            time_seconds = float(body.time_seconds)
         except Exception:
             # ignore invalid values
             pass
-    session.add(current_interaction)
+
+    # Grade the interaction only if it is still unanswered: a duplicate submit
+    # (another worker, or a state that went stale) updates no row and stops here
+    graded = session.exec(
+        update(PracticeInteraction)
+        .where(PracticeInteraction.id == current_interaction.id, PracticeInteraction.is_correct.is_(None))
+        .values(
+            answer_submitted=body.answer_submitted,
+            is_correct=is_correct,
+            answered_at=datetime.utcnow(),
+            user_id=current_interaction.user_id or user.id,
+            time_seconds=time_seconds,
+        )
+    )
+    if graded.rowcount != 1:
+        session.rollback()
+        practice_session.evict(attempt_id)
+        raise HTTPException(status_code=409, detail="This question was already answered")
 
     # Debug/logging: record that we received a submit and what time was saved
     try:
@@ -519,10 +588,11 @@ def submit_practice_answer(
     mastery_state = session.exec(
         select(MasteryState)
         .where(MasteryState.user_id == user.id)
-        .where(MasteryState.topic_id == attempt.topic_id)
+        .where(MasteryState.topic_id == state.topic_id)
     ).first()
 
     new_mastery = None
+    prior_mastery = mastery_state.mastery if mastery_state else None
     if mastery_state:
         new_mastery = update_mastery(mastery_state.mastery, is_correct)
         mastery_state.mastery = new_mastery
@@ -532,58 +602,143 @@ def submit_practice_answer(
         new_mastery = 0.5 if is_correct else 0.2
         mastery_state = MasteryState(
             user_id=user.id,
-            topic_id=attempt.topic_id,
+            topic_id=state.topic_id,
             mastery=new_mastery,
             last_updated=datetime.utcnow(),
         )
         session.add(mastery_state)
 
+    review_rollup.record_practice_answer(
+        session,
+        user.id,
+        state.topic_id,
+        current_interaction.shown_difficulty,
+        is_correct,
+        hints=current_interaction.hints_requested,
+        time_seconds=current_interaction.time_seconds,
+        day=current_interaction.answered_at.date(),
+    )
+    class_ids = class_rollup.record_practice_answer(
+        session,
+        user.id,
+        state.topic_id,
+        is_correct,
+        hints=current_interaction.hints_requested,
+        time_seconds=current_interaction.time_seconds,
+        day=current_interaction.answered_at.date(),
+    )
+    question_stats.record_answers(session, [question_stats.Answer(
+        current_question.id,
+        is_correct,
+        time_seconds=current_interaction.time_seconds,
+        hints=current_interaction.hints_requested,
+        mastery=prior_mastery,
+    )])
+
+    http_cache.bump_user(user.email, session)
     session.commit()
+    record_response(state.topic_id, current_question.id, is_correct)
+    event_bus.publish(class_ids, {
+        "type": "answer",
+        "student_id": user.id,
+        "student": user.email,
+        "topic_id": state.topic_id,
+        "answered": 1,
+        "correct": 1 if is_correct else 0,
+        "last_question_id": current_question.id,
+        "last_correct": is_correct,
+    })
+    event_bus.publish(class_ids, {
+        "type": "mastery",
+        "student_id": user.id,
+        "student": user.email,
+        "topic_id": state.topic_id,
+        "from": prior_mastery,
+        "to": new_mastery,
+    })
+    current_interaction_id = current_interaction.id
+    state.answer(is_correct)
 
     # Calculate progress
-    all_interactions = session.exec(
-        select(PracticeInteraction)
-        .where(PracticeInteraction.attempt_id == attempt_id)
-        .where(PracticeInteraction.answer_submitted.isnot(None))
-    ).all()
-
-    questions_completed = len(all_interactions)
-    score = sum(1 for i in all_interactions if i.is_correct)
+    questions_completed = state.questions_completed
+    score = state.score
 
     # Get next question
-    completed_ids = [i.question_id for i in all_interactions]
+    completed_ids = list(state.completed_ids)
     next_question = None
     next_difficulty = None
     session_complete = False
 
     try:
-        next_q, next_diff = select_next_question(
-            session, user.id, attempt.topic_id, completed_ids
+        # Use the speculatively selected question if it was computed for this
+        # interaction and outcome; otherwise select now.
+        index = get_topic_index(session, state.topic_id)
+        prefetched = practice_prefetch.take(
+            attempt_id,
+            current_interaction_id,
+            is_correct,
+            index.signature,
+            hints_requested=current_interaction.hints_requested,
+            time_seconds=current_interaction.time_seconds,
         )
-        next_question = PracticeQuestionResponse(
-            question_id=next_q.id,
-            stem=next_q.stem,
-            base_difficulty=next_q.base_difficulty,
-            shown_difficulty=next_diff,
+        # serve the question's current row: its stem may have been edited since
+        prefetched_question = (
+            session.get(Question, prefetched.question_id)
+            if prefetched is not None and prefetched.question_id not in completed_ids
+            else None
         )
-        next_difficulty = next_diff
+        if prefetched_question is not None:
+            next_question = PracticeQuestionResponse(
+                question_id=prefetched_question.id,
+                stem=prefetched_question.stem,
+                base_difficulty=prefetched_question.base_difficulty,
+                shown_difficulty=prefetched.shown_difficulty,
+            )
+        else:
+            next_q, next_diff = select_next_question(
+                session, user.id, state.topic_id, completed_ids
+            )
+            next_question = PracticeQuestionResponse(
+                question_id=next_q.id,
+                stem=next_q.stem,
+                base_difficulty=next_q.base_difficulty,
+                shown_difficulty=next_diff,
+            )
+        next_difficulty = next_question.shown_difficulty
 
         # Create the next interaction record
         next_interaction = PracticeInteraction(
             attempt_id=attempt_id,
-            question_id=next_q.id,
-            shown_difficulty=next_diff,
+            user_id=user.id,
+            question_id=next_question.question_id,
+            shown_difficulty=next_difficulty,
             hints_requested=0,
         )
         session.add(next_interaction)
+        mark_seen(session, user.id, state.topic_id, index, next_question.question_id)
         session.commit()
+        session.refresh(next_interaction)
+        state.serve(next_interaction.id, next_question.question_id)
+
+        background_tasks.add_task(
+            prefetch_next_question,
+            attempt_id,
+            user.id,
+            state.topic_id,
+            next_interaction.id,
+            next_question.question_id,
+            completed_ids,
+        )
 
     except HTTPException:
         # No more questions - session complete
         session_complete = True
+        attempt = session.get(PracticeAttempt, attempt_id)
         attempt.finished_at = datetime.utcnow()
         session.add(attempt)
         session.commit()
+        practice_prefetch.discard(attempt_id)
+        practice_session.evict(attempt_id)
 
     return PracticeSubmitResponse(
         is_correct=is_correct,
@@ -599,6 +754,7 @@ def submit_practice_answer(
 
 @router.post("/{attempt_id}/hint", response_model=PracticeHintResponse)
 def get_practice_hint(
+    background_tasks: BackgroundTasks,
     attempt_id: int = Path(..., description="Practice attempt ID"),
     body: Optional[PracticeHintRequest] = None,
     session: Session = Depends(get_session),
@@ -606,44 +762,41 @@ def get_practice_hint(
 ):
     """Get the next sequential hint for the current question using ML prediction."""
 
-    # Find the practice attempt
-    attempt = session.exec(
-        select(PracticeAttempt).where(PracticeAttempt.id == attempt_id)
-    ).first()
+    # Cached session state for the attempt (loaded from the DB on a miss, and
+    # reloaded when another worker has moved the attempt on)
+    state = practice_session.get_current_state(session, attempt_id)
 
-    if not attempt:
+    if not state:
         raise HTTPException(status_code=404, detail="Practice attempt not found")
 
     # Verify ownership
-    if attempt.user_id != user.id:
+    if state.user_id != user.id:
         raise HTTPException(
             status_code=403, detail="You can only request hints for your own practice"
         )
 
-    # Get current question (most recent interaction without an answer)
-    interactions = session.exec(
-        select(PracticeInteraction)
-        .where(PracticeInteraction.attempt_id == attempt_id)
-        .order_by(PracticeInteraction.id.desc())
-    ).all()
-
-    if not interactions:
+    # Current question is the attempt's unanswered interaction
+    if state.current_interaction_id is None:
+        if not state.completed_ids:
+            raise HTTPException(
+                status_code=400, detail="No active question to provide a hint for"
+            )
         raise HTTPException(
-            status_code=400, detail="No active question to provide a hint for"
+            status_code=400,
+            detail="Question already answered. Submit next question first.",
         )
 
-    current_interaction = interactions[0]
-
-    if current_interaction.answer_submitted:
+    current_interaction = session.get(PracticeInteraction, state.current_interaction_id)
+    if current_interaction is None or current_interaction.is_correct is not None:
+        # answered since the state was checked; the next call reloads it
+        practice_session.evict(attempt_id)
         raise HTTPException(
             status_code=400,
             detail="Question already answered. Submit next question first.",
         )
 
     # Get the question and its hints
-    question = session.exec(
-        select(Question).where(Question.id == current_interaction.question_id)
-    ).first()
+    question = session.get(Question, state.current_question_id)
 
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
@@ -660,10 +813,10 @@ def get_practice_hint(
 
     # Determine which hint to show. Prefer ML-predicted level when available,
     # otherwise fall back to the next sequential hint.
-    hints_already_used = current_interaction.hints_requested
+    hints_already_used = state.hints_used
 
     # Use ML to predict best hint level (1-based level: 1,2,3)
-    features = get_student_features(session, user.id, attempt.topic_id, question)
+    features = get_student_features(session, user.id, state.topic_id, question)
     features["hints_used_question"] = hints_already_used
 
     predicted_level = None
@@ -693,10 +846,44 @@ def get_practice_hint(
     next_hint = hints[next_hint_index]
 
     # Update the stored hints_requested to reflect the hint we've delivered
-    # (set to at least next_hint_index+1)
-    current_interaction.hints_requested = max(current_interaction.hints_requested, next_hint_index + 1)
-    session.add(current_interaction)
+    # (set to at least next_hint_index+1), unless the question got answered
+    # in the meantime
+    hints_requested = max(hints_already_used, next_hint_index + 1)
+    recorded = session.exec(
+        update(PracticeInteraction)
+        .where(PracticeInteraction.id == current_interaction.id, PracticeInteraction.is_correct.is_(None))
+        .values(hints_requested=hints_requested)
+    )
+    if recorded.rowcount != 1:
+        session.rollback()
+        practice_session.evict(attempt_id)
+        raise HTTPException(
+            status_code=400,
+            detail="Question already answered. Submit next question first.",
+        )
     session.commit()
+    state.hints_used = hints_requested
+    # the hint count is a selection feature: recompute the next-question prefetch
+    practice_prefetch.discard(attempt_id)
+    background_tasks.add_task(
+        prefetch_next_question,
+        attempt_id,
+        user.id,
+        state.topic_id,
+        current_interaction.id,
+        question.id,
+        list(state.completed_ids),
+    )
+    if event_bus.has_subscribers():
+        event_bus.publish(class_rollup.class_ids_for(session, user.id), {
+            "type": "hint",
+            "student_id": user.id,
+            "student": user.email,
+            "topic_id": state.topic_id,
+            "question_id": question.id,
+            "level": next_hint_index + 1,
+            "count": 1,
+        })
 
     return PracticeHintResponse(
         hint_level=next_hint_index + 1,
@@ -4,6 +4,8 @@ Endpoints:
 - GET /api/quiz/{topic_slug} - Get quiz questions for a topic
 - POST /api/quiz/{topic_slug}/start - Start a new quiz attempt
 - POST /api/quiz/{attempt_id}/submit - Submit quiz answers and get results
+- POST /api/quiz/{topic_slug}/cat/start - Start an adaptive (CAT) quiz, get its first question
+- POST /api/quiz/{attempt_id}/cat/answer - Answer the current CAT question, get the next one or the results
 """
 
 from __future__ import annotations
@@ -13,6 +15,7 @@ from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Path
 from pydantic import BaseModel, Field
+from sqlalchemy import insert, update
 from sqlmodel import Session, select
 
 from brightsum_api.auth import current_user
@@ -26,9 +29,10 @@ from brightsum_api.models import (
     QuizAttemptQuestion,
     MasteryState,
 )
-import random
+from brightsum_api.ml import cat
 from brightsum_api.ml.mastery import update_mastery
-from brightsum_api.ml.irt_selection import select_quiz_questions_irt
+from brightsum_api.ml.irt_selection import item_info
+from brightsum_api.services import class_rollup, event_bus, http_cache, question_stats, quiz_forms
 
 router = APIRouter()
 
@@ -99,9 +103,52 @@ class QuizSubmitResponse(BaseModel):
     mastery_updated: Optional[float] = None
 
 
+class CatStartResponse(BaseModel):
+    """Response when starting an adaptive quiz: its first question and the starting estimate."""
+
+    attempt_id: int
+    started_at: datetime
+    time_limit_minutes: int
+    expires_at: datetime
+    max_questions: int
+    target_se: float
+    ability: float
+    ability_se: float
+    question: QuizQuestionResponse
+
+
+class CatAnswerResponse(BaseModel):
+    """The estimate after an adaptive answer, with the next question or, when done, the results."""
+
+    attempt_id: int
+    done: bool
+    answered: int
+    ability: float
+    ability_se: float
+    question: Optional[QuizQuestionResponse] = None
+    result: Optional[QuizSubmitResponse] = None
+
+
+# Adaptive quiz defaults: after at least CAT_MIN_QUESTIONS, stop once the
+# ability's standard error is at most CAT_TARGET_SE (on the mastery scale; with
+# the weakly discriminating fitted items 0.1 takes about max_questions), once
+# the posterior is CAT_PASS_CONFIDENCE sure which side of CAT_PASS_ABILITY the
+# student is on, or after max_questions
+CAT_MAX_QUESTIONS = 20
+CAT_MIN_QUESTIONS = 3
+CAT_TARGET_SE = 0.15
+CAT_PASS_CONFIDENCE = 0.95
+# An adaptive quiz is passed when the final ability estimate reaches this mastery
+CAT_PASS_ABILITY = 0.7
+
+
 # Endpoints
 
-@router.get("/{topic_slug}", response_model=QuizInfoResponse)
+@router.get(
+    "/{topic_slug}",
+    response_model=QuizInfoResponse,
+    dependencies=[Depends(http_cache.etag_guard("content"))],
+)
 def get_quiz_info(
     topic_slug: str = Path(..., description="Topic slug (e.g., 'expressions')"),
     session: Session = Depends(get_session),
@@ -161,42 +208,39 @@ def start_quiz(
     if not topic:
         raise HTTPException(status_code=404, detail=f"Topic '{topic_slug}' not found")
 
-    # Get all questions for the topic and ignore quiz-only flags (pick from whole dataset)
-    questions = session.exec(select(Question).where(Question.topic_id == topic.id)).all()
+    try:
+        num_questions = int(num_questions)
+    except Exception:
+        num_questions = 10
+
+    # Pick a pre-generated form (services/quiz_forms.py); the IRT forms are
+    # built for the band of the student's current mastery
+    mastery = None
+    if strategy == "irt_information":
+        mastery = session.exec(
+            select(MasteryState.mastery)
+            .where(MasteryState.user_id == user.id)
+            .where(MasteryState.topic_id == topic.id)
+        ).first()
+    try:
+        questions = quiz_forms.pick(session, topic.id, num_questions, strategy, mastery)
+    except Exception:
+        # If anything fails, fall back to a random form
+        strategy = "default"
+        questions = quiz_forms.pick(session, topic.id, num_questions)
 
     if not questions:
         raise HTTPException(
             status_code=404, detail=f"No quiz questions found for topic '{topic_slug}'"
         )
 
-    # If IRT strategy requested, attempt to select top-k informative questions
+    # Information of each item at the student's own mastery, stored with the attempt
+    irt_info_map = {}
     if strategy == "irt_information":
-        try:
-            irt_selected = select_quiz_questions_irt(session, user.id, topic.id, k=num_questions)
-            if irt_selected:
-                # select_quiz_questions_irt now returns List[Tuple[Question, info_score]]
-                questions = [q for q, _info in irt_selected]
-                # store the info scores alongside questions for persistence later
-                irt_info_map = {q.id: info for q, info in irt_selected}
-        except Exception:
-            # If anything fails, fallback to the default question set
-            irt_info_map = {}
-
-    # Ensure the quiz size is limited to num_questions. For IRT we've already
-    # selected up to k items; for the default strategy, randomly sample when
-    # the available questions exceed the requested size.
-    try:
-        num_questions = int(num_questions)
-    except Exception:
-        num_questions = 10
-
-    if len(questions) > num_questions:
-        if strategy == "irt_information" and 'irt_info_map' in locals():
-            # IRT selection is ordered by info; truncate to requested size
-            questions = questions[:num_questions]
-        else:
-            # Default behavior: random sample a subset to keep quizzes compact
-            questions = random.sample(questions, num_questions)
+        at = quiz_forms.DEFAULT_MASTERY if mastery is None else mastery
+        irt_info_map = {
+            q.question_id: item_info(q.question_id, q.base_difficulty, at)[1] for q in questions
+        }
 
     # Create quiz attempt
     started_at = datetime.utcnow()
@@ -213,24 +257,26 @@ def start_quiz(
     )
 
     session.add(attempt)
-    session.commit()
-    session.refresh(attempt)
+    session.flush()
 
     # Persist selected questions for this attempt so submissions can be validated
-    for idx, q in enumerate(questions):
-        qa = QuizAttemptQuestion(
-            attempt_id=attempt.id,
-            question_id=q.id,
-            position=idx,
-            info_score=irt_info_map.get(q.id) if 'irt_info_map' in locals() else None,
-        )
-        session.add(qa)
+    session.connection().execute(insert(QuizAttemptQuestion.__table__), [
+        {
+            "attempt_id": attempt.id,
+            "user_id": user.id,
+            "question_id": q.question_id,
+            "position": idx,
+            "info_score": irt_info_map.get(q.question_id),
+        }
+        for idx, q in enumerate(questions)
+    ])
+    http_cache.bump_user(user.email, session)
     session.commit()
 
     # Return quiz info
     quiz_questions = [
         QuizQuestionResponse(
-            id=q.id, stem=q.stem, base_difficulty=q.base_difficulty
+            id=q.question_id, stem=q.stem, base_difficulty=q.base_difficulty
         )
         for q in questions
     ]
@@ -244,6 +290,87 @@ def start_quiz(
     )
 
 
+def _mastery_state(session: Session, user_id: int, topic_id: int) -> Optional[MasteryState]:
+    return session.exec(
+        select(MasteryState)
+        .where(MasteryState.user_id == user_id)
+        .where(MasteryState.topic_id == topic_id)
+    ).first()
+
+
+def _finish_attempt(
+    session: Session,
+    user: User,
+    attempt: QuizAttempt,
+    results: List[QuizResultDetail],
+    score_percent: float,
+    passed: bool,
+    now: datetime,
+    mastery_state: Optional[MasteryState],
+    cat_mastery: Optional[float] = None,
+    times: Optional[dict] = None,
+) -> float:
+    """Close a graded attempt: score, class rollup, item stats and mastery in one commit.
+
+    The new mastery is `cat_mastery` (from an adaptive quiz's ability estimate)
+    when given, otherwise the pass/fail update of the previous mastery. Returns it.
+    """
+    attempt.finished_at = now
+    attempt.score_percent = score_percent
+    attempt.passed = passed
+    session.add(attempt)
+    class_ids = class_rollup.record_quiz(session, user.id, attempt.topic_id, score_percent, passed, now.date())
+
+    # Item statistics, against the mastery the student had before this quiz
+    prior_mastery = mastery_state.mastery if mastery_state else None
+    times = times or {}
+    question_stats.record_answers(session, [
+        question_stats.Answer(r.question_id, r.is_correct, times.get(r.question_id), mastery=prior_mastery)
+        for r in results
+    ])
+
+    if cat_mastery is not None:
+        new_mastery = cat_mastery
+    elif mastery_state:
+        # Update existing mastery based on pass/fail
+        new_mastery = update_mastery(mastery_state.mastery, passed)
+    else:
+        new_mastery = 0.7 if passed else 0.3
+    if mastery_state:
+        mastery_state.mastery = new_mastery
+        mastery_state.last_updated = now
+    else:
+        # Create new mastery state
+        mastery_state = MasteryState(
+            user_id=user.id,
+            topic_id=attempt.topic_id,
+            mastery=new_mastery,
+            last_updated=now,
+        )
+    session.add(mastery_state)
+
+    http_cache.bump_user(user.email, session)
+    session.commit()
+    event_bus.publish(class_ids, {
+        "type": "quiz",
+        "student_id": user.id,
+        "student": user.email,
+        "topic_id": attempt.topic_id,
+        "attempt_id": attempt.id,
+        "score_percent": round(score_percent, 2),
+        "passed": passed,
+    })
+    event_bus.publish(class_ids, {
+        "type": "mastery",
+        "student_id": user.id,
+        "student": user.email,
+        "topic_id": attempt.topic_id,
+        "from": prior_mastery,
+        "to": new_mastery,
+    })
+    return new_mastery
+
+
 @router.post("/{attempt_id}/submit", response_model=QuizSubmitResponse)
 def submit_quiz(
     attempt_id: int = Path(..., description="Quiz attempt ID"),
@@ -271,6 +398,9 @@ def submit_quiz(
     if attempt.finished_at is not None:
         raise HTTPException(status_code=400, detail="Quiz already submitted")
 
+    if attempt.mode == "cat":
+        raise HTTPException(status_code=400, detail="Adaptive quizzes are answered one question at a time")
+
     # Validate time limit (25 minutes)
     now = datetime.utcnow()
     time_elapsed = (now - attempt.started_at).total_seconds()
@@ -282,107 +412,82 @@ def submit_quiz(
             detail=f"Time limit exceeded. Quiz must be completed within 25 minutes.",
         )
 
-    # Grade the answers — only for questions that were part of this attempt
+    # Grade the answers — only for questions that were part of this attempt.
+    # Everything is graded from two preloaded queries and written back with one
+    # batched UPDATE, so the query count doesn't grow with the quiz length.
     results = []
     correct_count = 0
 
-    # Load allowed question ids for this attempt
-    allowed_q_rows = session.exec(
-        select(QuizAttemptQuestion).where(QuizAttemptQuestion.attempt_id == attempt.id)
-    ).all()
-    allowed_qids = {r.question_id for r in allowed_q_rows}
-
-    # Build a map of question_id -> Question for quick lookup
+    # Load allowed question ids for this attempt (attempt question row id by question id)
+    row_ids = {
+        qid: row_id
+        for row_id, qid in session.exec(
+            select(QuizAttemptQuestion.id, QuizAttemptQuestion.question_id)
+            .where(QuizAttemptQuestion.attempt_id == attempt.id)
+        ).all()
+    }
+    ungraded = set(row_ids)
+
+    # Build a map of question_id -> (stem, answer, difficulty) for quick lookup
     questions_map = {}
-    if allowed_qids:
-        q_objs = session.exec(select(Question).where(Question.id.in_(list(allowed_qids)))).all()
-        questions_map = {q.id: q for q in q_objs}
-
+    if row_ids:
+        questions_map = {
+            qid: (stem, answer, difficulty)
+            for qid, stem, answer, difficulty in session.exec(
+                select(Question.id, Question.stem, Question.answer, Question.base_difficulty)
+                .where(Question.id.in_(list(row_ids)))
+            ).all()
+        }
+
+    graded_rows = []
     for answer_submission in body.answers:
         qid = answer_submission.question_id
-        # Only grade if the question was part of this attempt
-        if qid not in allowed_qids:
-            # ignore submissions for questions not in this attempt
-            continue
-
-        question = questions_map.get(qid)
-        if not question:
+        # Only grade questions that are part of this attempt, and each one once:
+        # answers for other questions and repeated answers are ignored
+        if qid not in ungraded or qid not in questions_map:
             continue
+        ungraded.discard(qid)
+        stem, correct_answer, difficulty = questions_map[qid]
 
         # Normalize answers for comparison
-        user_answer = answer_submission.answer_submitted.strip().lower()
-        correct_answer = question.answer.strip().lower()
-
-        is_correct = user_answer == correct_answer
+        is_correct = answer_submission.answer_submitted.strip().lower() == correct_answer.strip().lower()
 
         if is_correct:
             correct_count += 1
 
-        # Persist per-question response into QuizAttemptQuestion if present
-        try:
-            qa_row = session.exec(
-                select(QuizAttemptQuestion)
-                .where(QuizAttemptQuestion.attempt_id == attempt.id)
-                .where(QuizAttemptQuestion.question_id == qid)
-            ).first()
-            if qa_row:
-                qa_row.is_correct = is_correct
-                qa_row.given_answer = answer_submission.answer_submitted
-                # time_seconds and hints_requested are not tracked in quiz flow currently
-                session.add(qa_row)
-        except Exception:
-            # non-fatal: if persistence fails, continue
-            pass
-
+        # time_seconds and hints_requested are not tracked in quiz flow currently
+        graded_rows.append({
+            "id": row_ids[qid],
+            "is_correct": is_correct,
+            "given_answer": answer_submission.answer_submitted,
+            "answered_at": now,
+            "user_id": user.id,
+        })
         results.append(
             QuizResultDetail(
-                question_id=question.id,
-                stem=question.stem,
+                question_id=qid,
+                stem=stem,
                 your_answer=answer_submission.answer_submitted,
-                correct_answer=question.answer,
+                correct_answer=correct_answer,
                 is_correct=is_correct,
-                base_difficulty=question.base_difficulty,
+                base_difficulty=difficulty,
             )
         )
 
+    # Persist per-question responses (grouped into one executemany UPDATE)
+    if graded_rows:
+        session.exec(update(QuizAttemptQuestion), params=graded_rows)
+
     # Calculate score
     # Use the number of questions that were actually part of the attempt
-    total_questions = len(allowed_qids) if allowed_qids else len(body.answers)
+    total_questions = len(row_ids) if row_ids else len(body.answers)
     score_percent = (correct_count / total_questions * 100) if total_questions > 0 else 0
     passed = score_percent >= 70  # Pass threshold: 70%
 
-    # Update attempt
-    attempt.finished_at = now
-    attempt.score_percent = score_percent
-    attempt.passed = passed
-    session.add(attempt)
-
-    # Update mastery state
-    mastery_state = session.exec(
-        select(MasteryState)
-        .where(MasteryState.user_id == user.id)
-        .where(MasteryState.topic_id == attempt.topic_id)
-    ).first()
-
-    new_mastery = None
-    if mastery_state:
-        # Update existing mastery based on pass/fail
-        new_mastery = update_mastery(mastery_state.mastery, passed)
-        mastery_state.mastery = new_mastery
-        mastery_state.last_updated = now
-        session.add(mastery_state)
-    else:
-        # Create new mastery state
-        new_mastery = 0.7 if passed else 0.3
-        mastery_state = MasteryState(
-            user_id=user.id,
-            topic_id=attempt.topic_id,
-            mastery=new_mastery,
-            last_updated=now,
-        )
-        session.add(mastery_state)
-
-    session.commit()
+    new_mastery = _finish_attempt(
+        session, user, attempt, results, score_percent, passed, now,
+        _mastery_state(session, user.id, attempt.topic_id),
+    )
 
     return QuizSubmitResponse(
         attempt_id=attempt.id,
@@ -393,4 +498,229 @@ def submit_quiz(
         time_taken_seconds=round(time_elapsed, 2),
         results=results,
         mastery_updated=round(new_mastery, 3) if new_mastery else None,
-    )
\ No newline at end of file
+    )
+
+@router.post("/{topic_slug}/cat/start", response_model=CatStartResponse)
+def start_cat_quiz(
+    topic_slug: str = Path(..., description="Topic slug (e.g., 'expressions')"),
+    max_questions: int = CAT_MAX_QUESTIONS,
+    target_se: float = CAT_TARGET_SE,
+    session: Session = Depends(get_session),
+    user: User = Depends(current_user),
+):
+    """Start an adaptive quiz: questions are served one at a time, each chosen for the current estimate."""
+
+    topic = session.exec(select(Topic).where(Topic.slug == topic_slug)).first()
+    if not topic:
+        raise HTTPException(status_code=404, detail=f"Topic '{topic_slug}' not found")
+
+    pool = quiz_forms.get_pool(session, topic.id)
+    if pool is None:
+        raise HTTPException(
+            status_code=404, detail=f"No quiz questions found for topic '{topic_slug}'"
+        )
+    bank = pool.cat_bank()
+    if not len(bank):
+        raise HTTPException(
+            status_code=404, detail=f"No calibrated quiz questions for topic '{topic_slug}'"
+        )
+
+    # The prior is centred on the student's current mastery
+    mastery = session.exec(
+        select(MasteryState.mastery)
+        .where(MasteryState.user_id == user.id)
+        .where(MasteryState.topic_id == topic.id)
+    ).first()
+    prior = quiz_forms.DEFAULT_MASTERY if mastery is None else mastery
+    ability, ability_se = cat.estimate(bank.log_likelihood([]), prior)
+    question_id, info = bank.next_item(set(), ability)
+
+    started_at = datetime.utcnow()
+    time_limit_minutes = 25
+    attempt = QuizAttempt(
+        user_id=user.id,
+        topic_id=topic.id,
+        started_at=started_at,
+        mode="cat",
+        ability=ability,
+        ability_se=ability_se,
+        max_questions=max(1, min(max_questions, 100)),
+        target_se=max(0.01, target_se),
+    )
+    session.add(attempt)
+    session.flush()
+    session.add(QuizAttemptQuestion(
+        attempt_id=attempt.id, user_id=user.id, question_id=question_id, position=0, info_score=info,
+    ))
+    http_cache.bump_user(user.email, session)
+    session.commit()
+
+    item = pool.item(question_id)
+    return CatStartResponse(
+        attempt_id=attempt.id,
+        started_at=started_at,
+        time_limit_minutes=time_limit_minutes,
+        expires_at=started_at + timedelta(minutes=time_limit_minutes),
+        max_questions=attempt.max_questions,
+        target_se=attempt.target_se,
+        ability=round(ability, 3),
+        ability_se=round(ability_se, 3),
+        question=QuizQuestionResponse(id=item.question_id, stem=item.stem, base_difficulty=item.base_difficulty),
+    )
+
+
+@router.post("/{attempt_id}/cat/answer", response_model=CatAnswerResponse)
+def answer_cat_question(
+    attempt_id: int = Path(..., description="Quiz attempt ID"),
+    body: QuizAnswerSubmission = ...,
+    session: Session = Depends(get_session),
+    user: User = Depends(current_user),
+):
+    """Grade the current adaptive question, update the ability estimate and serve the next question.
+
+    The estimate is recomputed from all answers of the attempt over the
+    precomputed quadrature grid (ml/cat.py). The quiz ends when its standard
+    error reaches the attempt's target, when it is clear whether the student
+    passes, or when max_questions were answered; the final estimate becomes the
+    student's topic mastery. A run without a wrong answer always passes and
+    never lowers the mastery, and one without a right answer never raises it;
+    the returned ability and ability_se are the estimate's either way.
+    """
+    attempt = session.exec(select(QuizAttempt).where(QuizAttempt.id == attempt_id)).first()
+    if not attempt:
+        raise HTTPException(status_code=404, detail="Quiz attempt not found")
+    if attempt.user_id != user.id:
+        raise HTTPException(status_code=403, detail="You can only submit your own quiz")
+    if attempt.mode != "cat":
+        raise HTTPException(status_code=400, detail="Not an adaptive quiz")
+    if attempt.finished_at is not None:
+        raise HTTPException(status_code=400, detail="Quiz already submitted")
+
+    now = datetime.utcnow()
+    time_elapsed = (now - attempt.started_at).total_seconds()
+    if time_elapsed > 25 * 60:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Time limit exceeded. Quiz must be completed within 25 minutes.",
+        )
+
+    rows = session.exec(
+        select(QuizAttemptQuestion)
+        .where(QuizAttemptQuestion.attempt_id == attempt.id)
+        .order_by(QuizAttemptQuestion.position)
+    ).all()
+    current = rows[-1] if rows and rows[-1].is_correct is None else None
+    if current is None or current.question_id != body.question_id:
+        raise HTTPException(status_code=400, detail="Answer the current question of the quiz")
+    question = session.get(Question, current.question_id)
+    if question is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+
+    # Grade the current question (its time runs from the previous answer), only
+    # if it is still unanswered: of two concurrent or double-clicked submits
+    # the second updates no row and stops here instead of serving a second
+    # question at the same position
+    served_at = rows[-2].answered_at if len(rows) > 1 and rows[-2].answered_at else attempt.started_at
+    graded = session.exec(
+        update(QuizAttemptQuestion)
+        .where(QuizAttemptQuestion.id == current.id, QuizAttemptQuestion.is_correct.is_(None))
+        .values(
+            is_correct=body.answer_submitted.strip().lower() == question.answer.strip().lower(),
+            given_answer=body.answer_submitted,
+            time_seconds=round((now - served_at).total_seconds(), 2),
+            answered_at=now,
+            user_id=user.id,
+        )
+    )
+    if graded.rowcount != 1:
+        session.rollback()
+        raise HTTPException(status_code=409, detail="This question was already answered")
+
+    mastery_state = _mastery_state(session, user.id, attempt.topic_id)
+    prior = mastery_state.mastery if mastery_state else quiz_forms.DEFAULT_MASTERY
+    pool = quiz_forms.get_pool(session, attempt.topic_id)
+    log_likelihood = pool.cat_bank().log_likelihood((r.question_id, r.is_correct) for r in rows) if pool else 0.0
+    ability, ability_se = cat.estimate(log_likelihood, prior)
+    p_pass = cat.pass_probability(log_likelihood, prior, CAT_PASS_ABILITY)
+    attempt.ability = ability
+    attempt.ability_se = ability_se
+    session.add(attempt)
+
+    answered = len(rows)
+    decided = p_pass >= CAT_PASS_CONFIDENCE or p_pass <= 1 - CAT_PASS_CONFIDENCE
+    next_item = None
+    if pool is not None and answered < attempt.max_questions and (
+        answered < CAT_MIN_QUESTIONS or (ability_se > attempt.target_se and not decided)
+    ):
+        next_item = pool.cat_bank().next_item({r.question_id for r in rows}, ability)
+
+    if next_item is not None:
+        question_id, info = next_item
+        session.add(QuizAttemptQuestion(
+            attempt_id=attempt.id, user_id=user.id, question_id=question_id, position=answered, info_score=info,
+        ))
+        session.commit()
+        item = pool.item(question_id)
+        return CatAnswerResponse(
+            attempt_id=attempt.id,
+            done=False,
+            answered=answered,
+            ability=round(ability, 3),
+            ability_se=round(ability_se, 3),
+            question=QuizQuestionResponse(id=item.question_id, stem=item.stem, base_difficulty=item.base_difficulty),
+        )
+
+    # Stopping rule met (or no questions left): grade the whole attempt
+    questions_map = {
+        qid: (stem, answer, difficulty)
+        for qid, stem, answer, difficulty in session.exec(
+            select(Question.id, Question.stem, Question.answer, Question.base_difficulty)
+            .where(Question.id.in_([r.question_id for r in rows]))
+        ).all()
+    }
+    results = [
+        QuizResultDetail(
+            question_id=r.question_id,
+            stem=questions_map[r.question_id][0],
+            your_answer=r.given_answer,
+            correct_answer=questions_map[r.question_id][1],
+            is_correct=r.is_correct,
+            base_difficulty=questions_map[r.question_id][2],
+        )
+        for r in rows
+        if r.question_id in questions_map
+    ]
+    correct_count = sum(1 for r in results if r.is_correct)
+    score_percent = correct_count / answered * 100
+    # The attempt keeps and reports the estimator's ability and SE. Passing and
+    # the mastery update additionally never go against a one-sided run: a
+    # perfect run passes and doesn't lower the mastery, an all-wrong one
+    # doesn't raise it
+    passed = ability >= CAT_PASS_ABILITY or correct_count == answered
+    if correct_count == answered:
+        mastery_after = max(ability, prior)
+    elif correct_count == 0:
+        mastery_after = min(ability, prior)
+    else:
+        mastery_after = ability
+    new_mastery = _finish_attempt(
+        session, user, attempt, results, score_percent, passed, now, mastery_state,
+        cat_mastery=mastery_after, times={r.question_id: r.time_seconds for r in rows},
+    )
+    return CatAnswerResponse(
+        attempt_id=attempt.id,
+        done=True,
+        answered=answered,
+        ability=round(ability, 3),
+        ability_se=round(ability_se, 3),
+        result=QuizSubmitResponse(
+            attempt_id=attempt.id,
+            score=correct_count,
+            total_questions=answered,
+            score_percent=round(score_percent, 2),
+            passed=passed,
+            time_taken_seconds=round(time_elapsed, 2),
+            results=results,
+            mastery_updated=round(new_mastery, 3),
+        ),
+    )
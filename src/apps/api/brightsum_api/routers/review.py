@@ -1,11 +1,13 @@
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import case, func, or_
 from sqlmodel import Session, select
 
 from ..db import get_session
 from .. import auth
+from ..services import http_cache
 from ..models import (
     PracticeInteraction,
     PracticeAttempt,
@@ -13,12 +15,19 @@ from ..models import (
     Topic,
     Question,
     QuizAttemptQuestion,
+    ReviewRollup,
 )
 
 router = APIRouter()
 
 
-@router.get("/summary")
+def _topic_match(topic: str):
+    """SQL condition matching a topic filter against Topic name or slug (case-insensitive)."""
+    t = topic.lower()
+    return or_(func.lower(Topic.name) == t, func.lower(Topic.slug) == t)
+
+
+@router.get("/summary", dependencies=[Depends(http_cache.etag_guard("user"))])
 def review_summary(
     session: Session = Depends(get_session),
     user=Depends(auth.current_user),
@@ -29,10 +38,12 @@ def review_summary(
 ) -> Dict[str, Any]:
     """Return a dashboard summary for the current user used by the Review Mistakes page.
 
-    The endpoint gathers basic aggregates from practice interactions, recent attempts,
-    and per-topic statistics. It is intentionally DB-light and tolerant of missing data
-    (returns sensible defaults when there are no interactions).
-    
+    Practice aggregates come from the per-user ReviewRollup table (one row per
+    topic, difficulty and day), so every section is a small grouped query with
+    the filters applied in SQL and the cost does not grow with the user's
+    history. Tolerant of missing data (returns sensible defaults when there are
+    no interactions).
+
     Supports optional filters: topic, source, difficulty, date_range.
     """
     # Date range filter
@@ -47,136 +58,145 @@ def review_summary(
             date_from = now - timedelta(days=90)
         # "All time" => date_from stays None
 
-    # Practice interactions for this user
-    attempt_ids = [a.id for a in session.exec(select(PracticeAttempt).where(PracticeAttempt.user_id == user.id)).all()]
-    
-    # Apply date filter to attempts
+    # Rollup rows for this user, with date and difficulty filters applied
+    rollup_filters = [ReviewRollup.user_id == user.id]
     if date_from:
-        attempt_ids = [a.id for a in session.exec(select(PracticeAttempt).where(
-            PracticeAttempt.user_id == user.id,
-            PracticeAttempt.started_at >= date_from
-        )).all()]
-    
-    if attempt_ids:
-        interactions = session.exec(select(PracticeInteraction).where(PracticeInteraction.attempt_id.in_(attempt_ids))).all()
-    else:
-        interactions = []
-    
-    # Apply difficulty filter to interactions
+        rollup_filters.append(ReviewRollup.day >= date_from.date())
     if difficulty and difficulty != "All":
-        interactions = [i for i in interactions if i.shown_difficulty.lower() == difficulty.lower()]
+        rollup_filters.append(ReviewRollup.difficulty == difficulty.lower())
 
-    total_answered = len([i for i in interactions if i.is_correct is not None])
-    total_correct = len([i for i in interactions if i.is_correct])
-    total_incorrect = len([i for i in interactions if i.is_correct is False])
+    total_answered, total_correct, total_incorrect, total_hints = session.exec(
+        select(
+            func.coalesce(func.sum(ReviewRollup.answered), 0),
+            func.coalesce(func.sum(ReviewRollup.correct), 0),
+            func.coalesce(func.sum(ReviewRollup.incorrect), 0),
+            func.coalesce(func.sum(ReviewRollup.hints), 0),
+        ).where(*rollup_filters)
+    ).one()
 
     overall_accuracy = round((total_correct / total_answered) * 100, 0) if total_answered > 0 else None
 
-    # Questions answered and week's accuracy: consider interactions in last 7 days
-    one_week_ago = datetime.utcnow() - timedelta(days=7)
-    week_interactions = [i for i in interactions if (i.time_seconds is not None) or True]  # placeholder - cannot compare timestamp on interaction
-    # Fallback: use same as overall for now
-    week_accuracy = overall_accuracy
+    # Week accuracy: answers from the last 7 days (today included)
+    today = datetime.utcnow().date()
+    week_filters = [ReviewRollup.user_id == user.id, ReviewRollup.day >= today - timedelta(days=6)]
+    if difficulty and difficulty != "All":
+        week_filters.append(ReviewRollup.difficulty == difficulty.lower())
+    week_correct, week_answered = session.exec(
+        select(
+            func.coalesce(func.sum(ReviewRollup.correct), 0),
+            func.coalesce(func.sum(ReviewRollup.answered), 0),
+        ).where(*week_filters)
+    ).one()
+    week_accuracy = round((week_correct / week_answered) * 100, 0) if week_answered > 0 else None
 
     # Avg hints per question
-    hints_per_q = round((sum(i.hints_requested for i in interactions) / total_answered), 2) if total_answered > 0 else 0.0
-
-    # Avg difficulty reached: infer from most common shown_difficulty
-    from collections import Counter
+    hints_per_q = round((total_hints / total_answered), 2) if total_answered > 0 else 0.0
 
-    diffs = [i.shown_difficulty for i in interactions if getattr(i, 'shown_difficulty', None)]
-    if diffs:
-        most_common = Counter(diffs).most_common(1)[0][0]
-    else:
-        most_common = 'medium'
+    # Avg difficulty reached: most common shown difficulty
+    most_common = session.exec(
+        select(ReviewRollup.difficulty)
+        .where(*rollup_filters)
+        .group_by(ReviewRollup.difficulty)
+        .order_by(func.sum(ReviewRollup.answered).desc())
+        .limit(1)
+    ).first() or 'medium'
 
     # Topic-level stats
-    topics = session.exec(select(Topic)).all()
-    
-    # Apply topic filter
+    topic_query = select(Topic)
     if topic and topic != "All topics":
-        topics = [t for t in topics if t.name.lower() == topic.lower() or t.slug.lower() == topic.lower()]
-    
+        topic_query = topic_query.where(_topic_match(topic))
+    topics = session.exec(topic_query).all()
+
+    topic_ids_with_questions = set(session.exec(select(Question.topic_id).distinct()).all())
+    per_topic = {
+        tid: (correct, answered, incorrect)
+        for tid, correct, answered, incorrect in session.exec(
+            select(
+                ReviewRollup.topic_id,
+                func.sum(ReviewRollup.correct),
+                func.sum(ReviewRollup.answered),
+                func.sum(ReviewRollup.incorrect),
+            )
+            .where(*rollup_filters)
+            .group_by(ReviewRollup.topic_id)
+        ).all()
+    }
+
     topics_out: List[Dict[str, Any]] = []
     for t in topics:
-        # get question ids for topic
-        qids = [q.id for q in session.exec(select(Question).where(Question.topic_id == t.id)).all()]
-        if not qids:
+        if t.id not in topic_ids_with_questions:
             topics_out.append({"name": t.name, "accuracy": None, "mistakes": 0})
             continue
-        topic_interactions = [i for i in interactions if i.question_id in qids and i.is_correct is not None]
-        if topic_interactions:
-            correct = len([i for i in topic_interactions if i.is_correct])
-            total = len(topic_interactions)
-            accuracy = int(round((correct / total) * 100))
-            mistakes = len([i for i in topic_interactions if i.is_correct is False])
-        else:
-            accuracy = None
-            mistakes = 0
-        topics_out.append({"name": t.name, "accuracy": accuracy if accuracy is not None else 0, "mistakes": mistakes})
-
-    # Recent sessions: quizzes and practice attempts
+        correct, answered, incorrect = per_topic.get(t.id, (0, 0, 0))
+        accuracy = int(round((correct / answered) * 100)) if answered else 0
+        topics_out.append({"name": t.name, "accuracy": accuracy, "mistakes": incorrect if answered else 0})
+
+    # Recent sessions: quizzes and practice attempts (latest 5 of each, with topic joined)
     recent_quizzes = []
-    q_query = select(QuizAttempt).where(QuizAttempt.user_id == user.id)
-    if date_from:
-        q_query = q_query.where(QuizAttempt.started_at >= date_from)
-    q_attempts = session.exec(q_query.order_by(QuizAttempt.started_at.desc())).all()[:5]
-    
-    for qa in q_attempts:
-        topic_obj = session.exec(select(Topic).where(Topic.id == qa.topic_id)).first()
-        # Apply topic filter
+    if not (source and source != "All" and source.lower() != "quizzes"):
+        q_query = (
+            select(QuizAttempt, Topic)
+            .join(Topic, Topic.id == QuizAttempt.topic_id, isouter=True)
+            .where(QuizAttempt.user_id == user.id)
+        )
+        if date_from:
+            q_query = q_query.where(QuizAttempt.started_at >= date_from)
         if topic and topic != "All topics":
-            if not topic_obj or (topic_obj.name.lower() != topic.lower() and topic_obj.slug.lower() != topic.lower()):
-                continue
-        # Apply source filter
-        if source and source != "All" and source.lower() != "quizzes":
-            continue
-        recent_quizzes.append({
-            "id": qa.id,
-            "name": f"Quiz: {topic_obj.name if topic_obj else qa.topic_id}",
-            "date": qa.started_at.isoformat() if qa.started_at else None,
-            "score": f"{int(qa.score_percent) if qa.score_percent is not None else 0}%",
-        })
+            q_query = q_query.where(_topic_match(topic))
+        for qa, topic_obj in session.exec(q_query.order_by(QuizAttempt.started_at.desc()).limit(5)).all():
+            recent_quizzes.append({
+                "id": qa.id,
+                "name": f"Quiz: {topic_obj.name if topic_obj else qa.topic_id}",
+                "date": qa.started_at.isoformat() if qa.started_at else None,
+                "score": f"{int(qa.score_percent) if qa.score_percent is not None else 0}%",
+            })
 
     recent_practice = []
-    p_query = select(PracticeAttempt).where(PracticeAttempt.user_id == user.id)
-    if date_from:
-        p_query = p_query.where(PracticeAttempt.started_at >= date_from)
-    p_attempts = session.exec(p_query.order_by(PracticeAttempt.started_at.desc())).all()[:5]
-    
-    for pa in p_attempts:
-        topic_obj = session.exec(select(Topic).where(Topic.id == pa.topic_id)).first()
-        # Apply topic filter
+    if not (source and source != "All" and source.lower() != "practice"):
+        p_query = (
+            select(PracticeAttempt, Topic)
+            .join(Topic, Topic.id == PracticeAttempt.topic_id, isouter=True)
+            .where(PracticeAttempt.user_id == user.id)
+        )
+        if date_from:
+            p_query = p_query.where(PracticeAttempt.started_at >= date_from)
         if topic and topic != "All topics":
-            if not topic_obj or (topic_obj.name.lower() != topic.lower() and topic_obj.slug.lower() != topic.lower()):
-                continue
-        # Apply source filter
-        if source and source != "All" and source.lower() != "practice":
-            continue
-        pis = session.exec(select(PracticeInteraction).where(PracticeInteraction.attempt_id == pa.id)).all()
-        problems = len(pis)
-        correct = len([p for p in pis if p.is_correct])
-        correct_pct = int(round((correct / problems) * 100)) if problems > 0 else 0
-        recent_practice.append({
-            "id": pa.id,
-            "name": f"Practice: {topic_obj.name if topic_obj else pa.topic_id}",
-            "problems": problems,
-            "correct": f"{correct_pct}% correct",
-        })
-
-    # Goal progress: count interactions today
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_attempts = session.exec(select(PracticeAttempt).where(
-        PracticeAttempt.user_id == user.id,
-        PracticeAttempt.started_at >= today_start
-    )).all()
-    today_attempt_ids = [a.id for a in today_attempts]
-    if today_attempt_ids:
-        today_interactions = session.exec(select(PracticeInteraction).where(PracticeInteraction.attempt_id.in_(today_attempt_ids))).all()
-        problems_today = len(today_interactions)
-    else:
-        problems_today = 0
-    
+            p_query = p_query.where(_topic_match(topic))
+        p_rows = session.exec(p_query.order_by(PracticeAttempt.started_at.desc()).limit(5)).all()
+
+        # problems / correct per attempt in one grouped query
+        attempt_counts = {}
+        if p_rows:
+            attempt_counts = {
+                aid: (problems, correct)
+                for aid, problems, correct in session.exec(
+                    select(
+                        PracticeInteraction.attempt_id,
+                        func.count(PracticeInteraction.id),
+                        func.sum(case((PracticeInteraction.is_correct == True, 1), else_=0)),
+                    )
+                    .where(PracticeInteraction.attempt_id.in_([pa.id for pa, _t in p_rows]))
+                    .group_by(PracticeInteraction.attempt_id)
+                ).all()
+            }
+        for pa, topic_obj in p_rows:
+            problems, correct = attempt_counts.get(pa.id, (0, 0))
+            correct_pct = int(round((correct / problems) * 100)) if problems > 0 else 0
+            recent_practice.append({
+                "id": pa.id,
+                "name": f"Practice: {topic_obj.name if topic_obj else pa.topic_id}",
+                "problems": problems,
+                "correct": f"{correct_pct}% correct",
+            })
+
+    # Goal progress: problems answered today
+    problems_today = session.exec(
+        select(func.coalesce(func.sum(ReviewRollup.answered), 0)).where(
+            ReviewRollup.user_id == user.id,
+            ReviewRollup.day == today,
+        )
+    ).one()
+
     # Assume daily goal is 10 problems
     daily_goal = 10
     goal_progress = min(1.0, problems_today / daily_goal) if daily_goal > 0 else 0.0
@@ -198,74 +218,248 @@ def review_summary(
     }
 
 
+def _practice_mistake_condition():
+    """SQL form of the practice 'mistake' rule used by the review endpoints.
+
+    An interaction counts as a mistake if it was recorded incorrect, or if it is
+    ungraded (is_correct is None) but the student submitted a non-blank answer
+    (i.e., they attempted and did not get automatic credit).
+    """
+    attempted = func.trim(func.coalesce(PracticeInteraction.answer_submitted, "")) != ""
+    return or_(
+        PracticeInteraction.is_correct == False,
+        (PracticeInteraction.is_correct.is_(None)) & attempted,
+    )
+
+
 @router.get("/practice_attempts/{attempt_id}/mistakes")
 def practice_attempt_mistakes(attempt_id: int, session: Session = Depends(get_session), user=Depends(auth.current_user)):
     # verify attempt belongs to user
-    pa = session.exec(select(PracticeAttempt).where(PracticeAttempt.id == attempt_id, PracticeAttempt.user_id == user.id)).first()
+    pa = session.exec(select(PracticeAttempt.id).where(PracticeAttempt.id == attempt_id, PracticeAttempt.user_id == user.id)).first()
     if not pa:
         return {"mistakes": []}
-    # fetch interactions in order for the attempt
-    pis = session.exec(
-        select(PracticeInteraction).where(PracticeInteraction.attempt_id == attempt_id).order_by(PracticeInteraction.id)
+    # mistaken interactions in order for the attempt, with question text joined in
+    rows = session.exec(
+        select(
+            PracticeInteraction.question_id,
+            Question.stem,
+            Question.answer,
+            PracticeInteraction.is_correct,
+            PracticeInteraction.answer_submitted,
+            PracticeInteraction.hints_requested,
+            PracticeInteraction.time_seconds,
+        )
+        .join(Question, Question.id == PracticeInteraction.question_id, isouter=True)
+        .where(PracticeInteraction.attempt_id == attempt_id, _practice_mistake_condition())
+        .order_by(PracticeInteraction.id)
     ).all()
 
-    mistakes = []
-    for p in pis:
-        # Consider an interaction a 'mistake' if it was recorded incorrect, or
-        # if it's ungraded (is_correct is None) but the student submitted an answer
-        # (i.e., they attempted and did not get automatic credit). This ensures
-        # we show all student mistakes made during the session.
-        attempted_answer = (p.answer_submitted is not None and str(p.answer_submitted).strip() != "")
-        is_mistake = (p.is_correct is False) or (p.is_correct is None and attempted_answer)
-        if is_mistake:
-            q = session.exec(select(Question).where(Question.id == p.question_id)).first()
-            mistakes.append({
-                "question_id": p.question_id,
-                "question_stem": q.stem if q else None,
-                "correct_answer": q.answer if q else None,
-                "is_correct": p.is_correct,
-                "submitted": p.answer_submitted,
-                "hints": p.hints_requested,
-                "time_seconds": p.time_seconds,
-            })
+    mistakes = [
+        {
+            "question_id": qid,
+            "question_stem": stem,
+            "correct_answer": answer,
+            "is_correct": is_correct,
+            "submitted": submitted,
+            "hints": hints,
+            "time_seconds": seconds,
+        }
+        for qid, stem, answer, is_correct, submitted, hints, seconds in rows
+    ]
     return {"mistakes": mistakes}
 
 
 @router.get("/quiz_attempts/{attempt_id}/mistakes")
-def quiz_attempt_mistakes(attempt_id: int, session: Session = Depends(get_session), user=Depends(auth.current_user)):
-    # Return quiz-level summary. The current data model does not store per-question
-    # interactions for quizzes, so return the quiz metadata and an empty mistakes list.
-    qa = session.exec(select(QuizAttempt).where(QuizAttempt.id == attempt_id, QuizAttempt.user_id == user.id)).first()
-    if not qa:
+def quiz_attempt_mistakes(
+    attempt_id: int,
+    only_incorrect: bool = False,
+    session: Session = Depends(get_session),
+    user=Depends(auth.current_user),
+):
+    # Quiz metadata plus the per-question rows persisted at submit time
+    # (only the incorrectly answered ones with only_incorrect=true)
+    found = session.exec(
+        select(QuizAttempt, Topic.name)
+        .join(Topic, Topic.id == QuizAttempt.topic_id, isouter=True)
+        .where(QuizAttempt.id == attempt_id, QuizAttempt.user_id == user.id)
+    ).first()
+    if not found:
         return {"mistakes": [], "quiz": None}
-    topic = session.exec(select(Topic).where(Topic.id == qa.topic_id)).first()
-    # Retrieve per-question rows if any were persisted at submit time
-    qa_rows = session.exec(select(QuizAttemptQuestion).where(QuizAttemptQuestion.attempt_id == attempt_id)).all()
-    mistakes = []
-    for r in qa_rows:
-        # join to question for more context
-        q = session.exec(select(Question).where(Question.id == r.question_id)).first()
-        mistakes.append({
-            "question_id": r.question_id,
-            "question_stem": q.stem if q else None,
-            "correct_answer": q.answer if q else None,
-            "given_answer": r.given_answer,
-            "is_correct": r.is_correct,
-            "position": r.position,
-            "info_score": r.info_score,
-            "time_seconds": r.time_seconds,
-            "hints": r.hints_requested,
-        })
+    qa, topic_name = found
+    q = (
+        select(
+            QuizAttemptQuestion.question_id,
+            Question.stem,
+            Question.answer,
+            QuizAttemptQuestion.given_answer,
+            QuizAttemptQuestion.is_correct,
+            QuizAttemptQuestion.position,
+            QuizAttemptQuestion.info_score,
+            QuizAttemptQuestion.time_seconds,
+            QuizAttemptQuestion.hints_requested,
+        )
+        .join(Question, Question.id == QuizAttemptQuestion.question_id, isouter=True)
+        .where(QuizAttemptQuestion.attempt_id == attempt_id)
+    )
+    if only_incorrect:
+        q = q.where(QuizAttemptQuestion.is_correct == False)
+    rows = session.exec(q.order_by(QuizAttemptQuestion.id)).all()
+    mistakes = [
+        {
+            "question_id": qid,
+            "question_stem": stem,
+            "correct_answer": answer,
+            "given_answer": given,
+            "is_correct": is_correct,
+            "position": position,
+            "info_score": info_score,
+            "time_seconds": seconds,
+            "hints": hints,
+        }
+        for qid, stem, answer, given, is_correct, position, info_score, seconds, hints in rows
+    ]
 
     return {
         "quiz": {
             "id": qa.id,
             "topic_id": qa.topic_id,
-            "topic_name": topic.name if topic else None,
+            "topic_name": topic_name,
             "started_at": qa.started_at.isoformat() if qa.started_at else None,
             "score_percent": qa.score_percent,
             "passed": bool(qa.passed),
         },
-        "mistakes": [m for m in mistakes if m.get('is_correct') is False],
+        "mistakes": mistakes,
         "note": "Quiz attempt metadata returned; per-question results included when available.",
     }
+
+
+def _parse_mistake_cursor(cursor: str):
+    """Split a `<answered_at iso>|<source>|<row id>` cursor; 400 on anything else."""
+    try:
+        ts, kind, row_id = cursor.split("|")
+        if kind not in ("practice", "quiz"):
+            raise ValueError(kind)
+        return datetime.fromisoformat(ts), kind, int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _before_cursor(answered_at_col, id_col, kind: str, cursor):
+    """Keyset condition for rows strictly after `cursor` in (answered_at, source, id) descending order."""
+    c_ts, c_kind, c_id = cursor
+    if kind < c_kind:
+        return answered_at_col <= c_ts
+    if kind > c_kind:
+        return answered_at_col < c_ts
+    return or_(answered_at_col < c_ts, (answered_at_col == c_ts) & (id_col < c_id))
+
+
+@router.get("/mistakes")
+def all_mistakes(
+    session: Session = Depends(get_session),
+    user=Depends(auth.current_user),
+    source: str = Query("all", pattern="^(all|practice|quiz)$"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+) -> Dict[str, Any]:
+    """Page through the current user's mistakes across every practice and quiz attempt, newest first.
+
+    Uses keyset pagination on (answered_at, source, id) so each page costs at most one
+    bounded query per source regardless of how far back the student scrolls. Pass the
+    returned `next_cursor` to get the following page; it is None on the last page.
+    """
+    after = _parse_mistake_cursor(cursor) if cursor else None
+    items = []
+
+    if source in ("all", "practice"):
+        q = (
+            select(
+                PracticeInteraction.id,
+                PracticeInteraction.answered_at,
+                PracticeInteraction.attempt_id,
+                PracticeInteraction.question_id,
+                Question.stem,
+                Question.answer,
+                PracticeInteraction.answer_submitted,
+                PracticeInteraction.is_correct,
+                PracticeInteraction.hints_requested,
+                PracticeInteraction.time_seconds,
+                Topic.name,
+            )
+            .join(Question, Question.id == PracticeInteraction.question_id, isouter=True)
+            .join(Topic, Topic.id == Question.topic_id, isouter=True)
+            .where(
+                PracticeInteraction.user_id == user.id,
+                PracticeInteraction.answered_at.isnot(None),
+                _practice_mistake_condition(),
+            )
+        )
+        if after:
+            q = q.where(_before_cursor(PracticeInteraction.answered_at, PracticeInteraction.id, "practice", after))
+        for row_id, ts, aid, qid, stem, answer, given, ok, hints, seconds, topic_name in session.exec(
+            q.order_by(PracticeInteraction.answered_at.desc(), PracticeInteraction.id.desc()).limit(limit + 1)
+        ).all():
+            items.append(((ts, "practice", row_id), {
+                "source": "practice",
+                "attempt_id": aid,
+                "question_id": qid,
+                "topic_name": topic_name,
+                "question_stem": stem,
+                "correct_answer": answer,
+                "submitted": given,
+                "is_correct": ok,
+                "hints": hints,
+                "time_seconds": seconds,
+                "answered_at": ts.isoformat(),
+            }))
+
+    if source in ("all", "quiz"):
+        q = (
+            select(
+                QuizAttemptQuestion.id,
+                QuizAttemptQuestion.answered_at,
+                QuizAttemptQuestion.attempt_id,
+                QuizAttemptQuestion.question_id,
+                Question.stem,
+                Question.answer,
+                QuizAttemptQuestion.given_answer,
+                QuizAttemptQuestion.is_correct,
+                QuizAttemptQuestion.hints_requested,
+                QuizAttemptQuestion.time_seconds,
+                Topic.name,
+            )
+            .join(Question, Question.id == QuizAttemptQuestion.question_id, isouter=True)
+            .join(Topic, Topic.id == Question.topic_id, isouter=True)
+            .where(
+                QuizAttemptQuestion.user_id == user.id,
+                QuizAttemptQuestion.answered_at.isnot(None),
+                QuizAttemptQuestion.is_correct == False,
+            )
+        )
+        if after:
+            q = q.where(_before_cursor(QuizAttemptQuestion.answered_at, QuizAttemptQuestion.id, "quiz", after))
+        for row_id, ts, aid, qid, stem, answer, given, ok, hints, seconds, topic_name in session.exec(
+            q.order_by(QuizAttemptQuestion.answered_at.desc(), QuizAttemptQuestion.id.desc()).limit(limit + 1)
+        ).all():
+            items.append(((ts, "quiz", row_id), {
+                "source": "quiz",
+                "attempt_id": aid,
+                "question_id": qid,
+                "topic_name": topic_name,
+                "question_stem": stem,
+                "correct_answer": answer,
+                "submitted": given,
+                "is_correct": ok,
+                "hints": hints,
+                "time_seconds": seconds,
+                "answered_at": ts.isoformat(),
+            }))
+
+    # merge both sources into one (answered_at, source, id) descending page
+    items.sort(key=lambda kv: kv[0], reverse=True)
+    page = items[:limit]
+    next_cursor = None
+    if len(items) > limit:
+        ts, kind, row_id = page[-1][0]
+        next_cursor = f"{ts.isoformat()}|{kind}|{row_id}"
+    return {"mistakes": [m for _key, m in page], "next_cursor": next_cursor}
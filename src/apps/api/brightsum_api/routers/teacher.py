@@ -1,17 +1,21 @@
-from typing import List, Optional, Dict
+from typing import List, Optional
+import json
 import os
-import re
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from pydantic import BaseModel
+from sqlalchemy import delete, func, or_
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
 from ..db import get_session
 from .. import auth
-from ..models import Topic, Question, QuestionHint, LessonSlide, PracticeInteraction, PracticeAttempt, QuizAttempt, MasteryState
+from ..models import Topic, Question, QuestionHint, LessonSlide, PracticeInteraction, PracticeAttempt, QuizAttempt, QuizAttemptQuestion, MasteryState, SeenQuestionBitmap, ReviewRollup, ImportJob, ImportJobRow, QuestionStats, ClassTopicRollup
+from ..ml import difficulty_index, near_duplicates
+from ..services import http_cache, import_jobs, practice_session, question_export, question_import, question_update, quiz_forms, search
+from ..services.question_hash import content_hash
 from fastapi import UploadFile, File
-from fastapi.responses import StreamingResponse
-import csv
-from io import StringIO
+from fastapi.responses import JSONResponse, StreamingResponse
+from io import StringIO, TextIOWrapper
 
 router = APIRouter()
 
@@ -50,6 +54,8 @@ class QuestionOut(BaseModel):
     base_difficulty: str
     is_quiz_only: bool
     hints: Optional[List[str]] = None
+    # set by create/update: existing questions whose stem is nearly the same
+    near_duplicates: Optional[List[dict]] = None
 
 
 def require_teacher(user = Depends(auth.current_user)):
@@ -58,6 +64,25 @@ def require_teacher(user = Depends(auth.current_user)):
     return user
 
 
+def _invalidate_topic_caches(*topic_ids: Optional[int]):
+    """Drop in-memory per-topic caches after the topic's question bank changed.
+
+    Called after the change committed; the content ETag and topic version bumps
+    commit on their own. The topic version tells other worker processes that
+    their caches of the topic are stale.
+    """
+    http_cache.bump_content()
+    for tid in set(topic_ids):
+        if tid is not None:
+            http_cache.bump_topic(tid)
+            difficulty_index.invalidate_topic(tid)
+            practice_session.evict_topic(tid)
+            quiz_forms.invalidate_topic(tid)
+
+
+import_jobs.add_topic_listener(_invalidate_topic_caches)
+
+
 @router.get("/topics", response_model=List[TopicOut])
 def list_topics(session: Session = Depends(get_session), _=Depends(require_teacher)):
     topics = session.exec(select(Topic)).all()
@@ -71,6 +96,7 @@ def create_topic(body: TopicIn, session: Session = Depends(get_session), _=Depen
         raise HTTPException(status_code=400, detail="Topic slug already exists")
     topic = Topic(slug=body.slug, name=body.name or body.slug, description=body.description, estimated_time_min=body.estimated_time_min, objectives=body.objectives)
     session.add(topic)
+    http_cache.bump_content(session)
     session.commit()
     session.refresh(topic)
     return TopicOut(id=topic.id, slug=topic.slug, name=topic.name, description=topic.description, estimated_time_min=topic.estimated_time_min, objectives=topic.objectives)
@@ -96,6 +122,7 @@ def update_topic(topic_id: int, body: TopicIn, session: Session = Depends(get_se
     topic.estimated_time_min = body.estimated_time_min
     topic.objectives = body.objectives
     session.add(topic)
+    http_cache.bump_content(session)
     session.commit()
     session.refresh(topic)
     return TopicOut(id=topic.id, slug=topic.slug, name=topic.name, description=topic.description, estimated_time_min=topic.estimated_time_min, objectives=topic.objectives)
@@ -106,103 +133,124 @@ def delete_topic(topic_id: int, session: Session = Depends(get_session), _=Depen
     """Delete a topic and related data. This will remove:
       - lesson slides for the topic
       - question hints for questions in the topic
-      - practice interactions that reference those questions
+      - practice interactions and quiz attempt questions that reference those questions
       - questions in the topic
       - practice attempts, quiz attempts and mastery states for the topic
 
+    Everything is removed with set-based DELETEs in one transaction, so a large
+    topic is never loaded into memory and nothing is left half-deleted.
     Returns counts of deleted rows for client confirmation.
     """
     # ensure topic exists
-    topic = session.exec(select(Topic).where(Topic.id == topic_id)).first()
-    if not topic:
+    if session.get(Topic, topic_id) is None:
         raise HTTPException(status_code=404, detail="Topic not found")
 
-    # gather question ids for the topic
-    questions = session.exec(select(Question).where(Question.topic_id == topic_id)).all()
-    qids = [q.id for q in questions]
-
-    deleted = {
-        'lesson_slides': 0,
-        'question_hints': 0,
-        'practice_interactions': 0,
-        'questions': 0,
-        'practice_attempts': 0,
-        'quiz_attempts': 0,
-        'mastery_states': 0,
-        'topic': 0,
-    }
-
-    # delete lesson slides
-    slides = session.exec(select(LessonSlide).where(LessonSlide.topic_id == topic_id)).all()
-    for s in slides:
-        session.delete(s)
-        deleted['lesson_slides'] += 1
+    topic_questions = select(Question.id).where(Question.topic_id == topic_id)
+    practice_attempts = select(PracticeAttempt.id).where(PracticeAttempt.topic_id == topic_id)
+    quiz_attempts = select(QuizAttempt.id).where(QuizAttempt.topic_id == topic_id)
+    # children before parents, in the order the foreign keys require
+    steps = [
+        ('question_hints', delete(QuestionHint).where(QuestionHint.question_id.in_(topic_questions))),
+        ('practice_interactions', delete(PracticeInteraction).where(or_(
+            PracticeInteraction.question_id.in_(topic_questions),
+            PracticeInteraction.attempt_id.in_(practice_attempts),
+        ))),
+        ('quiz_attempt_questions', delete(QuizAttemptQuestion).where(or_(
+            QuizAttemptQuestion.question_id.in_(topic_questions),
+            QuizAttemptQuestion.attempt_id.in_(quiz_attempts),
+        ))),
+        ('question_stats', delete(QuestionStats).where(QuestionStats.question_id.in_(topic_questions))),
+        ('questions', delete(Question).where(Question.topic_id == topic_id)),
+        ('lesson_slides', delete(LessonSlide).where(LessonSlide.topic_id == topic_id)),
+        ('practice_attempts', delete(PracticeAttempt).where(PracticeAttempt.topic_id == topic_id)),
+        ('quiz_attempts', delete(QuizAttempt).where(QuizAttempt.topic_id == topic_id)),
+        ('mastery_states', delete(MasteryState).where(MasteryState.topic_id == topic_id)),
+        ('seen_bitmaps', delete(SeenQuestionBitmap).where(SeenQuestionBitmap.topic_id == topic_id)),
+        ('review_rollups', delete(ReviewRollup).where(ReviewRollup.topic_id == topic_id)),
+        ('class_rollups', delete(ClassTopicRollup).where(ClassTopicRollup.topic_id == topic_id)),
+        ('topic', delete(Topic).where(Topic.id == topic_id)),
+    ]
+    deleted = {}
+    conn = session.connection()
+    for name, stmt in steps:
+        deleted[name] = conn.execute(stmt).rowcount
     session.commit()
+    _invalidate_topic_caches(topic_id)
+    near_duplicates.remove_topic(topic_id)
 
-    # delete question hints for questions in topic
-    if qids:
-        hints = session.exec(select(QuestionHint).where(QuestionHint.question_id.in_(qids))).all()
-        for h in hints:
-            session.delete(h)
-            deleted['question_hints'] += 1
-        session.commit()
-
-        # delete practice interactions referencing those questions
-        interactions = session.exec(select(PracticeInteraction).where(PracticeInteraction.question_id.in_(qids))).all()
-        for pi in interactions:
-            session.delete(pi)
-            deleted['practice_interactions'] += 1
-        session.commit()
+    return deleted
 
-        # delete the questions themselves
-        for q in questions:
-            session.delete(q)
-            deleted['questions'] += 1
-        session.commit()
 
-    # delete practice attempts, quiz attempts and mastery states tied to this topic
-    pats = session.exec(select(PracticeAttempt).where(PracticeAttempt.topic_id == topic_id)).all()
-    for p in pats:
-        session.delete(p)
-        deleted['practice_attempts'] += 1
-    session.commit()
+QUESTION_FIELDS = set(QuestionOut.model_fields) - {"near_duplicates"}
+QUESTION_PAGE_SIZE = 200
+MAX_QUESTION_PAGE_SIZE = 1000
 
-    qats = session.exec(select(QuizAttempt).where(QuizAttempt.topic_id == topic_id)).all()
-    for q in qats:
-        session.delete(q)
-        deleted['quiz_attempts'] += 1
-    session.commit()
 
-    ms = session.exec(select(MasteryState).where(MasteryState.topic_id == topic_id)).all()
-    for m in ms:
-        session.delete(m)
-        deleted['mastery_states'] += 1
-    session.commit()
-
-    # finally delete the topic
-    session.delete(topic)
-    session.commit()
-    deleted['topic'] = 1
-
-    return deleted
+def _question_out(q: Question, hints: List[str], similar: Optional[List[dict]] = None) -> QuestionOut:
+    return QuestionOut(id=q.id, topic_id=q.topic_id, stem=q.stem, answer=q.answer, base_difficulty=q.base_difficulty, is_quiz_only=q.is_quiz_only, hints=hints, near_duplicates=similar)
 
 
 @router.get("/questions", response_model=List[QuestionOut])
-def list_questions(topic: Optional[str] = None, session: Session = Depends(get_session), _=Depends(require_teacher)):
-    q = select(Question)
+def list_questions(
+    response: Response,
+    topic: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: int = QUESTION_PAGE_SIZE,
+    fields: Optional[str] = None,
+    session: Session = Depends(get_session),
+    _=Depends(require_teacher),
+):
+    """List questions by id, one page at a time.
+
+    Returns up to `limit` (default QUESTION_PAGE_SIZE, at most
+    MAX_QUESTION_PAGE_SIZE) questions with id > `after_id` and sets the
+    `X-Next-After-Id` header when there is another page. `fields` is
+    a comma-separated subset of the question fields to return (hints are only
+    fetched when requested).
+    """
+    wanted = None
+    if fields:
+        wanted = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = wanted - QUESTION_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown field: {', '.join(sorted(unknown))}")
+        wanted.add("id")
+    q = select(Question).order_by(Question.id)
     if topic:
         # join via topic slug lookup
-        t = session.exec(select(Topic).where(Topic.slug == topic)).first()
-        if not t:
+        topic_id = session.exec(select(Topic.id).where(Topic.slug == topic)).first()
+        if topic_id is None:
             return []
-        q = select(Question).where(Question.topic_id == t.id)
-    results = session.exec(q).all()
-    out = []
-    for r in results:
-        hints = session.exec(select(QuestionHint).where(QuestionHint.question_id == r.id).order_by(QuestionHint.ordering)).all()
-        hint_texts = [hh.hint_text for hh in hints] if hints else []
-        out.append(QuestionOut(id=r.id, topic_id=r.topic_id, stem=r.stem, answer=r.answer, base_difficulty=r.base_difficulty, is_quiz_only=r.is_quiz_only, hints=hint_texts))
-    return out
+        q = q.where(Question.topic_id == topic_id)
+    if after_id is not None:
+        q = q.where(Question.id > after_id)
+    limit = max(1, min(limit, MAX_QUESTION_PAGE_SIZE))
+    results = session.exec(q.limit(limit + 1)).all()
+    if len(results) > limit:
+        results = results[:limit]
+        response.headers["X-Next-After-Id"] = str(results[-1].id)
+    if wanted is None or "hints" in wanted:
+        hints = question_update.hints_by_question(session, [r.id for r in results])
+    else:
+        hints = {}
+    out = [_question_out(r, hints.get(r.id)) for r in results]
+    if wanted is None:
+        return out
+    # projected rows don't fit QuestionOut; bypass response_model validation
+    return JSONResponse(
+        [r.model_dump(include=wanted) for r in out],
+        headers={k: v for k, v in response.headers.items() if k.lower() == "x-next-after-id"},
+    )
+
+
+def _similar_questions(session: Session, question: Question) -> List[dict]:
+    """Near-duplicate candidates for a question's stem in its topic, excluding the question itself."""
+    return [
+        {"id": qid, "similarity": round(sim, 2)}
+        for qid, sim in near_duplicates.find_similar(
+            session, question.stem, exclude_id=question.id, topic_id=question.topic_id
+        )
+    ]
 
 
 @router.post("/questions", response_model=QuestionOut)
@@ -217,19 +265,21 @@ def create_question(body: QuestionIn, session: Session = Depends(get_session), u
     # Basic validation
     if not body.stem.strip() or not body.answer.strip():
         raise HTTPException(status_code=400, detail="Stem and answer are required")
-    # Duplicate detection: avoid inserting exact duplicates
-    existing_q = session.exec(
-        select(Question).where(
-            Question.topic_id == topic.id,
-            Question.stem == body.stem,
-            Question.answer == body.answer,
-        )
+    # Duplicate detection: same topic and normalized stem/answer (indexed lookup)
+    chash = content_hash(body.stem, body.answer)
+    existing_id = session.exec(
+        select(Question.id).where(Question.topic_id == topic.id, Question.content_hash == chash)
     ).first()
-    if existing_q:
-        raise HTTPException(status_code=409, detail=f"Duplicate question exists (id={existing_q.id})")
-    question = Question(topic_id=topic.id, stem=body.stem, answer=body.answer, base_difficulty=body.base_difficulty, is_quiz_only=bool(body.is_quiz_only))
+    if existing_id:
+        raise HTTPException(status_code=409, detail=f"Duplicate question exists (id={existing_id})")
+    question = Question(topic_id=topic.id, stem=body.stem, answer=body.answer, base_difficulty=body.base_difficulty, is_quiz_only=bool(body.is_quiz_only), content_hash=chash)
     session.add(question)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        # a concurrent request inserted the same content first
+        session.rollback()
+        raise HTTPException(status_code=409, detail="Duplicate question exists")
     session.refresh(question)
     # save hints if provided
     if getattr(body, 'hints', None):
@@ -237,27 +287,10 @@ def create_question(body: QuestionIn, session: Session = Depends(get_session), u
             hint = QuestionHint(question_id=question.id, level=min(3, max(1, idx)), hint_text=ht, ordering=idx)
             session.add(hint)
         session.commit()
-    hints = session.exec(select(QuestionHint).where(QuestionHint.question_id == question.id).order_by(QuestionHint.ordering)).all()
-    hint_texts = [h.hint_text for h in hints] if hints else []
-    return QuestionOut(id=question.id, topic_id=question.topic_id, stem=question.stem, answer=question.answer, base_difficulty=question.base_difficulty, is_quiz_only=question.is_quiz_only, hints=hint_texts)
-
-
-def _slugify(s: str) -> str:
-    s = (s or '').strip().lower()
-    s = re.sub(r'[^a-z0-9\s-]', '', s)
-    s = re.sub(r'\s+', '-', s)
-    s = re.sub(r'-+', '-', s)
-    return s
-
-
-FIELD_SYNONYMS: Dict[str, List[str]] = {
-    'topic_slug': ['topic key', 'topic_key', 'topic-slug', 'topic_slug', 'topic slug', 'topic', 'topic_name', 'topic name', 'topic title'],
-    'stem': ['prompt', 'stem', 'question', 'question_text', 'prompt_text'],
-    'answer': ['answer', 'correct_answer'],
-    'base_difficulty': ['difficulty', 'base_difficulty', 'level'],
-    'is_quiz_only': ['quiz only', 'is_quiz_only', 'quiz_only', 'quizonly', 'is_quiz'],
-    'hints': ['hints', 'hint', 'hint_text', 'hints_list', 'hints[]']
-}
+    _invalidate_topic_caches(topic.id)
+    similar = _similar_questions(session, question)
+    near_duplicates.add_question(question.id, question.topic_id, question.stem)
+    return _question_out(question, list(body.hints or []), similar)
 
 
 @router.get("/questions/template.csv")
@@ -271,6 +304,30 @@ def download_template(_=Depends(require_teacher)):
     return StreamingResponse(StringIO(csv_content), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=question_import_template.csv"})
 
 
+@router.get("/questions/export")
+def export_questions(
+    format: str = "csv",
+    topic: Optional[str] = None,
+    session: Session = Depends(get_session),
+    _=Depends(require_teacher),
+):
+    """Stream the question bank, or one topic's questions, with their hints.
+
+    `format=csv` uses the import template's headers so the file can be
+    imported again; `format=ndjson` writes one JSON object per question.
+    """
+    if format not in question_export.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    topic_id = None
+    if topic:
+        topic_id = session.exec(select(Topic.id).where(Topic.slug == topic)).first()
+        if topic_id is None:
+            raise HTTPException(status_code=404, detail="Topic not found")
+    rows = question_export.export_csv(topic_id) if format == "csv" else question_export.export_ndjson(topic_id)
+    filename = f"questions-{topic or 'all'}.{format}"
+    return StreamingResponse(rows, media_type=question_export.FORMATS[format], headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
 @router.post("/questions/import")
 def import_questions(file: UploadFile = File(...), session: Session = Depends(get_session), _=Depends(require_teacher)):
     """Import questions from an uploaded CSV file.
@@ -287,114 +344,256 @@ def import_questions(file: UploadFile = File(...), session: Session = Depends(ge
     if file.content_type not in ("text/csv", "application/vnd.ms-excel", "text/plain"):
         raise HTTPException(status_code=400, detail="File must be a CSV")
 
-    text = file.file.read().decode('utf-8')
-    reader = csv.DictReader(StringIO(text))
-    fieldnames = [c.strip() for c in (reader.fieldnames or [])]
-    lower_to_actual = {c.lower(): c for c in fieldnames}
-
-    # build mapping from canonical field -> actual CSV header
-    mapping: Dict[str, Optional[str]] = {}
-    for canonical, syns in FIELD_SYNONYMS.items():
-        found = None
-        for s in syns:
-            if s in lower_to_actual:
-                found = lower_to_actual[s]
-                break
-        mapping[canonical] = found
-
-    # Require at least one topic identifier plus stem and answer
-    missing = []
-    if not mapping.get('topic_slug'):
-        missing.append('Topic or Topic Key')
-    if not mapping.get('stem'):
-        missing.append('Prompt')
-    if not mapping.get('answer'):
-        missing.append('Answer')
-    if missing:
-        raise HTTPException(status_code=400, detail=f"Missing required columns: {', '.join(missing)}")
-
-    rows = []
-    created = 0
-    failed = 0
-    duplicate = 0
-    for i, row in enumerate(reader, start=1):
-        try:
-            # read values using mapped headers (fall back to empty)
-            raw_topic = (row.get(mapping.get('topic_slug')) or '').strip() if mapping.get('topic_slug') else ''
-            stem = (row.get(mapping.get('stem')) or '').strip() if mapping.get('stem') else ''
-            answer = (row.get(mapping.get('answer')) or '').strip() if mapping.get('answer') else ''
-            hints_raw = (row.get(mapping.get('hints')) or '').strip() if mapping.get('hints') else ''
-            base_difficulty = (row.get(mapping.get('base_difficulty')) or 'medium').strip().lower() if mapping.get('base_difficulty') else 'medium'
-            is_quiz_only_raw = (row.get(mapping.get('is_quiz_only')) or '0').strip() if mapping.get('is_quiz_only') else '0'
-
-            if not raw_topic or not stem or not answer:
-                raise ValueError('Topic, Prompt and Answer are required')
-
-            # Normalize difficulty
-            if base_difficulty not in ('easy', 'medium', 'hard'):
-                raise ValueError('Difficulty must be one of easy, medium, hard')
-
-            is_quiz_only = str(is_quiz_only_raw).lower() in ('1', 'true', 'yes')
-
-            # Determine topic slug: if the provided topic looks like a machine key use as-is, otherwise slugify
-            topic_slug = raw_topic
-            if ' ' in topic_slug or topic_slug != topic_slug.lower() or not re.match(r'^[a-z0-9\-]+$', topic_slug):
-                topic_slug = _slugify(topic_slug)
-            if not topic_slug:
-                raise ValueError('Invalid topic value')
-
-            # ensure topic exists
-            topic = session.exec(select(Topic).where(Topic.slug == topic_slug)).first()
-            if not topic:
-                topic = Topic(slug=topic_slug, name=raw_topic)
-                session.add(topic)
-                session.commit()
-                session.refresh(topic)
-            # duplicate detection: same topic, stem, answer
-            existing_q = session.exec(
-                select(Question).where(
-                    Question.topic_id == topic.id,
-                    Question.stem == stem,
-                    Question.answer == answer,
-                )
-            ).first()
-            if existing_q:
-                rows.append({"row": i, "status": "duplicate", "id": existing_q.id})
-                duplicate += 1
-            else:
-                q = Question(topic_id=topic.id, stem=stem, answer=answer, base_difficulty=base_difficulty, is_quiz_only=is_quiz_only)
-                session.add(q)
-                session.commit()
-                session.refresh(q)
-                # parse hints and insert if present. Accept JSON array or '||' separated text.
-                parsed_hints: List[str] = []
-                if hints_raw:
-                    h = hints_raw
-                    # JSON array
-                    if h.startswith('['):
-                        try:
-                            import json
-                            arr = json.loads(h)
-                            if isinstance(arr, list):
-                                parsed_hints = [str(x).strip() for x in arr if str(x).strip()]
-                        except Exception:
-                            parsed_hints = []
-                    else:
-                        # split by double-pipe, single pipe, or semicolon
-                        parts = [p.strip() for p in re.split(r"\|\||\||;", h) if p.strip()]
-                        parsed_hints = parts
-                for idx, hint_text in enumerate(parsed_hints, start=1):
-                    hint = QuestionHint(question_id=q.id, level=min(3, max(1, idx)), hint_text=hint_text, ordering=idx)
-                    session.add(hint)
-                if parsed_hints:
-                    session.commit()
-                rows.append({"row": i, "status": "created", "id": q.id})
-                created += 1
-        except Exception as e:
-            rows.append({"row": i, "status": "failed", "error": str(e)})
-            failed += 1
-
-    return {"created": created, "duplicate": duplicate, "failed": failed, "rows": rows}
+    # parse straight from the spooled upload instead of reading it into memory
+    text_stream = TextIOWrapper(file.file, encoding='utf-8-sig', newline='')
+    try:
+        importer = question_import.import_csv(session, text_stream)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        text_stream.detach()
+
+    _invalidate_topic_caches(*importer.touched_topic_ids)
+    return {"created": importer.created, "duplicate": importer.duplicate, "failed": importer.failed, "rows": importer.results}
+
+
+def _job_out(job: ImportJob) -> dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "filename": job.filename,
+        "total_rows": job.total_rows,
+        "processed_rows": job.processed_rows,
+        "created": job.created,
+        "duplicate": job.duplicate,
+        "failed": job.failed,
+        "error": job.error,
+        "cancel_requested": job.cancel_requested,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+@router.post("/questions/import/jobs", status_code=202)
+def create_import_job(file: UploadFile = File(...), session: Session = Depends(get_session), user=Depends(require_teacher)):
+    """Queue a CSV import to run in the background and return its job id immediately.
+
+    Accepts the same file format as /questions/import. Poll
+    GET /questions/import/jobs/{job_id} for progress and row-level results.
+    """
+    if file.content_type not in ("text/csv", "application/vnd.ms-excel", "text/plain"):
+        raise HTTPException(status_code=400, detail="File must be a CSV")
+    job = import_jobs.create_job(session, user.id, file.filename, file.file)
+    return _job_out(job)
+
+
+@router.get("/questions/import/jobs/{job_id}")
+def get_import_job(
+    job_id: int,
+    rows_after: int = 0,
+    limit: int = 500,
+    session: Session = Depends(get_session),
+    user=Depends(require_teacher),
+):
+    """Return a job's status and counters plus a page of its row results.
+
+    Rows are ordered by CSV row number; pass the last returned row number as
+    `rows_after` to fetch the next page. Only the teacher who created the job
+    can see it.
+    """
+    job = session.get(ImportJob, job_id)
+    if not job or job.created_by != user.id:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    limit = max(1, min(limit, 5000))
+    rows = session.exec(
+        select(ImportJobRow)
+        .where(ImportJobRow.job_id == job_id, ImportJobRow.row > rows_after)
+        .order_by(ImportJobRow.row)
+        .limit(limit)
+    ).all()
+    out = _job_out(job)
+    out["rows"] = []
+    for r in rows:
+        if r.status == "failed":
+            out["rows"].append({"row": r.row, "status": r.status, "error": r.error})
+            continue
+        entry = {"row": r.row, "status": r.status, "id": r.question_id}
+        if r.near_duplicates:
+            entry["near_duplicates"] = json.loads(r.near_duplicates)
+        out["rows"].append(entry)
+    return out
+
+
+@router.post("/questions/import/jobs/{job_id}/cancel")
+def cancel_import_job(job_id: int, session: Session = Depends(get_session), user=Depends(require_teacher)):
+    """Stop a queued or running import; rows already committed are kept."""
+    job = session.get(ImportJob, job_id)
+    if not job or job.created_by != user.id:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    if job.status not in import_jobs.ACTIVE_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Import job already {job.status}")
+    job = import_jobs.request_cancel(session, job)
+    if job.status not in import_jobs.ACTIVE_STATUSES and job.status != "cancelled":
+        raise HTTPException(status_code=409, detail=f"Import job already {job.status}")
+    return _job_out(job)
+
+
+@router.get("/questions/near-duplicates")
+def near_duplicate_report(
+    topic: Optional[str] = None,
+    threshold: float = near_duplicates.DEFAULT_THRESHOLD,
+    limit: int = 200,
+    session: Session = Depends(get_session),
+    _=Depends(require_teacher),
+):
+    """List pairs of questions whose stems are nearly the same, most similar first.
+
+    `threshold` is the minimum estimated Jaccard similarity of the stems' word
+    shingles (0..1); `topic` restricts the report to one topic slug.
+    """
+    topic_id = None
+    if topic:
+        topic_id = session.exec(select(Topic.id).where(Topic.slug == topic)).first()
+        if topic_id is None:
+            raise HTTPException(status_code=404, detail="Topic not found")
+    threshold = min(1.0, max(0.1, threshold))
+    pairs = near_duplicates.report(session, threshold, topic_id, max(1, min(limit, 2000)))
+    ids = {qid for a, b, _sim in pairs for qid in (a, b)}
+    questions = {}
+    if ids:
+        questions = {
+            qid: {"id": qid, "topic_id": tid, "stem": stem, "answer": answer}
+            for qid, tid, stem, answer in session.exec(
+                select(Question.id, Question.topic_id, Question.stem, Question.answer).where(Question.id.in_(ids))
+            ).all()
+        }
+    return {
+        "threshold": threshold,
+        "pairs": [
+            {"similarity": round(sim, 2), "a": questions.get(a), "b": questions.get(b)}
+            for a, b, sim in pairs
+            if a in questions and b in questions
+        ],
+    }
+
+
+@router.get("/search")
+def search_content(
+    q: str,
+    topic: Optional[str] = None,
+    kind: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    session: Session = Depends(get_session),
+    _=Depends(require_teacher),
+):
+    """Full-text search over question stems, hints and lesson slides.
+
+    `kind` is a comma-separated subset of question,hint,slide. Every word of
+    `q` must match and the last one matches as a prefix, so results narrow as
+    the teacher types.
+    """
+    kinds = None
+    if kind:
+        kinds = [k.strip() for k in kind.split(",") if k.strip()]
+        unknown = [k for k in kinds if k not in search.KIND_CODES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown kind: {', '.join(unknown)}")
+    topic_id = None
+    if topic:
+        topic_id = session.exec(select(Topic.id).where(Topic.slug == topic)).first()
+        if topic_id is None:
+            raise HTTPException(status_code=404, detail="Topic not found")
+    limit = max(1, min(limit, 100))
+    offset = max(0, offset)
+    hits = search.search(session, q, topic_id, kinds, limit + 1, offset)
+    return {"results": hits[:limit], "has_more": len(hits) > limit}
+
+
+def _round_or_none(value: Optional[float], digits: int) -> Optional[float]:
+    return None if value is None else round(value, digits)
+
+
+STATS_SORTS = {
+    "attempts": QuestionStats.attempts,
+    "p_value": QuestionStats.p_value,
+    "discrimination": QuestionStats.discrimination,
+    "mean_time": QuestionStats.mean_time_seconds,
+    "mean_hints": QuestionStats.mean_hints,
+    "id": Question.id,
+}
+
+
+@router.get("/questions/stats")
+def question_statistics(
+    topic: Optional[str] = None,
+    sort: str = "p_value",
+    order: str = "asc",
+    min_attempts: int = 1,
+    p_min: Optional[float] = None,
+    p_max: Optional[float] = None,
+    max_discrimination: Optional[float] = None,
+    limit: int = 100,
+    offset: int = 0,
+    session: Session = Depends(get_session),
+    _=Depends(require_teacher),
+):
+    """Item analysis per question: attempts, p-value (proportion correct), mean
+    time and hints, and point-biserial discrimination against mastery.
+
+    Reads the running QuestionStats rows, so sorting and filtering a whole bank
+    never touches the answer history. Questions nobody answered yet appear
+    with zero attempts when `min_attempts=0`; missing values sort last.
+    """
+    if sort not in STATS_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(STATS_SORTS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    attempts = func.coalesce(QuestionStats.attempts, 0)
+    q = (
+        select(
+            Question.id, Question.topic_id, Question.stem, Question.base_difficulty, attempts, QuestionStats.correct,
+            QuestionStats.p_value, QuestionStats.mean_time_seconds, QuestionStats.mean_hints,
+            QuestionStats.discrimination, QuestionStats.mastery_n,
+        )
+        .outerjoin(QuestionStats, QuestionStats.question_id == Question.id)
+        .where(attempts >= max(0, min_attempts))
+    )
+    if topic:
+        topic_id = session.exec(select(Topic.id).where(Topic.slug == topic)).first()
+        if topic_id is None:
+            raise HTTPException(status_code=404, detail="Topic not found")
+        q = q.where(Question.topic_id == topic_id)
+    if p_min is not None:
+        q = q.where(QuestionStats.p_value >= p_min)
+    if p_max is not None:
+        q = q.where(QuestionStats.p_value <= p_max)
+    if max_discrimination is not None:
+        q = q.where(QuestionStats.discrimination <= max_discrimination)
+    key = STATS_SORTS[sort]
+    q = q.order_by((key.desc() if order == "desc" else key.asc()).nulls_last(), Question.id)
+    limit = max(1, min(limit, 1000))
+    rows = session.exec(q.limit(limit + 1).offset(max(0, offset))).all()
+    return {
+        "questions": [
+            {
+                "id": qid,
+                "topic_id": tid,
+                "stem": stem,
+                "base_difficulty": difficulty,
+                "attempts": n,
+                "correct": correct or 0,
+                "p_value": _round_or_none(p, 3),
+                "mean_time_seconds": _round_or_none(mean_time, 1),
+                "mean_hints": _round_or_none(mean_hints, 2),
+                "discrimination": _round_or_none(disc, 3),
+                "discrimination_n": mastery_n or 0,
+            }
+            for qid, tid, stem, difficulty, n, correct, p, mean_time, mean_hints, disc, mastery_n in rows[:limit]
+        ],
+        "has_more": len(rows) > limit,
+    }
 
 
 @router.get("/questions/{question_id}", response_model=QuestionOut)
@@ -402,58 +601,61 @@ def get_question(question_id: int, session: Session = Depends(get_session), _=De
     q = session.exec(select(Question).where(Question.id == question_id)).first()
     if not q:
         raise HTTPException(status_code=404, detail="Question not found")
-    hints = session.exec(select(QuestionHint).where(QuestionHint.question_id == q.id).order_by(QuestionHint.ordering)).all()
-    hint_texts = [h.hint_text for h in hints] if hints else []
-    return QuestionOut(id=q.id, topic_id=q.topic_id, stem=q.stem, answer=q.answer, base_difficulty=q.base_difficulty, is_quiz_only=q.is_quiz_only, hints=hint_texts)
+    return _question_out(q, question_update.hints_by_question(session, [q.id])[q.id])
 
 
 @router.put("/questions/{question_id}", response_model=QuestionOut)
 def update_question(question_id: int, body: QuestionIn, session: Session = Depends(get_session), _=Depends(require_teacher)):
-    q = session.exec(select(Question).where(Question.id == question_id)).first()
-    if not q:
+    fields = body.model_dump(exclude={"hints"} if body.hints is None else None)
+    (result,), touched = question_update.apply_updates(session, [{"id": question_id, **fields}])
+    if result["status"] == "not_found":
         raise HTTPException(status_code=404, detail="Question not found")
-    # ensure topic exists
-    topic = session.exec(select(Topic).where(Topic.slug == body.topic_slug)).first()
-    if not topic:
-        topic = Topic(slug=body.topic_slug, name=body.topic_slug)
-        session.add(topic)
-        session.commit()
-        session.refresh(topic)
-    # Duplicate detection: make sure another question with same topic/stem/answer doesn't exist
-    other = session.exec(
-        select(Question).where(
-            Question.topic_id == topic.id,
-            Question.stem == body.stem,
-            Question.answer == body.answer,
-            Question.id != question_id,
-        )
-    ).first()
-    if other:
-        raise HTTPException(status_code=409, detail=f"Another question with same content exists (id={other.id})")
-
-    q.topic_id = topic.id
-    q.stem = body.stem
-    q.answer = body.answer
-    q.base_difficulty = body.base_difficulty
-    q.is_quiz_only = bool(body.is_quiz_only)
-    session.add(q)
-    session.commit()
-    session.refresh(q)
-    # update hints: remove existing and replace with provided hints (if any)
-    if getattr(body, 'hints', None) is not None:
-        # delete existing hints
-        existing_hints = session.exec(select(QuestionHint).where(QuestionHint.question_id == q.id)).all()
-        for eh in existing_hints:
-            session.delete(eh)
-        session.commit()
-        # insert new hints
-        for idx, ht in enumerate(body.hints or [], start=1):
-            hint = QuestionHint(question_id=q.id, level=min(3, max(1, idx)), hint_text=ht, ordering=idx)
-            session.add(hint)
-        session.commit()
-    hints = session.exec(select(QuestionHint).where(QuestionHint.question_id == q.id).order_by(QuestionHint.ordering)).all()
-    hint_texts = [h.hint_text for h in hints] if hints else []
-    return QuestionOut(id=q.id, topic_id=q.topic_id, stem=q.stem, answer=q.answer, base_difficulty=q.base_difficulty, is_quiz_only=q.is_quiz_only, hints=hint_texts)
+    if result["status"] == "duplicate":
+        raise HTTPException(status_code=409, detail=f"Another question with same content exists (id={result['duplicate_of']})")
+    if result["status"] == "failed":
+        raise HTTPException(status_code=400, detail=result["error"])
+    _invalidate_topic_caches(*touched)
+    q = session.get(Question, question_id)
+    similar = _similar_questions(session, q)
+    if body.hints is not None:
+        hint_texts = list(body.hints)
+    else:
+        hint_texts = question_update.hints_by_question(session, [q.id])[q.id]
+    return _question_out(q, hint_texts, similar)
+
+
+class QuestionPatch(BaseModel):
+    id: int
+    topic_slug: Optional[str] = None
+    stem: Optional[str] = None
+    answer: Optional[str] = None
+    base_difficulty: Optional[str] = None
+    is_quiz_only: Optional[bool] = None
+    hints: Optional[List[str]] = None
+
+
+class QuestionPatchIn(BaseModel):
+    updates: List[QuestionPatch]
+
+
+@router.patch("/questions")
+def patch_questions(body: QuestionPatchIn, session: Session = Depends(get_session), _=Depends(require_teacher)):
+    """Apply partial updates to up to 1000 questions in one transaction.
+
+    Only the fields given for an item change; `hints` replaces the item's hint
+    list when it differs from the stored one. Returns a result per item with
+    status updated, unchanged, not_found, duplicate or failed.
+    """
+    if len(body.updates) > 1000:
+        raise HTTPException(status_code=400, detail="At most 1000 updates per request")
+    results, touched = question_update.apply_updates(
+        session, [u.model_dump(exclude_none=True) for u in body.updates]
+    )
+    _invalidate_topic_caches(*touched)
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    return {"counts": counts, "results": results}
 
 
 @router.delete("/questions/{question_id}")
@@ -461,6 +663,9 @@ def delete_question(question_id: int, session: Session = Depends(get_session), _
     q = session.exec(select(Question).where(Question.id == question_id)).first()
     if not q:
         raise HTTPException(status_code=404, detail="Question not found")
+    session.connection().execute(delete(QuestionStats).where(QuestionStats.question_id == question_id))
     session.delete(q)
     session.commit()
+    _invalidate_topic_caches(q.topic_id)
+    near_duplicates.remove_question(question_id)
     return {"message": "deleted"}
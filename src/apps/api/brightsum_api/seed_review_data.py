@@ -14,6 +14,7 @@ from sqlmodel import Session, select
 from .db import init_db, engine
 from .models import User, Topic, Question, QuestionHint, PracticeAttempt, PracticeInteraction, QuizAttempt, MasteryState
 from .auth import pwd
+from .services.question_hash import content_hash
 
 
 def make_user(session: Session, email: str, password: str) -> User:
@@ -41,7 +42,11 @@ def ensure_topic(session: Session, slug: str, name: str) -> Topic:
 
 
 def add_question(session: Session, topic: Topic, stem: str, answer: str, difficulty: str = "medium") -> Question:
-    q = Question(topic_id=topic.id, stem=stem, answer=answer, base_difficulty=difficulty, is_quiz_only=False)
+    chash = content_hash(stem, answer)
+    q = session.exec(select(Question).where(Question.topic_id == topic.id, Question.content_hash == chash)).first()
+    if q:
+        return q
+    q = Question(topic_id=topic.id, stem=stem, answer=answer, base_difficulty=difficulty, is_quiz_only=False, content_hash=chash)
     session.add(q)
     session.commit()
     session.refresh(q)
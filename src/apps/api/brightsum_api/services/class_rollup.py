@@ -0,0 +1,158 @@
+"""Maintenance of the per-class ClassTopicRollup table.
+
+One row per (class, topic, day) sums the graded practice answers and submitted
+quizzes of the class's current members. Practice and quiz submits call
+`record_practice_answer(...)` / `record_quiz(...)` in the same transaction as
+the answer, adding to the row of every class the student belongs to with an
+atomic upsert, and `add_member_history(...)` adds (or, with sign=-1, removes)
+a student's whole history when they join or leave a class. The class analytics
+endpoint then reads topics x days rows, however many students the class has.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from brightsum_api.models import ClassMember, ClassTopicRollup, PracticeAttempt, PracticeInteraction, QuizAttempt
+
+COUNTERS = ("answered", "correct", "hints", "time_seconds", "quizzes", "quizzes_passed", "quiz_score_sum")
+
+
+def class_ids_for(session: Session, user_id: int) -> List[int]:
+    return list(session.exec(select(ClassMember.class_id).where(ClassMember.user_id == user_id)).all())
+
+
+def _add(session: Session, class_ids: List[int], deltas: Dict[Tuple[int, date], dict]) -> None:
+    """Add counter deltas to every class's (topic, day) rows, creating missing ones.
+
+    The counters are incremented in the database with one
+    INSERT ... ON CONFLICT DO UPDATE, so concurrent submits neither lose
+    increments nor collide on the day's first insert.
+    """
+    if not class_ids or not deltas:
+        return
+    table = ClassTopicRollup.__table__
+    rows = [
+        {"class_id": class_id, "topic_id": topic_id, "day": day, **dict.fromkeys(COUNTERS, 0), **delta}
+        for class_id in sorted(class_ids)
+        for (topic_id, day), delta in sorted(deltas.items())
+    ]
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite_insert if dialect == "sqlite" else pg_insert)(table).values(rows)
+        session.exec(stmt.on_conflict_do_update(
+            index_elements=[table.c.class_id, table.c.topic_id, table.c.day],
+            set_={c: table.c[c] + stmt.excluded[c] for c in COUNTERS},
+        ))
+    else:
+        for row in rows:
+            key = (table.c.class_id == row["class_id"], table.c.topic_id == row["topic_id"], table.c.day == row["day"])
+            if session.exec(update(table).where(*key).values({c: table.c[c] + row[c] for c in COUNTERS})).rowcount == 0:
+                session.exec(insert(table).values(row))
+    if any(value < 0 for delta in deltas.values() for value in delta.values()):
+        # a departed student's activity was all there was
+        session.exec(delete(table).where(
+            table.c.class_id.in_(class_ids),
+            table.c.topic_id.in_({t for t, _d in deltas}),
+            table.c.day.in_({d for _t, d in deltas}),
+            table.c.answered <= 0,
+            table.c.quizzes <= 0,
+        ))
+
+
+def record_practice_answer(
+    session: Session,
+    user_id: int,
+    topic_id: int,
+    is_correct: bool,
+    hints: int = 0,
+    time_seconds: Optional[float] = None,
+    day: Optional[date] = None,
+) -> List[int]:
+    """Add one graded practice answer to the student's classes (the caller commits).
+
+    Returns the ids of those classes.
+    """
+    class_ids = class_ids_for(session, user_id)
+    if class_ids:
+        day = day or datetime.utcnow().date()
+        _add(session, class_ids, {(topic_id, day): {
+            "answered": 1,
+            "correct": 1 if is_correct else 0,
+            "hints": hints or 0,
+            "time_seconds": time_seconds or 0.0,
+        }})
+    return class_ids
+
+
+def record_quiz(
+    session: Session,
+    user_id: int,
+    topic_id: int,
+    score_percent: float,
+    passed: bool,
+    day: Optional[date] = None,
+) -> List[int]:
+    """Add one submitted quiz to the student's classes (the caller commits); returns their ids."""
+    class_ids = class_ids_for(session, user_id)
+    if class_ids:
+        day = day or datetime.utcnow().date()
+        _add(session, class_ids, {(topic_id, day): {
+            "quizzes": 1,
+            "quizzes_passed": 1 if passed else 0,
+            "quiz_score_sum": score_percent or 0.0,
+        }})
+    return class_ids
+
+
+def add_member_history(session: Session, class_id: int, user_id: int, sign: int = 1) -> None:
+    """Add (sign=1) or subtract (sign=-1) a student's whole history to a class's rollup.
+
+    Uses two grouped queries over that student's own answers; the caller commits.
+    """
+    deltas: Dict[Tuple[int, date], dict] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+    answered_day = func.date(func.coalesce(PracticeInteraction.answered_at, PracticeAttempt.started_at))
+    for topic_id, day, answered, correct, hints, seconds in session.exec(
+        select(
+            PracticeAttempt.topic_id,
+            answered_day,
+            func.count(PracticeInteraction.id),
+            func.sum(case((PracticeInteraction.is_correct == True, 1), else_=0)),
+            func.coalesce(func.sum(PracticeInteraction.hints_requested), 0),
+            func.coalesce(func.sum(PracticeInteraction.time_seconds), 0.0),
+        )
+        .join(PracticeAttempt, PracticeAttempt.id == PracticeInteraction.attempt_id)
+        .where(PracticeAttempt.user_id == user_id, PracticeInteraction.is_correct.isnot(None))
+        .group_by(PracticeAttempt.topic_id, answered_day)
+    ).all():
+        delta = deltas[(topic_id, _as_date(day))]
+        delta.update(answered=sign * answered, correct=sign * (correct or 0), hints=sign * hints, time_seconds=sign * seconds)
+
+    finished_day = func.date(QuizAttempt.finished_at)
+    for topic_id, day, quizzes, passed, score_sum in session.exec(
+        select(
+            QuizAttempt.topic_id,
+            finished_day,
+            func.count(QuizAttempt.id),
+            func.sum(case((QuizAttempt.passed == True, 1), else_=0)),
+            func.coalesce(func.sum(QuizAttempt.score_percent), 0.0),
+        )
+        .where(QuizAttempt.user_id == user_id, QuizAttempt.finished_at.isnot(None))
+        .group_by(QuizAttempt.topic_id, finished_day)
+    ).all():
+        delta = deltas[(topic_id, _as_date(day))]
+        delta.update(quizzes=sign * quizzes, quizzes_passed=sign * (passed or 0), quiz_score_sum=sign * score_sum)
+
+    if deltas:
+        _add(session, [class_id], dict(deltas))
+
+
+def _as_date(day) -> date:
+    return date.fromisoformat(day) if isinstance(day, str) else day
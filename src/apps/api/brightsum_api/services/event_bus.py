@@ -0,0 +1,156 @@
+"""In-process event bus for the live class dashboard.
+
+Submit endpoints publish small delta events (a graded answer, a mastery
+change, a hint request, a submitted quiz) for the classes a student belongs
+to, after their transaction committed. Each open dashboard stream is a
+`Subscriber` of one class; publishing hands the event to the subscriber's
+event loop with `call_soon_threadsafe`, so the sync endpoints (which run in
+the threadpool) never block on a slow client.
+
+Events are coalesced per subscriber: within one flush window repeated answers
+of a student on a topic are summed into one "answer" event, mastery changes
+collapse to the first `from` and last `to`, and hint requests on a question
+are counted. A dashboard therefore receives at most one event per student and
+kind per window however fast the class answers. A subscriber that falls too
+far behind is sent a single "resync" event instead of an unbounded backlog.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Optional, Set
+
+COALESCE_SECONDS = 0.25
+HEARTBEAT_SECONDS = 15.0
+MAX_PENDING = 1000
+
+
+class Subscriber:
+    """One open stream: pending coalesced events plus a wake-up for its loop."""
+
+    def __init__(self, class_id: int, loop: asyncio.AbstractEventLoop):
+        self.class_id = class_id
+        self.loop = loop
+        self.wake = asyncio.Event()
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._overflow = False
+
+    def offer(self, event: dict) -> None:
+        """Merge an event into the pending batch; safe to call from any thread."""
+        with self._lock:
+            if self._overflow:
+                return
+            key = _coalesce_key(event)
+            current = self._pending.get(key)
+            if current is None:
+                if len(self._pending) >= MAX_PENDING:
+                    self._overflow = True
+                    self._pending.clear()
+                else:
+                    self._pending[key] = dict(event)
+            else:
+                _merge(current, event)
+        self.loop.call_soon_threadsafe(self.wake.set)
+
+    def drain(self) -> list:
+        with self._lock:
+            if self._overflow:
+                self._overflow = False
+                return [{"type": "resync", "class_id": self.class_id}]
+            events = list(self._pending.values())
+            self._pending.clear()
+            return events
+
+
+def _coalesce_key(event: dict) -> tuple:
+    kind = event["type"]
+    if kind == "answer" or kind == "mastery":
+        return (kind, event["student_id"], event["topic_id"])
+    if kind == "hint":
+        return (kind, event["student_id"], event["question_id"])
+    return (kind, event.get("attempt_id"), id(event))
+
+
+def _merge(current: dict, new: dict) -> None:
+    kind = current["type"]
+    if kind == "answer":
+        current["answered"] += new["answered"]
+        current["correct"] += new["correct"]
+        current["last_question_id"] = new["last_question_id"]
+        current["last_correct"] = new["last_correct"]
+    elif kind == "mastery":
+        current["to"] = new["to"]
+    elif kind == "hint":
+        current["count"] += new["count"]
+        current["level"] = new["level"]
+    current["at"] = new["at"]
+
+
+_subscribers: Dict[int, Set[Subscriber]] = defaultdict(set)
+_lock = threading.Lock()
+
+
+def subscribe(class_id: int, loop: Optional[asyncio.AbstractEventLoop] = None) -> Subscriber:
+    sub = Subscriber(class_id, loop or asyncio.get_running_loop())
+    with _lock:
+        _subscribers[class_id].add(sub)
+    return sub
+
+
+def unsubscribe(sub: Subscriber) -> None:
+    with _lock:
+        subs = _subscribers.get(sub.class_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del _subscribers[sub.class_id]
+
+
+def has_subscribers() -> bool:
+    """Cheap check publishers use to skip building events nobody would see."""
+    return bool(_subscribers)
+
+
+def publish(class_ids: Iterable[int], event: dict) -> None:
+    """Deliver an event to every stream watching one of the classes."""
+    if not _subscribers:
+        return
+    event = {**event, "at": datetime.utcnow().isoformat()}
+    with _lock:
+        targets = [sub for cid in set(class_ids) for sub in _subscribers.get(cid, ())]
+    for sub in targets:
+        try:
+            sub.offer(event)
+        except RuntimeError:
+            # the stream's event loop is closed; it unsubscribes on its way out
+            pass
+
+
+def _sse(kind: str, data: dict) -> str:
+    return f"event: {kind}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream(sub: Subscriber, is_disconnected=None) -> AsyncIterator[str]:
+    """Server-Sent Events for a subscriber: batches every COALESCE_SECONDS, heartbeats while idle."""
+    try:
+        yield _sse("ready", {"class_id": sub.class_id})
+        while True:
+            try:
+                await asyncio.wait_for(sub.wake.wait(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if is_disconnected is not None and await is_disconnected():
+                    return
+                yield ": heartbeat\n\n"
+                continue
+            # let further events of this burst coalesce before sending
+            await asyncio.sleep(COALESCE_SECONDS)
+            sub.wake.clear()
+            events = sub.drain()
+            if events:
+                yield "".join(_sse(e["type"], e) for e in events)
+    finally:
+        unsubscribe(sub)
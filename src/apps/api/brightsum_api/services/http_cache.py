@@ -0,0 +1,175 @@
+"""ETag / If-None-Match support for read-mostly student endpoints.
+
+ETags are derived from version counters instead of response bodies, so a
+matching If-None-Match can be answered with 304 before any DB work happens:
+
+- a content version, bumped whenever teachers change topics or questions
+- a per-user write counter, bumped when that user starts or submits practice
+  and quizzes
+
+Endpoints opt in with `dependencies=[Depends(etag_guard("content"))]` (topic
+data) or `etag_guard("user")` (per-user data such as the review summary). The
+guard identifies the user from the bearer token without a DB lookup, and the
+`NotModified` exception is turned into an empty 304 by the handler registered
+in main.py.
+
+The versions are CacheVersion rows, so every worker process validates against
+the same counters (a per-topic "topic:<id>" counter also lets per-process
+caches such as services/quiz_forms.py notice edits made through another
+worker); the guard reads the (at most two) rows it needs with one
+keyed query. Bumps are atomic upsert increments. Writers pass their session
+to bump in the same transaction as the change; bumping after the change has
+committed (own transaction, session=None) is also safe, since a reader only
+ever pairs an old version with new data, never the other way round. Hit/miss
+metrics are per process.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from brightsum_api.auth import token_subject
+from brightsum_api.db import engine
+from brightsum_api.models import CacheVersion
+
+CONTENT_KEY = "content"
+
+_LOCK = threading.Lock()
+# route path -> {"hits": n, "misses": n}
+_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+def _user_key(email: str) -> str:
+    return f"user:{email}"
+
+
+def topic_key(topic_id: int) -> str:
+    return f"topic:{topic_id}"
+
+
+def _increment(session: Session, key: str) -> None:
+    table = CacheVersion.__table__
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite_insert if dialect == "sqlite" else pg_insert)(table).values(key=key, version=1)
+        session.exec(stmt.on_conflict_do_update(index_elements=[table.c.key], set_={"version": table.c.version + 1}))
+        return
+    if session.exec(update(table).where(table.c.key == key).values(version=table.c.version + 1)).rowcount == 0:
+        session.exec(insert(table).values(key=key, version=1))
+
+
+def _bump(key: str, session: Optional[Session]) -> None:
+    if session is not None:
+        _increment(session, key)
+        return
+    with Session(engine) as own:
+        _increment(own, key)
+        own.commit()
+
+
+def bump_content(session: Optional[Session] = None) -> None:
+    """Invalidate ETags of topic/question data after a teacher edit.
+
+    With a session the bump joins its transaction (the caller commits);
+    without one it is committed right away.
+    """
+    _bump(CONTENT_KEY, session)
+
+
+def bump_user(email: str, session: Optional[Session] = None) -> None:
+    """Invalidate ETags of one user's personal data after they wrote something."""
+    _bump(_user_key(email), session)
+
+
+def bump_topic(topic_id: int, session: Optional[Session] = None) -> None:
+    """Mark one topic's question bank as changed, for per-process caches built from it."""
+    _bump(topic_key(topic_id), session)
+
+
+def version(session: Session, key: str) -> int:
+    """Current value of one version counter (0 while it was never bumped)."""
+    return session.exec(select(CacheVersion.version).where(CacheVersion.key == key)).first() or 0
+
+
+def _versions(keys: list) -> Dict[str, int]:
+    with Session(engine) as session:
+        return dict(session.exec(select(CacheVersion.key, CacheVersion.version).where(CacheVersion.key.in_(keys))).all())
+
+
+def _bearer_token(request: Request) -> str | None:
+    auth = request.headers.get("authorization") or ""
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token
+
+
+def etag_guard(scope: str):
+    """Dependency factory: answer 304 for a matching If-None-Match, else set the ETag.
+
+    `scope` is "content" for data that only changes with teacher edits, or
+    "user" for data that also changes with the requesting user's own activity
+    (and with the calendar day, for "today"/"this week" figures).
+    """
+
+    def guard(request: Request, response: Response):
+        token = _bearer_token(request)
+        subject = token_subject(token) if token else None
+        if subject is None:
+            # let the endpoint's own auth produce the error response
+            return
+        keys = [CONTENT_KEY] + ([_user_key(subject)] if scope == "user" else [])
+        versions = _versions(keys)
+        parts = [str(versions.get(CONTENT_KEY, 0)), request.url.path, str(request.url.query)]
+        if scope == "user":
+            parts += [subject, str(versions.get(_user_key(subject), 0)), datetime.utcnow().date().isoformat()]
+        etag = 'W/"%s"' % hashlib.sha1("|".join(parts).encode()).hexdigest()[:20]
+
+        route = request.scope.get("route")
+        key = route.path if route is not None else request.url.path
+        if_none_match = request.headers.get("if-none-match") or ""
+        if etag in [t.strip() for t in if_none_match.split(",")]:
+            with _LOCK:
+                _stats[key]["hits"] += 1
+            raise NotModified(etag)
+        with _LOCK:
+            _stats[key]["misses"] += 1
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+
+    return guard
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+def metrics() -> dict:
+    """Conditional-request hit/miss counts per route."""
+    with _LOCK:
+        routes = {k: dict(v) for k, v in _stats.items()}
+    hits = sum(v["hits"] for v in routes.values())
+    total = hits + sum(v["misses"] for v in routes.values())
+    return {
+        "hits": hits,
+        "misses": total - hits,
+        "hit_rate": round(hits / total, 4) if total else None,
+        "routes": {
+            k: {**v, "hit_rate": round(v["hits"] / (v["hits"] + v["misses"]), 4)}
+            for k, v in routes.items()
+        },
+    }
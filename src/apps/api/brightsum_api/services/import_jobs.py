@@ -0,0 +1,268 @@
+"""Background processing of teacher CSV imports.
+
+`create_job(...)` stores the upload under IMPORT_UPLOAD_DIR, records an
+ImportJob and queues it. A single worker thread per process takes jobs off
+the queue and runs them through `question_import.import_csv` with its own
+Session; after every chunk the job's counters, processed_rows and the chunk's
+ImportJobRow results are written in the same transaction as the questions.
+
+Several processes may queue the same job, so a job is only run after it was
+claimed with a conditional UPDATE: a queued job, or a running one whose worker
+has not reported progress (heartbeat_at, refreshed with every chunk) for
+LEASE. A worker that finds its claim taken over stops without committing.
+
+Cancellation is cooperative: `request_cancel(...)` sets a flag the worker
+checks between chunks. On startup `resume_pending()` re-queues jobs left
+queued or running by a previous process; they continue after the last
+committed row, so no row is imported twice.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import os
+import queue
+import shutil
+import threading
+import uuid
+from datetime import datetime, timedelta
+from io import TextIOWrapper
+from typing import BinaryIO, Callable, Iterable, List, Optional
+
+from sqlalchemy import and_, func, insert, or_, update
+from sqlmodel import Session, select
+
+from brightsum_api.db import engine
+from brightsum_api.models import ImportJob, ImportJobRow
+from brightsum_api.services import question_import
+
+IMPORT_UPLOAD_DIR = os.getenv("IMPORT_UPLOAD_DIR", "./import_uploads")
+
+ACTIVE_STATUSES = ("queued", "running")
+# a running job whose worker has not reported progress for this long was
+# abandoned and may be claimed by another process
+LEASE = timedelta(minutes=2)
+# stored in ImportJob.claimed_by for the jobs this process runs
+WORKER_ID = uuid.uuid4().hex
+
+_queue: "queue.Queue[int]" = queue.Queue()
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+# called with the ids of topics whose question bank a job changed
+_topic_listeners: List[Callable[..., None]] = []
+
+
+def add_topic_listener(fn: Callable[..., None]) -> None:
+    _topic_listeners.append(fn)
+
+
+def _notify_topics(topic_ids: Iterable[int]) -> None:
+    topic_ids = list(topic_ids)
+    if topic_ids:
+        for fn in _topic_listeners:
+            fn(*topic_ids)
+
+
+def _ensure_worker() -> None:
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name="import-jobs", daemon=True)
+            _worker.start()
+
+
+class JobLost(question_import.ImportAborted):
+    """Another process claimed the job while this one was running it."""
+
+
+def _requeue(job_id: int) -> None:
+    _queue.put(job_id)
+    _ensure_worker()
+
+
+def _run_worker() -> None:
+    while True:
+        job_id = _queue.get()
+        try:
+            run_job(job_id)
+        except Exception as e:
+            print(f"[import_jobs] job {job_id} crashed: {e}")
+        finally:
+            _queue.task_done()
+
+
+def create_job(session: Session, user_id: int, filename: Optional[str], fileobj: BinaryIO) -> ImportJob:
+    """Persist the upload and queue a job for it."""
+    os.makedirs(IMPORT_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(IMPORT_UPLOAD_DIR, f"{uuid.uuid4().hex}.csv")
+    with open(path, "wb") as out:
+        shutil.copyfileobj(fileobj, out)
+    job = ImportJob(created_by=user_id, filename=filename, upload_path=path)
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    _queue.put(job.id)
+    _ensure_worker()
+    return job
+
+
+def request_cancel(session: Session, job: ImportJob) -> ImportJob:
+    """Ask a job to stop; a job no worker has claimed yet is cancelled right away."""
+    cancelled = session.exec(
+        update(ImportJob)
+        .where(ImportJob.id == job.id, ImportJob.status == "queued")
+        .values(status="cancelled", finished_at=datetime.utcnow())
+    ).rowcount
+    if not cancelled:
+        session.exec(
+            update(ImportJob).where(ImportJob.id == job.id, ImportJob.status == "running").values(cancel_requested=True)
+        )
+    session.commit()
+    session.refresh(job)
+    if cancelled:
+        _remove_upload(job.upload_path)
+    return job
+
+
+def resume_pending() -> int:
+    """Queue jobs a previous process left unfinished; returns how many.
+
+    Jobs another live process is still running are not taken over: their claim
+    fails and they are looked at again once their lease could have run out.
+    """
+    with Session(engine) as session:
+        job_ids = session.exec(
+            select(ImportJob.id).where(ImportJob.status.in_(ACTIVE_STATUSES)).order_by(ImportJob.id)
+        ).all()
+    for job_id in job_ids:
+        _queue.put(job_id)
+    if job_ids:
+        _ensure_worker()
+    return len(job_ids)
+
+
+def _count_rows(path: str) -> int:
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+
+def _remove_upload(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _claim(session: Session, job_id: int) -> bool:
+    """Take a queued or abandoned job for this process; False when it can't be run here."""
+    now = datetime.utcnow()
+    claimed = session.exec(
+        update(ImportJob)
+        .where(
+            ImportJob.id == job_id,
+            or_(
+                ImportJob.status == "queued",
+                and_(
+                    ImportJob.status == "running",
+                    or_(ImportJob.heartbeat_at.is_(None), ImportJob.heartbeat_at < now - LEASE),
+                ),
+            ),
+        )
+        .values(status="running", claimed_by=WORKER_ID, heartbeat_at=now, started_at=func.coalesce(ImportJob.started_at, now))
+    ).rowcount
+    session.commit()
+    return claimed == 1
+
+
+def run_job(job_id: int) -> None:
+    """Process one job to completion, cancellation or failure."""
+    with Session(engine) as session:
+        if not _claim(session, job_id):
+            job = session.get(ImportJob, job_id)
+            if job is not None and job.status == "running" and job.claimed_by != WORKER_ID:
+                # another process holds a live claim; try again once it could have expired
+                timer = threading.Timer(LEASE.total_seconds(), _requeue, (job_id,))
+                timer.daemon = True
+                timer.start()
+            return
+        job = session.get(ImportJob, job_id)
+        if job.cancel_requested:
+            _finish(session, job, "cancelled")
+            return
+        try:
+            if job.total_rows is None:
+                job.total_rows = _count_rows(job.upload_path)
+        except (OSError, UnicodeDecodeError) as e:
+            _finish(session, job, "failed", str(e))
+            return
+        job.heartbeat_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+
+        def record_chunk(entries: List[dict]) -> None:
+            # runs inside the chunk's transaction, before its commit
+            owned = session.exec(
+                update(ImportJob)
+                .where(ImportJob.id == job_id, ImportJob.claimed_by == WORKER_ID)
+                .values(heartbeat_at=datetime.utcnow())
+            ).rowcount
+            if owned != 1:
+                raise JobLost(f"import job {job_id} was claimed by another worker")
+            if entries:
+                session.connection().execute(
+                    insert(ImportJobRow.__table__),
+                    [
+                        {
+                            "job_id": job_id,
+                            "row": e["row"],
+                            "status": e["status"],
+                            "question_id": e.get("id"),
+                            "error": e.get("error"),
+                            "near_duplicates": json.dumps(e["near_duplicates"]) if e.get("near_duplicates") else None,
+                        }
+                        for e in entries
+                    ],
+                )
+                job.processed_rows = entries[-1]["row"]
+            for status in ("created", "duplicate", "failed"):
+                setattr(job, status, getattr(job, status) + sum(1 for e in entries if e["status"] == status))
+            session.add(job)
+
+        def cancel_requested() -> bool:
+            return bool(session.exec(select(ImportJob.cancel_requested).where(ImportJob.id == job_id)).one())
+
+        importer = None
+        try:
+            with open(job.upload_path, "rb") as raw:
+                text_stream = TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+                importer = question_import.import_csv(
+                    session,
+                    text_stream,
+                    on_flush=record_chunk,
+                    skip_rows=job.processed_rows,
+                    should_stop=cancel_requested,
+                )
+        except JobLost:
+            # the chunk was not committed; the other worker carries on from there
+            session.rollback()
+            return
+        except Exception as e:
+            # bad header, unreadable upload or a database error outside a chunk
+            session.rollback()
+            _finish(session, job, "failed", str(e))
+            return
+        finally:
+            if importer is not None:
+                _notify_topics(importer.touched_topic_ids)
+
+        session.refresh(job)
+        _finish(session, job, "cancelled" if job.cancel_requested else "completed")
+
+
+def _finish(session: Session, job: ImportJob, status: str, error: Optional[str] = None) -> None:
+    job.status = status
+    job.error = error
+    job.finished_at = datetime.utcnow()
+    session.add(job)
+    session.commit()
+    _remove_upload(job.upload_path)
@@ -0,0 +1,104 @@
+"""In-memory store for speculatively selected next practice questions.
+
+While a student is answering question N, a background task runs the full
+next-question selection for both possible outcomes (correct / incorrect) and
+stores the results here against the attempt. At submit time the router takes
+the branch matching the graded answer, provided the prefetch is still valid for
+what actually happened:
+
+- it was computed for the interaction being answered and against the topic's
+  current question set,
+- the student requested no further hints in the meantime (the hint endpoint
+  also re-runs the prefetch), and
+- the time the student actually took moves the topic's average answer time,
+  one of the selection features, by at most TIME_TOLERANCE of the average the
+  prefetch assumed.
+
+Otherwise submit falls back to selecting synchronously. The stored stem is
+only a hint of what was selected: submit serves the question's current row,
+so teacher edits made in the meantime are never shown stale.
+
+The store is per process and only holds the latest prefetch of each active
+attempt. Entries are dropped when used, when the attempt finishes, or when they
+are older than PREFETCH_TTL.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+PREFETCH_TTL = timedelta(minutes=30)
+# largest relative change of the topic's average answer time a prefetch tolerates
+TIME_TOLERANCE = 0.1
+
+
+@dataclass
+class PrefetchedQuestion:
+    question_id: int
+    stem: str
+    base_difficulty: str
+    shown_difficulty: str
+
+
+@dataclass
+class AttemptPrefetch:
+    interaction_id: int
+    catalog_signature: str
+    # inputs the selection saw for the pending interaction: its hint count, and
+    # the topic's answered interactions / summed time with that one untimed
+    hints_requested: int = 0
+    interactions: int = 0
+    time_total: float = 0.0
+    # keyed by the assumed correctness of the pending answer
+    branches: Dict[bool, PrefetchedQuestion] = field(default_factory=dict)
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+_STORE: Dict[int, AttemptPrefetch] = {}
+_LOCK = threading.Lock()
+
+
+def store(attempt_id: int, prefetch: AttemptPrefetch) -> None:
+    with _LOCK:
+        _STORE[attempt_id] = prefetch
+        # opportunistic cleanup of abandoned attempts
+        cutoff = datetime.utcnow() - PREFETCH_TTL
+        for aid in [a for a, p in _STORE.items() if p.created_at < cutoff]:
+            del _STORE[aid]
+
+
+def _time_shift_ok(prefetch: AttemptPrefetch, time_seconds: Optional[float]) -> bool:
+    if not time_seconds or prefetch.interactions <= 0:
+        return True
+    assumed_avg = prefetch.time_total / prefetch.interactions
+    shift = time_seconds / prefetch.interactions
+    return shift <= TIME_TOLERANCE * max(assumed_avg, 1.0)
+
+
+def take(
+    attempt_id: int,
+    interaction_id: int,
+    is_correct: bool,
+    catalog_signature: str,
+    hints_requested: int = 0,
+    time_seconds: Optional[float] = None,
+) -> Optional[PrefetchedQuestion]:
+    """Pop the attempt's prefetch and return the matching branch if it is still valid."""
+    with _LOCK:
+        prefetch = _STORE.pop(attempt_id, None)
+    if prefetch is None:
+        return None
+    if prefetch.interaction_id != interaction_id or prefetch.catalog_signature != catalog_signature:
+        return None
+    if datetime.utcnow() - prefetch.created_at > PREFETCH_TTL:
+        return None
+    if prefetch.hints_requested != (hints_requested or 0) or not _time_shift_ok(prefetch, time_seconds):
+        return None
+    return prefetch.branches.get(is_correct)
+
+
+def discard(attempt_id: int) -> None:
+    with _LOCK:
+        _STORE.pop(attempt_id, None)
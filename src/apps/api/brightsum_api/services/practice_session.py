@@ -0,0 +1,158 @@
+"""Server-side state for active practice attempts.
+
+submit_practice_answer and get_practice_hint need to know which interaction is
+currently unanswered, how many hints it has used, which questions were already
+completed in the attempt and the running score. Rather than re-reading the
+attempt's whole interaction history on every call, that state is kept here per
+attempt and updated write-through by the router whenever it commits a change.
+
+The DB stays the source of truth: a state that is missing (new process, evicted
+after IDLE_TIMEOUT, or finished attempt) is rebuilt from the attempt's
+interaction rows with a single query, and `get_current_state` checks a cached
+state against those rows with one aggregate query and reloads it when another
+worker process has moved the attempt on. Each state carries a lock the submit
+endpoint holds while grading, and grading itself only succeeds on a still
+unanswered interaction row, so a double-clicked or cross-process duplicate
+submit can't grade the same interaction twice; the loser evicts the state.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func
+from sqlmodel import Session, select
+
+from brightsum_api.models import PracticeAttempt, PracticeInteraction
+
+IDLE_TIMEOUT = timedelta(minutes=30)
+
+
+@dataclass
+class PracticeSessionState:
+    attempt_id: int
+    user_id: int
+    topic_id: int
+    current_interaction_id: Optional[int] = None
+    current_question_id: Optional[int] = None
+    hints_used: int = 0
+    completed_ids: List[int] = field(default_factory=list)
+    score: int = 0
+    last_access: datetime = field(default_factory=datetime.utcnow)
+    # held by submit while it grades and advances the attempt
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def questions_completed(self) -> int:
+        return len(self.completed_ids)
+
+    def serve(self, interaction_id: int, question_id: int) -> None:
+        """Record that a new question is now the attempt's current one."""
+        self.current_interaction_id = interaction_id
+        self.current_question_id = question_id
+        self.hints_used = 0
+
+    def answer(self, is_correct: bool) -> None:
+        """Record that the current question has been answered and graded."""
+        if self.current_question_id is not None:
+            self.completed_ids.append(self.current_question_id)
+        if is_correct:
+            self.score += 1
+        self.current_interaction_id = None
+        self.current_question_id = None
+        self.hints_used = 0
+
+
+_STATES: Dict[int, PracticeSessionState] = {}
+_LOCK = threading.Lock()
+
+
+def _load(session: Session, attempt_id: int) -> Optional[PracticeSessionState]:
+    attempt = session.get(PracticeAttempt, attempt_id)
+    if attempt is None:
+        return None
+    state = PracticeSessionState(attempt_id=attempt.id, user_id=attempt.user_id, topic_id=attempt.topic_id)
+    interactions = session.exec(
+        select(PracticeInteraction)
+        .where(PracticeInteraction.attempt_id == attempt_id)
+        .order_by(PracticeInteraction.id)
+    ).all()
+    for i in interactions:
+        if i.is_correct is not None:
+            state.completed_ids.append(i.question_id)
+            if i.is_correct:
+                state.score += 1
+    if interactions and interactions[-1].is_correct is None:
+        state.current_interaction_id = interactions[-1].id
+        state.current_question_id = interactions[-1].question_id
+        state.hints_used = interactions[-1].hints_requested
+    return state
+
+
+def get_state(session: Session, attempt_id: int) -> Optional[PracticeSessionState]:
+    """Return the cached state for an attempt, loading it from the DB on a miss.
+
+    Returns None when the attempt does not exist.
+    """
+    now = datetime.utcnow()
+    with _LOCK:
+        # drop attempts nobody has touched for a while
+        for aid in [a for a, st in _STATES.items() if now - st.last_access > IDLE_TIMEOUT]:
+            del _STATES[aid]
+        state = _STATES.get(attempt_id)
+    if state is None:
+        state = _load(session, attempt_id)
+        if state is None:
+            return None
+        with _LOCK:
+            state = _STATES.setdefault(attempt_id, state)
+    state.last_access = now
+    return state
+
+
+def _in_sync(session: Session, state: PracticeSessionState) -> bool:
+    """Whether a cached state still matches the attempt's interaction rows."""
+    answered, last_id, last_open_id, current_hints = session.exec(
+        select(
+            func.count(PracticeInteraction.is_correct),
+            func.max(PracticeInteraction.id),
+            func.max(case((PracticeInteraction.is_correct.is_(None), PracticeInteraction.id))),
+            func.max(case((PracticeInteraction.id == state.current_interaction_id, PracticeInteraction.hints_requested))),
+        ).where(PracticeInteraction.attempt_id == state.attempt_id)
+    ).one()
+    # as in _load, only the latest interaction can be the current one
+    current_id = last_open_id if last_open_id is not None and last_open_id == last_id else None
+    return (
+        answered == len(state.completed_ids)
+        and current_id == state.current_interaction_id
+        and (current_id is None or (current_hints or 0) == state.hints_used)
+    )
+
+
+def get_current_state(session: Session, attempt_id: int) -> Optional[PracticeSessionState]:
+    """Like `get_state`, but a cached state another process made stale is reloaded first."""
+    state = get_state(session, attempt_id)
+    if state is not None and not _in_sync(session, state):
+        evict(attempt_id)
+        state = get_state(session, attempt_id)
+    return state
+
+
+def put(state: PracticeSessionState) -> None:
+    state.last_access = datetime.utcnow()
+    with _LOCK:
+        _STATES[state.attempt_id] = state
+
+
+def evict(attempt_id: int) -> None:
+    with _LOCK:
+        _STATES.pop(attempt_id, None)
+
+
+def evict_topic(topic_id: int) -> None:
+    """Drop cached states of every attempt on a topic (they reload on next use)."""
+    with _LOCK:
+        for aid in [a for a, st in _STATES.items() if st.topic_id == topic_id]:
+            del _STATES[aid]
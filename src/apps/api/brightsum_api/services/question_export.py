@@ -0,0 +1,96 @@
+"""Streaming export of the question bank as CSV or NDJSON.
+
+Questions are read with their hints in one joined query ordered by question,
+fetched in batches from a server-side cursor, and written out as the rows
+arrive, so memory use does not grow with the size of the bank.
+
+The CSV uses the import template's headers (Topic, Prompt, Answer, Difficulty,
+Quiz Only, Hints) so an export can be uploaded again through the importer;
+hints are joined with '||', or written as a JSON array when a hint contains one
+of the importer's separators.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from io import StringIO
+from typing import Iterator, List, Optional
+
+from sqlmodel import Session, select
+
+from brightsum_api.db import engine
+from brightsum_api.models import Question, QuestionHint, Topic
+
+CSV_HEADERS = ["Topic", "Prompt", "Answer", "Difficulty", "Quiz Only", "Hints"]
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+BATCH_SIZE = 1000
+
+
+def _questions(topic_id: Optional[int]) -> Iterator[dict]:
+    """Yield one dict per question, hints included, in id order."""
+    stmt = (
+        select(
+            Question.id, Topic.slug, Question.stem, Question.answer,
+            Question.base_difficulty, Question.is_quiz_only, QuestionHint.hint_text,
+        )
+        .join(Topic, Topic.id == Question.topic_id)
+        .outerjoin(QuestionHint, QuestionHint.question_id == Question.id)
+        .order_by(Question.id, QuestionHint.ordering, QuestionHint.id)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    if topic_id is not None:
+        stmt = stmt.where(Question.topic_id == topic_id)
+    # the request's session is closed before the response body is streamed
+    with Session(engine) as session:
+        current = None
+        for qid, slug, stem, answer, difficulty, quiz_only, hint_text in session.exec(stmt):
+            if current is None or current["id"] != qid:
+                if current is not None:
+                    yield current
+                current = {
+                    "id": qid,
+                    "topic": slug,
+                    "stem": stem,
+                    "answer": answer,
+                    "base_difficulty": difficulty,
+                    "is_quiz_only": bool(quiz_only),
+                    "hints": [],
+                }
+            if hint_text is not None:
+                current["hints"].append(hint_text)
+        if current is not None:
+            yield current
+
+
+def _hints_cell(hints: List[str]) -> str:
+    if any(sep in h for h in hints for sep in ("|", ";")) or any(h.startswith("[") for h in hints):
+        return json.dumps(hints)
+    return "||".join(hints)
+
+
+def export_csv(topic_id: Optional[int] = None) -> Iterator[str]:
+    buf = StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_HEADERS)
+    for n, q in enumerate(_questions(topic_id), start=1):
+        writer.writerow([
+            q["topic"], q["stem"], q["answer"], q["base_difficulty"],
+            "true" if q["is_quiz_only"] else "false", _hints_cell(q["hints"]),
+        ])
+        if n % BATCH_SIZE == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def export_ndjson(topic_id: Optional[int] = None) -> Iterator[str]:
+    lines: List[str] = []
+    for q in _questions(topic_id):
+        lines.append(json.dumps(q, ensure_ascii=False))
+        if len(lines) == BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
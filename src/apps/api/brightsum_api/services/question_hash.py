@@ -0,0 +1,21 @@
+"""Normalized content hashes for duplicate question detection.
+
+Two questions in a topic are duplicates when their stem and answer match after
+Unicode (NFKC) normalization, case folding and whitespace collapsing, so
+"What is 2+2?" and "  what IS 2+2? " share a hash. Question.content_hash holds
+this value and a unique (topic_id, content_hash) index makes every duplicate
+check an indexed point lookup.
+"""
+from __future__ import annotations
+
+import hashlib
+import unicodedata
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text or "").casefold().split())
+
+
+def content_hash(stem: str, answer: str) -> str:
+    payload = normalize_text(stem) + "\x1f" + normalize_text(answer)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,446 @@
+"""Streaming, batched import of teacher question banks from CSV.
+
+The upload is parsed row by row straight from the file object, so memory use
+does not grow with the size of the file. Topics are resolved through a slug ->
+id cache, and duplicates (same topic and normalized stem and answer, see
+services/question_hash.py) are detected against the topic's content hashes,
+loaded once per topic from the (topic_id, content_hash) index and extended
+with every row accepted in this import. Accepted questions are buffered and
+written every `chunk_size` rows: one batched INSERT for the questions, one for
+their hints, one commit. When a chunk's batched write fails it is rolled back
+and written again one row per SAVEPOINT, so a bad row only fails itself and not
+the rest of its chunk.
+
+`QuestionImporter` keeps the per-row result summary the import endpoint has
+always returned ({"row", "status", "id"|"error"}). Created rows whose stem is
+close to an existing question of the topic, or to an earlier row of the same
+topic in the file, also get a "near_duplicates" list from the MinHash index in
+ml/near_duplicates.py.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from brightsum_api.ml import near_duplicates
+from brightsum_api.models import Question, QuestionHint, Topic
+from brightsum_api.services.question_hash import content_hash
+
+CHUNK_SIZE = 500
+
+FIELD_SYNONYMS: Dict[str, List[str]] = {
+    'topic_slug': [
+        'topic key', 'topic_key', 'topic-slug', 'topic_slug', 'topic slug',
+        'topic', 'topic_name', 'topic name', 'topic title',
+    ],
+    'stem': ['prompt', 'stem', 'question', 'question_text', 'prompt_text'],
+    'answer': ['answer', 'correct_answer'],
+    'base_difficulty': ['difficulty', 'base_difficulty', 'level'],
+    'is_quiz_only': ['quiz only', 'is_quiz_only', 'quiz_only', 'quizonly', 'is_quiz'],
+    'hints': ['hints', 'hint', 'hint_text', 'hints_list', 'hints[]']
+}
+
+
+class ImportAborted(Exception):
+    """Raised by an `on_flush` callback to stop the import with the chunk uncommitted."""
+
+
+def slugify(s: str) -> str:
+    s = (s or '').strip().lower()
+    s = re.sub(r'[^a-z0-9\s-]', '', s)
+    s = re.sub(r'\s+', '-', s)
+    s = re.sub(r'-+', '-', s)
+    return s
+
+
+def resolve_columns(fieldnames: Optional[Iterable[str]]) -> Dict[str, Optional[str]]:
+    """Map canonical field names to the CSV's actual headers.
+
+    Raises ValueError naming the missing required columns.
+    """
+    stripped = [c.strip() for c in (fieldnames or [])]
+    lower_to_actual = {c.lower(): c for c in stripped}
+    # DictReader keys rows by the raw header, so map back to the unstripped name
+    raw_by_stripped = {c.strip(): c for c in (fieldnames or [])}
+
+    mapping: Dict[str, Optional[str]] = {}
+    for canonical, syns in FIELD_SYNONYMS.items():
+        found = None
+        for s in syns:
+            if s in lower_to_actual:
+                found = raw_by_stripped[lower_to_actual[s]]
+                break
+        mapping[canonical] = found
+
+    # Require at least one topic identifier plus stem and answer
+    missing = []
+    if not mapping.get('topic_slug'):
+        missing.append('Topic or Topic Key')
+    if not mapping.get('stem'):
+        missing.append('Prompt')
+    if not mapping.get('answer'):
+        missing.append('Answer')
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    return mapping
+
+
+def parse_hints(hints_raw: str) -> List[str]:
+    """Accept a JSON array or '||' / '|' / ';' separated text."""
+    if not hints_raw:
+        return []
+    if hints_raw.startswith('['):
+        try:
+            arr = json.loads(hints_raw)
+        except Exception:
+            return []
+        return [str(x).strip() for x in arr if str(x).strip()] if isinstance(arr, list) else []
+    return [p.strip() for p in re.split(r"\|\||\||;", hints_raw) if p.strip()]
+
+
+def parse_row(row: Dict[str, Optional[str]], mapping: Dict[str, Optional[str]]) -> dict:
+    """Validate one CSV row and return its normalized values; raises ValueError."""
+    def value(field: str, default: str = '') -> str:
+        col = mapping.get(field)
+        return (row.get(col) or default).strip() if col else default
+
+    raw_topic = value('topic_slug')
+    stem = value('stem')
+    answer = value('answer')
+    base_difficulty = value('base_difficulty', 'medium').lower()
+    is_quiz_only_raw = value('is_quiz_only', '0')
+
+    if not raw_topic or not stem or not answer:
+        raise ValueError('Topic, Prompt and Answer are required')
+    if base_difficulty not in ('easy', 'medium', 'hard'):
+        raise ValueError('Difficulty must be one of easy, medium, hard')
+
+    # if the provided topic looks like a machine key use as-is, otherwise slugify
+    topic_slug = raw_topic
+    if ' ' in topic_slug or topic_slug != topic_slug.lower() or not re.match(r'^[a-z0-9\-]+$', topic_slug):
+        topic_slug = slugify(topic_slug)
+    if not topic_slug:
+        raise ValueError('Invalid topic value')
+
+    return {
+        "topic_slug": topic_slug,
+        "topic_name": raw_topic,
+        "stem": stem,
+        "answer": answer,
+        "base_difficulty": base_difficulty,
+        "is_quiz_only": is_quiz_only_raw.lower() in ('1', 'true', 'yes'),
+        "hints": parse_hints(value('hints')),
+        "content_hash": content_hash(stem, answer),
+    }
+
+
+class QuestionImporter:
+    """Accumulates parsed rows and writes them in batched chunks.
+
+    Call `add_row(row_number, row)` for every CSV row and `finish()` once at the
+    end; `results` then holds one summary entry per row in input order.
+
+    `on_flush(entries)`, if given, is called with the result entries of each
+    chunk just before the chunk is committed, so callers can persist progress
+    in the same transaction as the questions themselves. It may raise
+    `ImportAborted` to roll the chunk back and stop the import.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        mapping: Dict[str, Optional[str]],
+        chunk_size: int = CHUNK_SIZE,
+        on_flush: Optional[Callable[[List[dict]], None]] = None,
+    ):
+        self.session = session
+        self.mapping = mapping
+        self.chunk_size = chunk_size
+        self.on_flush = on_flush
+        self.results: List[dict] = []
+        self.created = 0
+        self.duplicate = 0
+        self.failed = 0
+        self.touched_topic_ids: Set[int] = set()
+        self._topic_ids: Dict[str, int] = {}
+        # topic id -> {content hash: question id, or None while the row is still pending}
+        self._known: Dict[int, Dict[str, Optional[int]]] = {}
+        # (result entry, topic id, parsed values) waiting for the next flush
+        self._pending: List[Tuple[dict, int, dict]] = []
+        self._pending_created_topics: List[str] = []
+        # results[:_flushed] belong to chunks that are already committed
+        self._flushed = 0
+
+    def _topic_id(self, slug: str, name: str) -> int:
+        tid = self._topic_ids.get(slug)
+        if tid is None:
+            tid = self.session.exec(select(Topic.id).where(Topic.slug == slug)).first()
+            if tid is None:
+                topic = Topic(slug=slug, name=name)
+                self.session.add(topic)
+                self.session.flush()
+                tid = topic.id
+                self._pending_created_topics.append(slug)
+            self._topic_ids[slug] = tid
+        return tid
+
+    def _known_for(self, topic_id: int) -> Dict[str, Optional[int]]:
+        known = self._known.get(topic_id)
+        if known is None:
+            known = {
+                h: qid
+                for qid, h in self.session.exec(
+                    select(Question.id, Question.content_hash).where(
+                        Question.topic_id == topic_id, Question.content_hash.isnot(None)
+                    )
+                ).all()
+            }
+            self._known[topic_id] = known
+        return known
+
+    def add_row(self, row_number: int, row: Dict[str, Optional[str]]) -> None:
+        try:
+            parsed = parse_row(row, self.mapping)
+            topic_id = self._topic_id(parsed["topic_slug"], parsed["topic_name"])
+            known = self._known_for(topic_id)
+            key = parsed["content_hash"]
+            if key in known:
+                entry = {"row": row_number, "status": "duplicate", "id": known[key]}
+                self.duplicate += 1
+                if known[key] is None:
+                    # duplicate of a row earlier in this chunk; id filled in on flush
+                    self._pending.append((entry, topic_id, parsed))
+                self.results.append(entry)
+            else:
+                known[key] = None
+                entry = {"row": row_number, "status": "created", "id": None}
+                self._pending.append((entry, topic_id, parsed))
+                self.results.append(entry)
+                self.created += 1
+        except Exception as e:
+            self.results.append({"row": row_number, "status": "failed", "error": str(e)})
+            self.failed += 1
+        if len(self.results) - self._flushed >= self.chunk_size:
+            self.flush()
+
+    def _flag_near_duplicates(self, created: List[Tuple[dict, int, dict]]) -> None:
+        """Attach near-duplicate candidates to the chunk's new rows.
+
+        Each row is compared with its topic's questions and with the earlier new
+        rows of the chunk in the same topic (keyed by -row_number until they
+        have ids).
+        """
+        sigs = near_duplicates.signatures([parsed["stem"] for _entry, _tid, parsed in created])
+        present = [sig for sig in sigs if sig is not None]
+        keys = iter(near_duplicates.band_keys(np.stack(present)) if present else [])
+        chunk_index = near_duplicates.NearDuplicateIndex()
+        for (entry, tid, parsed), sig in zip(created, sigs):
+            band_keys = next(keys) if sig is not None else None
+            parsed["signature"] = (sig, band_keys)
+            found = [
+                (sim, {"id": qid, "similarity": round(sim, 2)})
+                for qid, sim in near_duplicates.find_similar(self.session, sig, topic_id=tid, keys=band_keys)
+            ]
+            found += [
+                (sim, {"row": -key, "similarity": round(sim, 2)})
+                for key, sim in chunk_index.query_signature(sig, topic_id=tid, keys=band_keys)
+            ]
+            chunk_index.add_signature(-entry["row"], tid, sig, band_keys)
+            if found:
+                found.sort(key=lambda t: -t[0])
+                entry["near_duplicates"] = [item for _sim, item in found[:5]]
+
+    def flush(self) -> None:
+        """Write the buffered questions and hints and commit the chunk."""
+        pending, self._pending = self._pending, []
+        created = [(entry, tid, parsed) for entry, tid, parsed in pending if entry["status"] == "created"]
+        chunk = self.results[self._flushed:]
+        try:
+            if created:
+                self._flag_near_duplicates(created)
+                # (topic, content hash) is unique, so map ids back by it and let the
+                # dialect batch the rows into multi-VALUES statements
+                question_table = Question.__table__
+                inserted = self.session.connection().execute(
+                    insert(question_table).returning(
+                        question_table.c.id, question_table.c.topic_id, question_table.c.content_hash
+                    ),
+                    [
+                        {
+                            "topic_id": tid,
+                            "stem": parsed["stem"],
+                            "answer": parsed["answer"],
+                            "base_difficulty": parsed["base_difficulty"],
+                            "is_quiz_only": parsed["is_quiz_only"],
+                            "content_hash": parsed["content_hash"],
+                        }
+                        for _entry, tid, parsed in created
+                    ],
+                ).all()
+                ids = {(tid, h): qid for qid, tid, h in inserted}
+                hint_rows = []
+                for entry, tid, parsed in created:
+                    qid = ids[(tid, parsed["content_hash"])]
+                    entry["id"] = qid
+                    self._known[tid][parsed["content_hash"]] = qid
+                    self.touched_topic_ids.add(tid)
+                    for idx, hint_text in enumerate(parsed["hints"], start=1):
+                        hint_rows.append({"question_id": qid, "level": min(3, max(1, idx)), "hint_text": hint_text, "ordering": idx})
+                if hint_rows:
+                    self.session.connection().execute(insert(QuestionHint.__table__), hint_rows)
+            for entry, tid, parsed in pending:
+                if entry["status"] == "duplicate" and entry["id"] is None:
+                    entry["id"] = self._known[tid].get(parsed["content_hash"])
+            if self.on_flush:
+                self.on_flush(chunk)
+            self.session.commit()
+            near_duplicates.add_signatures(
+                (entry["id"], tid, *parsed["signature"]) for entry, tid, parsed in created
+            )
+        except ImportAborted:
+            self.session.rollback()
+            raise
+        except Exception:
+            # one bad row fails the batched INSERT; write the chunk again row by
+            # row so only the rows that fail on their own are reported as failed
+            self.session.rollback()
+            self._forget_chunk(pending)
+            try:
+                retried = self._write_rows(pending)
+                if self.on_flush:
+                    self.on_flush(chunk)
+                self.session.commit()
+                near_duplicates.add_questions([(entry["id"], tid, parsed["stem"]) for entry, tid, parsed in retried])
+            except ImportAborted:
+                self.session.rollback()
+                raise
+            except Exception as e:
+                self.session.rollback()
+                self._forget_chunk(pending)
+                self._fail_chunk(pending, e)
+                if self.on_flush:
+                    self.on_flush(chunk)
+                    self.session.commit()
+        finally:
+            self._pending_created_topics = []
+            self._flushed = len(self.results)
+
+    def _forget_chunk(self, pending: List[Tuple[dict, int, dict]]) -> None:
+        # topics created and questions queued in this chunk were rolled back with it;
+        # forget them so later rows look them up again
+        for slug in self._pending_created_topics:
+            tid = self._topic_ids.pop(slug, None)
+            self._known.pop(tid, None)
+        self._pending_created_topics = []
+        for _entry, tid, _parsed in pending:
+            self._known.pop(tid, None)
+
+    def _set_status(self, entry: dict, status: str) -> None:
+        # the created / duplicate / failed counters are named after the statuses
+        setattr(self, entry["status"], getattr(self, entry["status"]) - 1)
+        setattr(self, status, getattr(self, status) + 1)
+        entry["status"] = status
+
+    def _write_rows(self, pending: List[Tuple[dict, int, dict]]) -> List[Tuple[dict, int, dict]]:
+        """Write a rolled back chunk one row at a time, each in its own SAVEPOINT.
+
+        Duplicate checks are redone against what is committed now, so a row whose
+        earlier copy in the chunk failed is created instead. Returns the created rows.
+        """
+        question_table = Question.__table__
+        created = []
+        for entry, _tid, parsed in pending:
+            topics_before = len(self._pending_created_topics)
+            try:
+                with self.session.begin_nested():
+                    tid = self._topic_id(parsed["topic_slug"], parsed["topic_name"])
+                    known = self._known_for(tid)
+                    qid = known.get(parsed["content_hash"])
+                    if qid is None:
+                        qid = self.session.connection().execute(
+                            insert(question_table)
+                            .values(
+                                topic_id=tid,
+                                stem=parsed["stem"],
+                                answer=parsed["answer"],
+                                base_difficulty=parsed["base_difficulty"],
+                                is_quiz_only=parsed["is_quiz_only"],
+                                content_hash=parsed["content_hash"],
+                            )
+                            .returning(question_table.c.id)
+                        ).scalar_one()
+                        hint_rows = [
+                            {"question_id": qid, "level": min(3, max(1, idx)), "hint_text": hint_text, "ordering": idx}
+                            for idx, hint_text in enumerate(parsed["hints"], start=1)
+                        ]
+                        if hint_rows:
+                            self.session.connection().execute(insert(QuestionHint.__table__), hint_rows)
+                        status = "created"
+                    else:
+                        status = "duplicate"
+            except Exception as e:
+                # the savepoint also undid a topic this row created
+                for slug in self._pending_created_topics[topics_before:]:
+                    self._known.pop(self._topic_ids.pop(slug, None), None)
+                del self._pending_created_topics[topics_before:]
+                entry.pop("id", None)
+                self._set_status(entry, "failed")
+                entry["error"] = str(e)
+                continue
+            entry["id"] = qid
+            self._set_status(entry, status)
+            if status == "created":
+                known[parsed["content_hash"]] = qid
+                self.touched_topic_ids.add(tid)
+                created.append((entry, tid, parsed))
+        return created
+
+    def _fail_chunk(self, pending: List[Tuple[dict, int, dict]], error: Exception) -> None:
+        for entry, _tid, _parsed in pending:
+            if entry["status"] == "failed":
+                continue
+            entry.pop("id", None)
+            self._set_status(entry, "failed")
+            entry["error"] = str(error)
+
+    def finish(self) -> dict:
+        self.flush()
+        return {"created": self.created, "duplicate": self.duplicate, "failed": self.failed, "rows": self.results}
+
+
+def import_csv(
+    session: Session,
+    text_stream,
+    chunk_size: int = CHUNK_SIZE,
+    on_flush: Optional[Callable[[List[dict]], None]] = None,
+    skip_rows: int = 0,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> QuestionImporter:
+    """Import every row of a CSV text stream; raises ValueError for a bad header.
+
+    `skip_rows` leading data rows are passed over (they were imported by an
+    earlier run); `should_stop` is polled after every committed chunk and ends
+    the import early when it returns True.
+    """
+    reader = csv.DictReader(text_stream)
+    importer = QuestionImporter(session, resolve_columns(reader.fieldnames), chunk_size, on_flush)
+    i = 0
+    try:
+        for i, row in enumerate(reader, start=1):
+            if i <= skip_rows:
+                continue
+            importer.add_row(i, row)
+            if should_stop and importer._flushed == len(importer.results) and should_stop():
+                break
+    except UnicodeDecodeError as e:
+        # everything before the undecodable row is still imported
+        importer.results.append({"row": i + 1, "status": "failed", "error": f"File is not valid UTF-8: {e}"})
+        importer.failed += 1
+    importer.finish()
+    return importer
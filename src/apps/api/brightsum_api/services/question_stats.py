@@ -0,0 +1,170 @@
+"""Maintenance of the per-question QuestionStats table.
+
+Practice and quiz submits call `record_answers(...)` in the same transaction as
+the answers themselves. Each answer adds to the row's running sums (attempts,
+correct, time, hints, and the mastery sums behind the discrimination index)
+with an atomic upsert, and the stored p-value, means and discrimination are
+recomputed from the sums it returns, so updating a question costs the same no
+matter how often it was answered.
+
+Discrimination is the point-biserial correlation between answering correctly
+and the student's topic mastery just before the answer:
+
+    r = (n * S1 - n1 * S) / sqrt((n * n1 - n1**2) * (n * S2 - S**2))
+
+with n answers, n1 of them correct, S / S2 the sum / sum of squares of mastery
+and S1 the mastery summed over the correct answers. It stays None while every
+answer was correct (or wrong) or all students had the same mastery.
+"""
+from __future__ import annotations
+
+import math
+from datetime import datetime
+from typing import Any, Dict, Iterable, Mapping, NamedTuple, Optional
+
+from sqlalchemy import case, func, insert, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from brightsum_api.models import PracticeInteraction, Question, QuestionStats, QuizAttemptQuestion
+
+
+class Answer(NamedTuple):
+    question_id: int
+    is_correct: bool
+    time_seconds: Optional[float] = None
+    hints: Optional[int] = None
+    mastery: Optional[float] = None   # the student's topic mastery before answering
+
+
+# running sums a new answer adds to; everything else is derived from them
+SUMS = (
+    "attempts", "correct", "time_n", "time_sum", "hints_n", "hints_sum",
+    "mastery_n", "mastery_correct", "mastery_sum", "mastery_sq_sum", "mastery_correct_sum",
+)
+
+
+def _derived(s: Mapping[str, Any]) -> dict:
+    """The p-value, means and discrimination of a row's sums."""
+    n, n1 = s["mastery_n"], s["mastery_correct"]
+    denom = (n * n1 - n1 * n1) * (n * s["mastery_sq_sum"] - s["mastery_sum"] ** 2)
+    discrimination = None
+    if n >= 2 and denom > 1e-12:
+        r = (n * s["mastery_correct_sum"] - n1 * s["mastery_sum"]) / math.sqrt(denom)
+        discrimination = max(-1.0, min(1.0, r))
+    return {
+        "p_value": s["correct"] / s["attempts"] if s["attempts"] else None,
+        "mean_time_seconds": s["time_sum"] / s["time_n"] if s["time_n"] else None,
+        "mean_hints": s["hints_sum"] / s["hints_n"] if s["hints_n"] else None,
+        "discrimination": discrimination,
+    }
+
+
+def _deltas(answers: Iterable[Answer]) -> Dict[int, dict]:
+    """What a batch of answers adds to each question's sums."""
+    out: Dict[int, dict] = {}
+    for a in answers:
+        d = out.setdefault(a.question_id, dict.fromkeys(SUMS, 0))
+        d["attempts"] += 1
+        d["correct"] += 1 if a.is_correct else 0
+        if a.time_seconds is not None:
+            d["time_n"] += 1
+            d["time_sum"] += a.time_seconds
+        if a.hints is not None:
+            d["hints_n"] += 1
+            d["hints_sum"] += a.hints
+        if a.mastery is not None:
+            d["mastery_n"] += 1
+            d["mastery_sum"] += a.mastery
+            d["mastery_sq_sum"] += a.mastery * a.mastery
+            if a.is_correct:
+                d["mastery_correct"] += 1
+                d["mastery_correct_sum"] += a.mastery
+    return out
+
+
+def record_answers(session: Session, answers: Iterable[Answer]) -> None:
+    """Add graded answers to their questions' stats rows (the caller commits).
+
+    The sums are incremented in the database by one INSERT ... ON CONFLICT DO
+    UPDATE, so concurrent submits never lose each other's answers or collide
+    on a question's first insert. The statement returns the new sums, and
+    since the upsert keeps the rows locked until the caller commits, the
+    derived columns written from them are those of the latest sums.
+    """
+    deltas = _deltas(answers)
+    if not deltas:
+        return
+    now = datetime.utcnow()
+    table = QuestionStats.__table__
+    rows = [{"question_id": qid, **d, "updated_at": now} for qid, d in sorted(deltas.items())]
+    returning = [table.c.id, *(table.c[c] for c in SUMS)]
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite_insert if dialect == "sqlite" else pg_insert)(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.question_id],
+            set_={**{c: table.c[c] + stmt.excluded[c] for c in SUMS}, "updated_at": stmt.excluded.updated_at},
+        )
+        totals = session.exec(stmt.returning(*returning)).all()
+    else:
+        totals = []
+        for row in rows:
+            found = session.exec(
+                update(table)
+                .where(table.c.question_id == row["question_id"])
+                .values({**{c: table.c[c] + row[c] for c in SUMS}, "updated_at": now})
+                .returning(*returning)
+            ).first()
+            totals.append(found or session.exec(insert(table).values(row).returning(*returning)).one())
+    session.exec(update(QuestionStats), params=[{"id": t.id, **_derived(t._mapping)} for t in totals])
+
+
+def backfill(session: Session) -> int:
+    """Build the stats from existing answers if the table is still empty.
+
+    The mastery a student had when answering was never stored, so backfilled
+    rows start without discrimination; it fills in as new answers arrive.
+    Returns the number of rows created.
+    """
+    if session.exec(select(QuestionStats.id).limit(1)).first() is not None:
+        return 0
+
+    practice = select(
+        PracticeInteraction.question_id.label("question_id"),
+        PracticeInteraction.is_correct.label("is_correct"),
+        PracticeInteraction.time_seconds.label("time_seconds"),
+        PracticeInteraction.hints_requested.label("hints"),
+    ).where(PracticeInteraction.is_correct.isnot(None))
+    quiz = select(
+        QuizAttemptQuestion.question_id,
+        QuizAttemptQuestion.is_correct,
+        QuizAttemptQuestion.time_seconds,
+        QuizAttemptQuestion.hints_requested,
+    ).where(QuizAttemptQuestion.is_correct.isnot(None))
+    answers = union_all(practice, quiz).subquery()
+    grouped = session.exec(
+        select(
+            answers.c.question_id,
+            func.count(),
+            func.sum(case((answers.c.is_correct == True, 1), else_=0)),
+            func.count(answers.c.time_seconds),
+            func.coalesce(func.sum(answers.c.time_seconds), 0.0),
+            func.count(answers.c.hints),
+            func.coalesce(func.sum(answers.c.hints), 0),
+        )
+        # skip answers whose question no longer exists
+        .where(answers.c.question_id.in_(select(Question.id)))
+        .group_by(answers.c.question_id)
+    ).all()
+
+    now = datetime.utcnow()
+    for qid, attempts, correct, time_n, time_sum, hints_n, hints_sum in grouped:
+        sums = dict.fromkeys(SUMS, 0)
+        sums.update(
+            attempts=attempts, correct=correct or 0, time_n=time_n, time_sum=time_sum, hints_n=hints_n, hints_sum=hints_sum
+        )
+        session.add(QuestionStats(question_id=qid, **sums, **_derived(sums), updated_at=now))
+    session.commit()
+    return len(grouped)
@@ -0,0 +1,190 @@
+"""Batched partial updates of existing questions.
+
+`apply_updates(session, updates)` takes a list of {"id", ...changed fields}
+dicts and applies them in one transaction: the questions and topics involved
+are loaded with one query each, duplicate checks for edited stems / answers
+use one (topic_id, content_hash) lookup for the whole batch, the question rows
+are written with one ORM bulk UPDATE by primary key, and hint lists are only
+replaced for questions whose hints actually differ (one DELETE and one INSERT
+for all of them).
+
+Every item gets a result entry; an invalid item is reported and skipped
+without failing the rest of the batch.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import delete, insert, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from brightsum_api.ml import near_duplicates
+from brightsum_api.models import Question, QuestionHint, Topic
+from brightsum_api.services.question_hash import content_hash
+
+DIFFICULTIES = ("easy", "medium", "hard")
+COLUMNS = ("topic_id", "stem", "answer", "base_difficulty", "is_quiz_only")
+
+
+def hints_by_question(session: Session, question_ids: List[int]) -> Dict[int, List[str]]:
+    """Hint texts for many questions, in presentation order, with one query per 5000 ids."""
+    hints: Dict[int, List[str]] = {qid: [] for qid in question_ids}
+    # chunked to stay under SQLite's bound-parameter limit on unpaged listings
+    for start in range(0, len(question_ids), 5000):
+        rows = session.exec(
+            select(QuestionHint.question_id, QuestionHint.hint_text)
+            .where(QuestionHint.question_id.in_(question_ids[start:start + 5000]))
+            .order_by(QuestionHint.question_id, QuestionHint.ordering, QuestionHint.id)
+        ).all()
+        for qid, text in rows:
+            hints[qid].append(text)
+    return hints
+
+
+def _validate(values: dict) -> None:
+    if not values["stem"].strip() or not values["answer"].strip():
+        raise ValueError("Stem and answer are required")
+    if values["base_difficulty"] not in DIFFICULTIES:
+        raise ValueError("Difficulty must be one of easy, medium, hard")
+    if not values["topic_slug"].strip():
+        raise ValueError("Invalid topic value")
+
+
+def _topic_ids(session: Session, slugs: Set[str]) -> Dict[str, int]:
+    """Ids for the given topic slugs, creating the topics that don't exist yet."""
+    ids = dict(session.exec(select(Topic.slug, Topic.id).where(Topic.slug.in_(slugs))).all()) if slugs else {}
+    for slug in sorted(slugs - set(ids)):
+        topic = Topic(slug=slug, name=slug)
+        session.add(topic)
+        session.flush()
+        ids[slug] = topic.id
+    return ids
+
+
+def apply_updates(session: Session, updates: List[dict]) -> Tuple[List[dict], Set[int]]:
+    """Apply partial question updates; returns (per-item results, touched topic ids).
+
+    Result statuses: "updated", "unchanged", "not_found", "duplicate" (the new
+    stem/answer already exists in the target topic; "duplicate_of" names the
+    question) and "failed" (with "error").
+    """
+    results = [{"id": u["id"], "status": "unchanged"} for u in updates]
+    ids = [u["id"] for u in updates]
+    current = {
+        row[0]: row
+        for row in session.exec(
+            select(
+                Question.id, Question.topic_id, Question.stem, Question.answer,
+                Question.base_difficulty, Question.is_quiz_only, Question.content_hash, Topic.slug,
+            )
+            .join(Topic, Topic.id == Question.topic_id)
+            .where(Question.id.in_(ids))
+        ).all()
+    } if ids else {}
+    hint_ids = [u["id"] for u in updates if u.get("hints") is not None and u["id"] in current]
+    current_hints = hints_by_question(session, hint_ids)
+
+    # 1. merge each item over the stored row and validate it
+    seen: Set[int] = set()
+    staged: List[Tuple[dict, dict, dict]] = []  # (result, update, merged values)
+    for result, u in zip(results, updates):
+        qid = u["id"]
+        row = current.get(qid)
+        if row is None:
+            result["status"] = "not_found"
+            continue
+        if qid in seen:
+            result.update(status="failed", error="Question listed more than once")
+            continue
+        seen.add(qid)
+        _qid, topic_id, stem, answer, difficulty, quiz_only, chash, slug = row
+        values = {
+            "topic_slug": slug, "stem": stem, "answer": answer,
+            "base_difficulty": difficulty, "is_quiz_only": bool(quiz_only),
+        }
+        values.update({k: v for k, v in u.items() if k in values and v is not None})
+        values["base_difficulty"] = values["base_difficulty"].lower()
+        try:
+            _validate(values)
+        except ValueError as e:
+            result.update(status="failed", error=str(e))
+            continue
+        staged.append((result, u, values))
+
+    # 2. resolve topics, recompute content hashes and check for duplicates
+    topic_ids = _topic_ids(session, {v["topic_slug"] for _r, _u, v in staged})
+    for _result, u, values in staged:
+        row = current[u["id"]]
+        values["topic_id"] = topic_ids[values["topic_slug"]]
+        if values["topic_id"] != row[1] or values["stem"] != row[2] or values["answer"] != row[3]:
+            values["content_hash"] = content_hash(values["stem"], values["answer"])
+    rehashed = [(v["topic_id"], v["content_hash"]) for _r, _u, v in staged if "content_hash" in v]
+    taken: Dict[Tuple[int, str], int] = {}
+    if rehashed:
+        for qid, tid, chash in session.exec(
+            select(Question.id, Question.topic_id, Question.content_hash).where(
+                tuple_(Question.topic_id, Question.content_hash).in_(set(rehashed))
+            )
+        ).all():
+            taken[(tid, chash)] = qid
+
+    # 3. collect the column changes and hint replacements
+    question_rows: List[dict] = []
+    hint_changes: Dict[int, List[str]] = {}
+    touched: Set[int] = set()
+    restemmed: List[Tuple[int, int, str]] = []
+    for result, u, values in staged:
+        qid = u["id"]
+        row = current[qid]
+        if "content_hash" in values:
+            key = (values["topic_id"], values["content_hash"])
+            other = taken.get(key)
+            if other is not None and other != qid:
+                result.update(status="duplicate", duplicate_of=other)
+                continue
+            taken[key] = qid
+        old = dict(zip(COLUMNS, (row[1], row[2], row[3], row[4], bool(row[5]))))
+        changes = {c: values[c] for c in COLUMNS if values[c] != old[c]}
+        if "content_hash" in values and values["content_hash"] != row[6]:
+            changes["content_hash"] = values["content_hash"]
+        hints = u.get("hints")
+        if hints is not None and hints != current_hints[qid]:
+            hint_changes[qid] = hints
+        if not changes and qid not in hint_changes:
+            continue
+        result["status"] = "updated"
+        result["changed"] = sorted(set(changes) - {"content_hash"}) + (["hints"] if qid in hint_changes else [])
+        if changes:
+            question_rows.append({"id": qid, **changes})
+        touched.update((row[1], values["topic_id"]))
+        if "stem" in changes or "topic_id" in changes:
+            restemmed.append((qid, values["topic_id"], values["stem"]))
+
+    # 4. write everything in one transaction
+    try:
+        if question_rows:
+            # grouped by changed column set into executemany UPDATEs
+            session.exec(update(Question), params=question_rows)
+        if hint_changes:
+            conn = session.connection()
+            conn.execute(delete(QuestionHint.__table__).where(QuestionHint.__table__.c.question_id.in_(list(hint_changes))))
+            hint_rows = [
+                {"question_id": qid, "level": min(3, max(1, idx)), "hint_text": text, "ordering": idx}
+                for qid, hints in hint_changes.items()
+                for idx, text in enumerate(hints, start=1)
+            ]
+            if hint_rows:
+                conn.execute(insert(QuestionHint.__table__), hint_rows)
+        session.commit()
+    except IntegrityError:
+        # a concurrent edit claimed one of the new (topic, content) pairs first
+        session.rollback()
+        for result in results:
+            if result["status"] == "updated":
+                result.pop("changed", None)
+                result.update(status="failed", error="Conflicting concurrent update; nothing was changed")
+        return results, set()
+
+    near_duplicates.add_questions(restemmed)
+    return results, touched
@@ -0,0 +1,285 @@
+"""Pools of pre-generated quiz forms per topic, quiz length and mastery band.
+
+Starting a quiz used to load every question of the topic and either sample it
+or score it with the IRT selector. Here each topic's question list is loaded
+once into a `TopicForms` pool, and for every (strategy, length, band) that is
+asked for, FORMS_PER_KEY forms are generated up front. A start is then a pick
+from the pool (round robin, so every form is used equally often) plus one
+bulk insert of the attempt's questions.
+
+- "default" forms are random samples drawn so every question appears in about
+  the same number of forms.
+- "irt_information" forms are built for the centre of the student's mastery
+  band (BANDS equal-width bands over [0, 1]). Items are dealt in order of
+  information at that mastery, each to the open forms with the lowest total
+  information so far, and no item goes into more than MAX_EXPOSURE of a
+  band's forms. The forms therefore carry about the same information and the
+  most informative items are not shown to every student.
+
+The pool also holds the topic's CAT item bank (ml/cat.py), so adaptive quizzes
+share the same loading and invalidation.
+
+Teacher edits and imports call `invalidate_topic(...)`: the pool is dropped
+and a worker thread rebuilds it (and the form keys it was serving) with its
+own Session. Pools are per process, so each one also records the topic's
+DB-backed version counter (http_cache.bump_topic) it was built at, and
+`get_pool` rebuilds a pool whose topic was changed through another process
+before picking from it. When the IRT params file is retrained, the current
+pool keeps serving while the worker rebuilds it against the new params.
+"""
+from __future__ import annotations
+
+import math
+import queue
+import random
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlmodel import Session, select
+
+from brightsum_api.db import engine
+from brightsum_api.ml import cat, irt_selection
+from brightsum_api.models import Question
+from brightsum_api.services import http_cache
+
+STRATEGIES = ("default", "irt_information")
+BANDS = 5
+FORMS_PER_KEY = 16
+# largest share of a band's IRT forms a single question may appear in
+MAX_EXPOSURE = 0.25
+# mastery assumed for students without a MasteryState (as in irt_selection)
+DEFAULT_MASTERY = 0.3
+
+
+@dataclass(frozen=True)
+class FormItem:
+    question_id: int
+    stem: str
+    base_difficulty: str
+
+
+def band_of(mastery: Optional[float]) -> int:
+    m = DEFAULT_MASTERY if mastery is None else mastery
+    return min(BANDS - 1, max(0, int(m * BANDS)))
+
+
+def band_center(band: int) -> float:
+    return (band + 0.5) / BANDS
+
+
+class TopicForms:
+    """The question list of one topic and the forms generated from it so far."""
+
+    def __init__(self, topic_id: int, items: List[FormItem], params_version: float, topic_version: int = 0):
+        self.topic_id = topic_id
+        self.items = items
+        self.params_version = params_version
+        self.topic_version = topic_version
+        self._forms: Dict[tuple, List[List[int]]] = {}
+        self._next: Dict[tuple, int] = {}
+        self._cat_bank: Optional[cat.ItemBank] = None
+        self._by_id: Optional[Dict[int, FormItem]] = None
+        self._lock = threading.Lock()
+
+    def cat_bank(self) -> cat.ItemBank:
+        """The topic's usable items on the CAT quadrature grid, computed on first use."""
+        with self._lock:
+            if self._cat_bank is None:
+                qids, w0, w1 = [], [], []
+                for it in self.items:
+                    params = cat.item_params(it.question_id, it.base_difficulty)
+                    if params is not None:
+                        qids.append(it.question_id)
+                        w0.append(params[0])
+                        w1.append(params[1])
+                self._cat_bank = cat.ItemBank(qids, w0, w1)
+            return self._cat_bank
+
+    def item(self, question_id: int) -> Optional[FormItem]:
+        with self._lock:
+            if self._by_id is None:
+                self._by_id = {it.question_id: it for it in self.items}
+        return self._by_id.get(question_id)
+
+    def keys(self) -> List[tuple]:
+        with self._lock:
+            return list(self._forms)
+
+    def pick(self, strategy: str, k: int, band: int) -> List[FormItem]:
+        k = max(1, min(k, len(self.items)))
+        key = (strategy, k, band if strategy == "irt_information" else None)
+        with self._lock:
+            forms = self._forms.get(key)
+            if forms is None:
+                forms = self._forms[key] = self.generate(*key)
+                self._next[key] = random.randrange(len(forms))
+            idx = self._next[key]
+            self._next[key] = (idx + 1) % len(forms)
+        return [self.items[i] for i in forms[idx]]
+
+    def generate(self, strategy: str, k: int, band: Optional[int]) -> List[List[int]]:
+        """FORMS_PER_KEY forms of exactly min(k, number of questions) distinct items each."""
+        n = len(self.items)
+        if strategy == "irt_information":
+            forms = self._information_forms(k, band_center(band))
+        elif n <= k:
+            forms = [list(range(n))]
+        else:
+            # least-used questions first, random among ties
+            rng = np.random.default_rng()
+            uses = np.zeros(n)
+            forms = []
+            for _ in range(FORMS_PER_KEY):
+                chosen = np.argpartition(uses + rng.random(n), k - 1)[:k]
+                uses[chosen] += 1
+                forms.append([int(i) for i in rng.permutation(chosen)])
+        size = min(k, n)
+        if any(len(form) != size or len(set(form)) != size for form in forms):
+            raise RuntimeError(f"quiz form generation for topic {self.topic_id} produced a form without {size} items")
+        return forms
+
+    def _information_forms(self, k: int, mastery: float) -> List[List[int]]:
+        info = [irt_selection.item_info(it.question_id, it.base_difficulty, mastery)[1] for it in self.items]
+        order = sorted(range(len(info)), key=lambda i: info[i], reverse=True)
+        if len(order) <= k:
+            return [order]
+        # every form needs k distinct items, so the cap can't go below F*k/n
+        cap = max(math.ceil(FORMS_PER_KEY * MAX_EXPOSURE), math.ceil(FORMS_PER_KEY * k / len(order)))
+        forms: List[List[int]] = [[] for _ in range(FORMS_PER_KEY)]
+        totals = [0.0] * FORMS_PER_KEY
+        uses = [0] * len(order)
+        for i in order:
+            open_forms = sorted((f for f in range(FORMS_PER_KEY) if len(forms[f]) < k), key=totals.__getitem__)
+            if not open_forms:
+                break
+            for f in open_forms[:cap]:
+                forms[f].append(i)
+                totals[f] += info[i]
+                uses[i] += 1
+        # dealing in a fixed order can leave a form short once the items run
+        # out; top it up with the most informative items it lacks, preferring
+        # those still under the cap
+        for form in forms:
+            if len(form) < k:
+                have = set(form)
+                extra = sorted((i for i in order if i not in have), key=lambda i: (uses[i] >= cap, -info[i]))
+                for i in extra[:k - len(form)]:
+                    form.append(i)
+                    uses[i] += 1
+        # present each form like the IRT selector did: most informative first
+        return [sorted(form, key=lambda i: info[i], reverse=True) for form in forms]
+
+
+_POOLS: Dict[int, TopicForms] = {}
+_GENERATION: Dict[int, int] = {}
+_LOCK = threading.Lock()
+_BUILD_LOCKS: Dict[int, threading.Lock] = {}
+
+_queue: "queue.Queue[Tuple[int, List[tuple]]]" = queue.Queue()
+_queued: Set[int] = set()
+_worker: Optional[threading.Thread] = None
+
+
+def _build(session: Session, topic_id: int, keys: List[tuple] = ()) -> Optional[TopicForms]:
+    with _LOCK:
+        generation = _GENERATION.get(topic_id, 0)
+    version = irt_selection.refresh_params()
+    # read before the questions, so an edit in between leaves the pool marked stale
+    topic_version = http_cache.version(session, http_cache.topic_key(topic_id))
+    rows = session.exec(
+        select(Question.id, Question.stem, Question.base_difficulty)
+        .where(Question.topic_id == topic_id)
+        .order_by(Question.id)
+    ).all()
+    if not rows:
+        return None
+    pool = TopicForms(topic_id, [FormItem(*row) for row in rows], version, topic_version)
+    for key in keys:
+        pool._forms[key] = pool.generate(*key)
+        pool._next[key] = random.randrange(len(pool._forms[key]))
+    with _LOCK:
+        # an invalidation while we were loading makes this pool stale already
+        if _GENERATION.get(topic_id, 0) != generation:
+            return pool
+        _POOLS[topic_id] = pool
+    return pool
+
+
+def get_pool(session: Session, topic_id: int) -> Optional[TopicForms]:
+    """The topic's form pool, built on first use; None when the topic has no questions.
+
+    A pool built before the topic's current DB version (an edit made through
+    another process) is rebuilt before it is returned.
+    """
+    topic_version = http_cache.version(session, http_cache.topic_key(topic_id))
+    pool = _POOLS.get(topic_id)
+    if pool is not None and pool.topic_version == topic_version:
+        if pool.params_version != irt_selection.params_version():
+            _schedule(topic_id, pool.keys())
+        return pool
+    with _LOCK:
+        build_lock = _BUILD_LOCKS.setdefault(topic_id, threading.Lock())
+    # concurrent starts of a cold or stale topic wait for one build instead of each loading the bank
+    with build_lock:
+        pool = _POOLS.get(topic_id)
+        if pool is None or pool.topic_version != topic_version:
+            keys = pool.keys() if pool is not None else []
+            pool = _build(session, topic_id, keys)
+            if pool is None:
+                with _LOCK:
+                    _POOLS.pop(topic_id, None)
+    return pool
+
+
+def pick(session: Session, topic_id: int, k: int, strategy: str = "default", mastery: Optional[float] = None) -> List[FormItem]:
+    """Questions for a new quiz attempt, taken from the topic's pre-generated forms."""
+    pool = get_pool(session, topic_id)
+    if pool is None:
+        return []
+    if strategy not in STRATEGIES:
+        strategy = "default"
+    return pool.pick(strategy, k, band_of(mastery))
+
+
+def invalidate_topic(topic_id: Optional[int] = None) -> None:
+    """Drop a topic's pool (or all pools) after its questions changed; the worker rebuilds it."""
+    with _LOCK:
+        topic_ids = list(_POOLS) if topic_id is None else [topic_id]
+        dropped = []
+        for tid in topic_ids:
+            _GENERATION[tid] = _GENERATION.get(tid, 0) + 1
+            pool = _POOLS.pop(tid, None)
+            if pool is not None:
+                dropped.append(pool)
+    for pool in dropped:
+        _schedule(pool.topic_id, pool.keys())
+
+
+def _schedule(topic_id: int, keys: List[tuple]) -> None:
+    global _worker
+    with _LOCK:
+        if topic_id in _queued:
+            return
+        _queued.add(topic_id)
+        _queue.put((topic_id, keys))
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name="quiz-forms", daemon=True)
+            _worker.start()
+
+
+def _run_worker() -> None:
+    while True:
+        topic_id, keys = _queue.get()
+        with _LOCK:
+            _queued.discard(topic_id)
+        try:
+            with Session(engine) as session:
+                if _build(session, topic_id, keys) is None:
+                    with _LOCK:
+                        _POOLS.pop(topic_id, None)
+        except Exception as e:
+            print(f"[quiz_forms] rebuilding topic {topic_id} failed: {e}")
+        finally:
+            _queue.task_done()
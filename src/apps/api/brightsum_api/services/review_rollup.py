@@ -0,0 +1,119 @@
+"""Maintenance of the per-user ReviewRollup table.
+
+One row per (user, topic, shown difficulty, day) holds answered / correct /
+incorrect counts plus hint and time totals for graded practice answers. The
+practice submit endpoint calls `record_practice_answer(...)` in the same
+transaction as the answer itself, incrementing the row with an atomic upsert,
+and the review dashboard aggregates these
+rows with SQL filters instead of scanning the user's interaction history.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import case, func, insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from brightsum_api.models import PracticeAttempt, PracticeInteraction, ReviewRollup
+
+COUNTERS = ("answered", "correct", "incorrect", "hints", "time_seconds")
+
+
+def record_practice_answer(
+    session: Session,
+    user_id: int,
+    topic_id: int,
+    difficulty: str,
+    is_correct: bool,
+    hints: int = 0,
+    time_seconds: Optional[float] = None,
+    day: Optional[date] = None,
+) -> None:
+    """Add one graded answer to the matching rollup row (the caller commits).
+
+    The counters are incremented in the database with one
+    INSERT ... ON CONFLICT DO UPDATE, so concurrent submits neither lose
+    increments nor collide on the day's first insert.
+    """
+    table = ReviewRollup.__table__
+    row = {
+        "user_id": user_id,
+        "topic_id": topic_id,
+        "difficulty": (difficulty or "medium").lower(),
+        "day": day or datetime.utcnow().date(),
+        "answered": 1,
+        "correct": 1 if is_correct else 0,
+        "incorrect": 0 if is_correct else 1,
+        "hints": hints or 0,
+        "time_seconds": time_seconds or 0.0,
+    }
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite_insert if dialect == "sqlite" else pg_insert)(table).values(row)
+        session.exec(stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.topic_id, table.c.difficulty, table.c.day],
+            set_={c: table.c[c] + stmt.excluded[c] for c in COUNTERS},
+        ))
+    else:
+        key = (
+            table.c.user_id == row["user_id"],
+            table.c.topic_id == row["topic_id"],
+            table.c.difficulty == row["difficulty"],
+            table.c.day == row["day"],
+        )
+        if session.exec(update(table).where(*key).values({c: table.c[c] + row[c] for c in COUNTERS})).rowcount == 0:
+            session.exec(insert(table).values(row))
+
+
+def backfill(session: Session) -> int:
+    """Build the rollup from existing interactions if the table is still empty.
+
+    Interactions are bucketed by the day they were answered, falling back to
+    the day their attempt started for rows without `answered_at`. Returns the
+    number of rows created.
+    """
+    if session.exec(select(ReviewRollup.id).limit(1)).first() is not None:
+        return 0
+
+    answered_day = func.date(func.coalesce(PracticeInteraction.answered_at, PracticeAttempt.started_at))
+    grouped = session.exec(
+        select(
+            PracticeAttempt.user_id,
+            PracticeAttempt.topic_id,
+            func.lower(PracticeInteraction.shown_difficulty),
+            answered_day,
+            func.count(PracticeInteraction.id),
+            func.sum(case((PracticeInteraction.is_correct == True, 1), else_=0)),
+            func.sum(case((PracticeInteraction.is_correct == False, 1), else_=0)),
+            func.coalesce(func.sum(PracticeInteraction.hints_requested), 0),
+            func.coalesce(func.sum(PracticeInteraction.time_seconds), 0.0),
+        )
+        .join(PracticeAttempt, PracticeAttempt.id == PracticeInteraction.attempt_id)
+        .where(PracticeInteraction.is_correct.isnot(None))
+        .group_by(
+            PracticeAttempt.user_id,
+            PracticeAttempt.topic_id,
+            func.lower(PracticeInteraction.shown_difficulty),
+            answered_day,
+        )
+    ).all()
+
+    for user_id, topic_id, difficulty, day, answered, correct, incorrect, hints, seconds in grouped:
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        session.add(ReviewRollup(
+            user_id=user_id,
+            topic_id=topic_id,
+            difficulty=difficulty or "medium",
+            day=day,
+            answered=answered,
+            correct=correct or 0,
+            incorrect=incorrect or 0,
+            hints=hints,
+            time_seconds=seconds,
+        ))
+    session.commit()
+    return len(grouped)
@@ -0,0 +1,212 @@
+"""Full-text search over question stems, hints and lesson slides.
+
+On SQLite the searchable text lives in one FTS5 table, `search_index`, with a
+row per question, hint and slide. The rowid encodes the source row
+(id * 4 + kind code), so the triggers installed by `ensure_search_index` can
+update or delete an entry by rowid without scanning the index. Every write to
+question / questionhint / lessonslide goes through those triggers, including
+the importer's bulk INSERTs, so the index needs no application-side upkeep.
+
+Queries are ranked with bm25 (a title match weighs more than a body match) and
+paginated with limit/offset. Other databases fall back to a case-insensitive
+LIKE over the same columns (as does a SQLite build without FTS5), which is
+unranked and unindexed but keeps the endpoint working.
+"""
+from __future__ import annotations
+
+import re
+from typing import List, Optional, Sequence
+
+from sqlalchemy import or_, text
+from sqlmodel import Session, select
+
+from brightsum_api.models import LessonSlide, Question, QuestionHint
+
+KIND_CODES = {"question": 1, "hint": 2, "slide": 3}
+
+# set by ensure_search_index once the FTS5 table is in place
+_fts_ready = False
+
+# title column: slide titles; body column: stems, hint texts and slide bodies
+_DDL = [
+    """CREATE VIRTUAL TABLE search_index USING fts5(
+        title, body,
+        kind UNINDEXED, ref_id UNINDEXED, question_id UNINDEXED, topic_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )""",
+]
+
+_TRIGGERS = [
+    # questions
+    """CREATE TRIGGER IF NOT EXISTS search_question_ai AFTER INSERT ON question BEGIN
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, question_id, topic_id)
+        VALUES (new.id * 4 + 1, '', new.stem, 'question', new.id, new.id, new.topic_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_question_au AFTER UPDATE OF stem, topic_id ON question BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 1;
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, question_id, topic_id)
+        VALUES (new.id * 4 + 1, '', new.stem, 'question', new.id, new.id, new.topic_id);
+        UPDATE search_index SET topic_id = new.topic_id
+        WHERE old.topic_id != new.topic_id
+          AND rowid IN (SELECT id * 4 + 2 FROM questionhint WHERE question_id = new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_question_ad AFTER DELETE ON question BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 1;
+    END""",
+    # hints (topic comes from their question)
+    """CREATE TRIGGER IF NOT EXISTS search_hint_ai AFTER INSERT ON questionhint BEGIN
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, question_id, topic_id)
+        VALUES (new.id * 4 + 2, '', new.hint_text, 'hint', new.id, new.question_id,
+                (SELECT topic_id FROM question WHERE id = new.question_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_hint_au AFTER UPDATE OF hint_text, question_id ON questionhint BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 2;
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, question_id, topic_id)
+        VALUES (new.id * 4 + 2, '', new.hint_text, 'hint', new.id, new.question_id,
+                (SELECT topic_id FROM question WHERE id = new.question_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_hint_ad AFTER DELETE ON questionhint BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 2;
+    END""",
+    # lesson slides
+    """CREATE TRIGGER IF NOT EXISTS search_slide_ai AFTER INSERT ON lessonslide BEGIN
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, question_id, topic_id)
+        VALUES (new.id * 4 + 3, new.title, new.body, 'slide', new.id, NULL, new.topic_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_slide_au AFTER UPDATE OF title, body, topic_id ON lessonslide BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 3;
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, question_id, topic_id)
+        VALUES (new.id * 4 + 3, new.title, new.body, 'slide', new.id, NULL, new.topic_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_slide_ad AFTER DELETE ON lessonslide BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 3;
+    END""",
+]
+
+_BACKFILL = [
+    "INSERT INTO search_index(rowid, title, body, kind, ref_id, question_id, topic_id) "
+    "SELECT id * 4 + 1, '', stem, 'question', id, id, topic_id FROM question",
+    "INSERT INTO search_index(rowid, title, body, kind, ref_id, question_id, topic_id) "
+    "SELECT h.id * 4 + 2, '', h.hint_text, 'hint', h.id, h.question_id, q.topic_id "
+    "FROM questionhint h LEFT JOIN question q ON q.id = h.question_id",
+    "INSERT INTO search_index(rowid, title, body, kind, ref_id, question_id, topic_id) "
+    "SELECT id * 4 + 3, title, body, 'slide', id, NULL, topic_id FROM lessonslide",
+]
+
+
+def ensure_search_index(cur) -> None:
+    """Create the FTS5 table and its triggers on a SQLite DB-API cursor.
+
+    The table is filled from existing rows the first time it is created.
+    """
+    global _fts_ready
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'")
+    created = cur.fetchone() is None
+    if created:
+        for ddl in _DDL:
+            cur.execute(ddl)
+    for trigger in _TRIGGERS:
+        cur.execute(trigger)
+    if created:
+        for stmt in _BACKFILL:
+            cur.execute(stmt)
+    _fts_ready = True
+
+
+def _fts_query(q: str) -> Optional[str]:
+    """Turn free text into an FTS5 MATCH expression: every term must match, the last as a prefix."""
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search(
+    session: Session,
+    q: str,
+    topic_id: Optional[int] = None,
+    kinds: Optional[Sequence[str]] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> List[dict]:
+    """Return up to `limit` hits for `q`, best match first."""
+    if _fts_ready and session.get_bind().dialect.name == "sqlite":
+        return _search_fts(session, q, topic_id, kinds, limit, offset)
+    return _search_like(session, q, topic_id, kinds, limit, offset)
+
+
+def _search_fts(session, q, topic_id, kinds, limit, offset) -> List[dict]:
+    match = _fts_query(q)
+    if match is None:
+        return []
+    where = ["search_index MATCH :match"]
+    params = {"match": match, "limit": limit, "offset": offset}
+    if topic_id is not None:
+        where.append("topic_id = :topic_id")
+        params["topic_id"] = topic_id
+    if kinds:
+        names = [k for k in kinds if k in KIND_CODES]
+        where.append("kind IN (" + ", ".join(f":kind{i}" for i in range(len(names))) + ")")
+        params.update({f"kind{i}": k for i, k in enumerate(names)})
+    rows = session.connection().execute(
+        text(
+            "SELECT kind, ref_id, question_id, topic_id, title, "
+            "snippet(search_index, -1, '[', ']', '…', 12) AS snippet, "
+            "bm25(search_index, 4.0, 1.0) AS score "
+            "FROM search_index WHERE " + " AND ".join(where) + " "
+            "ORDER BY score LIMIT :limit OFFSET :offset"
+        ),
+        params,
+    ).all()
+    return [
+        {
+            "kind": kind,
+            "id": ref_id,
+            "question_id": question_id,
+            "topic_id": topic_id_,
+            "title": title or None,
+            "snippet": snippet,
+            "score": round(-score, 4),
+        }
+        for kind, ref_id, question_id, topic_id_, title, snippet, score in rows
+    ]
+
+
+def _search_like(session, q, topic_id, kinds, limit, offset) -> List[dict]:
+    terms = re.findall(r"\w+", q.lower())
+    if not terms:
+        return []
+    kinds = [k for k in (kinds or KIND_CODES) if k in KIND_CODES]
+    hits: List[dict] = []
+    wanted = offset + limit
+
+    def like_all(*cols):
+        return [or_(*[c.ilike(f"%{t}%") for c in cols]) for t in terms]
+
+    if "question" in kinds:
+        stmt = select(Question.id, Question.topic_id, Question.stem).where(*like_all(Question.stem))
+        if topic_id is not None:
+            stmt = stmt.where(Question.topic_id == topic_id)
+        for qid, tid, stem in session.exec(stmt.order_by(Question.id).limit(wanted)).all():
+            hits.append({"kind": "question", "id": qid, "question_id": qid, "topic_id": tid, "title": None, "snippet": stem, "score": None})
+    if "hint" in kinds:
+        stmt = (
+            select(QuestionHint.id, QuestionHint.question_id, Question.topic_id, QuestionHint.hint_text)
+            .join(Question, Question.id == QuestionHint.question_id)
+            .where(*like_all(QuestionHint.hint_text))
+        )
+        if topic_id is not None:
+            stmt = stmt.where(Question.topic_id == topic_id)
+        for hid, qid, tid, hint_text in session.exec(stmt.order_by(QuestionHint.id).limit(wanted)).all():
+            hits.append({"kind": "hint", "id": hid, "question_id": qid, "topic_id": tid, "title": None, "snippet": hint_text, "score": None})
+    if "slide" in kinds:
+        stmt = select(LessonSlide.id, LessonSlide.topic_id, LessonSlide.title, LessonSlide.body).where(
+            *like_all(LessonSlide.title, LessonSlide.body)
+        )
+        if topic_id is not None:
+            stmt = stmt.where(LessonSlide.topic_id == topic_id)
+        for sid, tid, title, body in session.exec(stmt.order_by(LessonSlide.id).limit(wanted)).all():
+            hits.append({"kind": "slide", "id": sid, "question_id": None, "topic_id": tid, "title": title, "snippet": body[:200], "score": None})
+    return hits[offset:offset + limit]
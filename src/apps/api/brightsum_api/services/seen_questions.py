@@ -0,0 +1,124 @@
+"""Per-student "seen question" bitmaps for practice selection.
+
+Each (user, topic) pair has one bitmap over the topic's dense question index
+(see `TopicDifficultyIndex.question_ids`): bit i is set once question i has been
+served to the student in any practice attempt. Bitmaps are persisted in
+`SeenQuestionBitmap`, so excluding seen questions is a bitwise operation whose
+cost depends on the size of the topic's bank, not on how many attempts the
+student has made.
+
+The persisted row is the only copy: it is read on every selection (one lookup
+by its unique key) rather than cached per process, so several workers never
+serve from masks that miss each other's bits. `mark_seen` ORs the new bit into
+the stored value with a compare-and-set UPDATE, retried if another request
+changed the row in between.
+
+A persisted bitmap carries the catalog signature of the index it was built
+against. When questions are added to or removed from the topic the signature
+changes and the bitmap is rebuilt once from the interaction history.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from brightsum_api.ml.difficulty_index import TopicDifficultyIndex
+from brightsum_api.models import PracticeAttempt, PracticeInteraction, SeenQuestionBitmap
+
+# compare-and-set attempts before giving up on recording a bit (it is rebuilt
+# from the interaction history when the topic's question set next changes)
+MAX_WRITE_ATTEMPTS = 5
+
+
+def _to_bytes(mask: int) -> bytes:
+    return mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+
+
+def _rebuild_mask(session: Session, user_id: int, topic_id: int, index: TopicDifficultyIndex) -> int:
+    seen_ids = session.exec(
+        select(PracticeInteraction.question_id)
+        .join(PracticeAttempt, PracticeAttempt.id == PracticeInteraction.attempt_id)
+        .where(PracticeAttempt.user_id == user_id, PracticeAttempt.topic_id == topic_id)
+        .distinct()
+    ).all()
+    return index.mask_of(seen_ids)
+
+
+def _load(session: Session, user_id: int, topic_id: int) -> Optional[SeenQuestionBitmap]:
+    return session.exec(
+        select(SeenQuestionBitmap)
+        .where(SeenQuestionBitmap.user_id == user_id, SeenQuestionBitmap.topic_id == topic_id)
+        .execution_options(populate_existing=True)
+    ).first()
+
+
+def _write(
+    session: Session,
+    user_id: int,
+    topic_id: int,
+    index: TopicDifficultyIndex,
+    add_mask: int = 0,
+) -> int:
+    """OR `add_mask` into the stored bitmap (rebuilding it first if stale); returns the new mask.
+
+    The caller commits. Concurrent writers are detected by comparing the bits
+    that were read, so no request overwrites another's bits.
+    """
+    for _ in range(MAX_WRITE_ATTEMPTS):
+        row = _load(session, user_id, topic_id)
+        if row is not None and row.catalog_signature == index.signature:
+            old_mask = int.from_bytes(row.bits or b"", "little")
+        else:
+            # first use, or the topic's question set changed since it was stored
+            old_mask = _rebuild_mask(session, user_id, topic_id, index)
+        mask = old_mask | add_mask
+        if row is None:
+            try:
+                with session.begin_nested():
+                    session.add(SeenQuestionBitmap(
+                        user_id=user_id, topic_id=topic_id, bits=_to_bytes(mask),
+                        catalog_signature=index.signature, updated_at=datetime.utcnow(),
+                    ))
+                return mask
+            except IntegrityError:
+                # another request created the row first; merge into theirs
+                continue
+        if row.catalog_signature == index.signature and mask == old_mask:
+            return mask
+        result = session.exec(
+            update(SeenQuestionBitmap)
+            .where(
+                SeenQuestionBitmap.id == row.id,
+                SeenQuestionBitmap.bits == row.bits,
+                SeenQuestionBitmap.catalog_signature == row.catalog_signature,
+            )
+            .values(bits=_to_bytes(mask), catalog_signature=index.signature, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            return mask
+    return mask
+
+
+def get_seen_mask(session: Session, user_id: int, topic_id: int, index: TopicDifficultyIndex) -> int:
+    """Return the student's seen-question mask for the topic's current index.
+
+    A missing or stale bitmap is rebuilt and staged for the caller's commit.
+    """
+    row = _load(session, user_id, topic_id)
+    if row is not None and row.catalog_signature == index.signature:
+        return int.from_bytes(row.bits or b"", "little")
+    return _write(session, user_id, topic_id, index)
+
+
+def mark_seen(
+    session: Session, user_id: int, topic_id: int, index: TopicDifficultyIndex, question_id: int
+) -> None:
+    """Set the question's bit in the stored bitmap (the caller commits the session)."""
+    bit = index.mask_of([question_id])
+    if bit:
+        _write(session, user_id, topic_id, index, bit)
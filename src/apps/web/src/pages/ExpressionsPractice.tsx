@@ -134,6 +134,7 @@ const ExpressionsPractice: React.FC = () => {
         },
         body: JSON.stringify({
           answer_submitted: userAnswer,
+          question_id: currentQuestion?.question_id,
           time_seconds: questionStartTime ? (Date.now() - questionStartTime) / 1000 : undefined
         })
       })
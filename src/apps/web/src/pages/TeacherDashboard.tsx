@@ -4,6 +4,20 @@ import { useNavigate } from 'react-router-dom'
 type Topic = { id: number; slug: string; name: string }
 type Question = { id: number; topic_id: number; stem: string; answer: string; base_difficulty: string; is_quiz_only?: boolean; hints?: string[] }
 
+// /questions is paged; follow the X-Next-After-Id cursor until the last page
+async function fetchAllQuestions(token: string): Promise<Question[]> {
+  const all: Question[] = []
+  let afterId: string | null = null
+  do {
+    const url = 'http://localhost:8000/api/teacher/questions?limit=1000' + (afterId ? `&after_id=${afterId}` : '')
+    const r = await fetch(url, { headers: { Authorization: `Bearer ${token}` } })
+    if (!r.ok) throw new Error('questions')
+    all.push(...(await r.json()))
+    afterId = r.headers.get('X-Next-After-Id')
+  } while (afterId)
+  return all
+}
+
 export default function TeacherDashboard(): React.ReactElement {
   const [topics, setTopics] = useState<Topic[]>([])
   const [questions, setQuestions] = useState<Question[]>([])
@@ -29,7 +43,7 @@ export default function TeacherDashboard(): React.ReactElement {
         // refresh questions list
         // keep the page rather than force reload so user can download failures
         // but refresh the questions asynchronously
-        fetch('http://localhost:8000/api/teacher/questions', { headers: { Authorization: `Bearer ${tkn}` } }).then(r => r.ok ? r.json().then(js => setQuestions(js)) : null)
+        fetchAllQuestions(tkn).then(js => setQuestions(js)).catch(() => null)
       })
       .catch(() => alert('Import failed — check the CSV format and your permissions.'))
   }
@@ -40,7 +54,7 @@ export default function TeacherDashboard(): React.ReactElement {
     // fetch topics and questions in parallel
     Promise.all([
       fetch('http://localhost:8000/api/teacher/topics', { headers: { Authorization: `Bearer ${t}` } }).then(r => r.ok ? r.json() : Promise.reject('topics')),
-      fetch('http://localhost:8000/api/teacher/questions', { headers: { Authorization: `Bearer ${t}` } }).then(r => r.ok ? r.json() : Promise.reject('questions'))
+      fetchAllQuestions(t)
     ]).then(([topicsData, questionsData]) => {
       setTopics(topicsData || [])
       setQuestions(questionsData || [])